@@ -0,0 +1,129 @@
+# Region Analytics - İlçe/mahalle bazında önceden hesaplanmış piyasa özetleri (harita, karşılaştırma)
+
+import hashlib
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from listing_groups import ListingGroups
+
+# Fiyat ve m² fiyatı için raporlanan dilimler
+ANALYTICS_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+QUANTILE_KEYS = tuple(f"p{round(q * 100)}" for q in ANALYTICS_QUANTILES)
+# FIRSAT eşiği: ilan fiyatı tahminin %5'inden fazla altında (predict ile aynı kural)
+OPPORTUNITY_DIFF_PERCENT = -5
+
+
+def _grouped_quantiles(values: np.ndarray, ranges: list, quantiles: tuple) -> np.ndarray:
+    """Her aralığın sonlu değerlerinin dilimleri -> (aralık, dilim) dizisi; sonlu değer yoksa NaN
+
+    np.quantile'ın varsayılan (doğrusal) yöntemi; tüm aralıklar tek lexsort ile sıralanır.
+    """
+    if not ranges:
+        return np.empty((0, len(quantiles)))
+    lengths = np.array([rows.stop - rows.start for rows in ranges], dtype=np.intp)
+    rows = np.concatenate([np.arange(rows.start, rows.stop) for rows in ranges])
+    group = np.repeat(np.arange(len(ranges)), lengths)
+    selected = values[rows]
+    # Grup içinde artan sıra; NaN'lar grubun sonuna düşer
+    ordered = selected[np.lexsort((selected, group))]
+    offsets = np.cumsum(lengths) - lengths
+    finite = _grouped_sums(np.isfinite(values), ranges)
+
+    # Grup içi konum; np.quantile ile aynı ağırlıklar için offset sonradan eklenir
+    positions = np.asarray(quantiles)[None, :] * np.maximum(finite - 1, 0)[:, None]
+    lower = np.floor(positions)
+    weight = positions - lower
+    lower = offsets[:, None] + lower.astype(np.intp)
+    upper = lower + (weight > 0)
+    # np.quantile'ın interpolasyonu: üst yarıda üst değerden geri gidilir
+    below, above = ordered[lower], ordered[upper]
+    result = np.where(
+        weight < 0.5, below + (above - below) * weight, above - (above - below) * (1 - weight)
+    )
+    result[finite == 0] = np.nan
+    return result
+
+
+def _grouped_sums(mask: np.ndarray, ranges: list) -> np.ndarray:
+    """Her aralıktaki True sayısı"""
+    cumulative = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+    return np.array([cumulative[rows.stop] - cumulative[rows.start] for rows in ranges], dtype=np.int64)
+
+
+class RegionAnalytics:
+    """Yüklemede bir kez hesaplanan bölge özetleri ve hazır JSON yanıtları
+
+    Her (ilçe, mahalleler dahil mi) seçeneği için yanıt gövdesi ve ETag önceden
+    üretilir; istekte yalnızca sözlük araması yapılır.
+    """
+
+    def __init__(self, data: pd.DataFrame, groups: ListingGroups = None, model_version: str = None):
+        groups = groups if groups is not None else ListingGroups(data)
+        order = groups.order
+        # İlçe ve ilçe/mahalle grupları bu dizilerde bitişik aralıklardır
+        prices = data['Price'].to_numpy(dtype=np.float64)[order]
+        m2 = data['m² (Net)'].to_numpy(dtype=np.float64)[order]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_per_m2 = np.where(m2 > 0, prices / m2, np.nan)
+        diff_percent = (
+            data['diff_percent'].to_numpy(dtype=np.float64)[order]
+            if 'diff_percent' in data.columns else np.full(len(order), np.nan)
+        )
+
+        def summaries(slices: dict) -> dict:
+            ranges = list(slices.values())
+            price = _grouped_quantiles(prices, ranges, ANALYTICS_QUANTILES).tolist()
+            per_m2 = _grouped_quantiles(price_per_m2, ranges, ANALYTICS_QUANTILES).tolist()
+            median_diff = _grouped_quantiles(diff_percent, ranges, (0.5,))[:, 0].tolist()
+            discounted = _grouped_sums(diff_percent < OPPORTUNITY_DIFF_PERCENT, ranges).tolist()
+            scored = _grouped_sums(np.isfinite(diff_percent), ranges).tolist()
+            result = {}
+            for i, (key, rows) in enumerate(slices.items()):
+                result[key] = {
+                    'count': rows.stop - rows.start,
+                    # Fiyatlar 1000 TL'ye, m² fiyatları 1 TL'ye yuvarlanır
+                    'price': self._quantiles(price[i], 1000),
+                    'price_per_m2': self._quantiles(per_m2[i], 1),
+                    # Model farkı yalnızca skorlanmış (adil değeri olan) ilanlar üzerinden
+                    'median_diff_percent': round(median_diff[i], 2) if scored[i] else None,
+                    'opportunity_share': round(discounted[i] / scored[i], 4) if scored[i] else None,
+                }
+            return result
+
+        neighborhoods = {}
+        for (district, neighborhood), summary in summaries(groups.pair_slices).items():
+            neighborhoods.setdefault(district, []).append({'neighborhood': neighborhood, **summary})
+        self.districts = [
+            {'district': district, **summary, 'neighborhoods': neighborhoods.get(district, [])}
+            for district, summary in sorted(summaries(groups.district_slices).items())
+        ]
+        self.model_version = model_version
+
+        self._responses = {}
+        for include_neighborhoods in (True, False):
+            self._responses[(None, include_neighborhoods)] = self._render(self.districts, include_neighborhoods)
+            for item in self.districts:
+                self._responses[(item['district'], include_neighborhoods)] = self._render([item], include_neighborhoods)
+
+    @staticmethod
+    def _quantiles(values: list, unit: int) -> dict:
+        return {
+            key: None if math.isnan(value) else round(value / unit) * unit
+            for key, value in zip(QUANTILE_KEYS, values)
+        }
+
+    def _render(self, districts: list, include_neighborhoods: bool) -> tuple:
+        if not include_neighborhoods:
+            districts = [{k: v for k, v in item.items() if k != 'neighborhoods'} for item in districts]
+        body = json.dumps(
+            {'model_version': self.model_version, 'districts': districts},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+        return body, '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+
+    def response(self, district: str = None, include_neighborhoods: bool = True):
+        """(JSON gövdesi, ETag); bilinmeyen ilçede None"""
+        return self._responses.get((district, include_neighborhoods))
@@ -0,0 +1,256 @@
+# Artifacts - Sürümlü, hızlı yüklenen model paketi (bundle)
+#
+# models/ altındaki pickle'lar ve processed_data.pkl bir kez şu pakete dönüştürülür:
+#   model.txt       LightGBM'in kendi metin formatı (sklearn Pipeline'ı olmadan yüklenir)
+#   pipeline.json   Kolon yerleşimi (one-hot / passthrough), encoder kolonları ve kategorileri
+#   encoder/        Encoder ortalamaları, kolon başına düz float64 .npy dizisi
+#   data/           Eğitim verisi, kolon başına bir .npy dosyası (metin kolonları: int32 kod + sözlük)
+#   manifest.json   Format sürümü, dosya ve kaynak pickle sha256 özetleri (en son yazılır)
+#
+# Paket pandas/sklearn sürümünden bağımsızdır. Sayısal kolonlar salt okunur memory-map
+# olarak açılır: aynı paketi açan tüm uvicorn worker'ları sayfa önbelleğindeki tek
+# kopyayı paylaşır.
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import encoder as encoder_module
+import features
+from inference import CompiledPipeline
+
+BUNDLE_FORMAT_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+MODEL_FILE = "model.txt"
+PIPELINE_FILE = "pipeline.json"
+ENCODER_DIR = "encoder"
+DATA_DIR = "data"
+COLUMNS_FILE = "columns.json"
+
+
+class BundleError(ValueError):
+    """Paket eksik, bozuk, uyumsuz sürümde veya kaynak pickle'lardan eski"""
+
+
+def export_bundle(compiled: CompiledPipeline, encoder, training_data: pd.DataFrame,
+                  out_dir, sources: dict = None) -> Path:
+    """Derlenmiş pipeline'ı ve (skorlanmış) eğitim verisini paket olarak yaz
+
+    sources: {isim: yol} - paketin üretildiği pickle'lar; özetleri manifest'e yazılır.
+    Önce geçici klasöre yazılır, sonra tek adımda yerine taşınır; çalışan
+    worker'lar yarım yazılmış paket görmez.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    compiled.booster.save_model(str(tmp_dir / MODEL_FILE))
+
+    (tmp_dir / ENCODER_DIR).mkdir()
+    encoder_spec = {
+        "cols": list(encoder.cols),
+        "target_col": encoder.target_col,
+        "global_mean": float(encoder.global_mean),
+        "mappings": {}
+    }
+    for i, (col, mapping) in enumerate(encoder.mappings.items()):
+        means_file = f"{ENCODER_DIR}/m{i:02d}.npy"
+        np.save(tmp_dir / means_file, np.array(list(mapping.values()), dtype=np.float64))
+        encoder_spec["mappings"][col] = {"categories": list(mapping.keys()), "means": means_file}
+
+    pipeline = compiled.layout()
+    pipeline["encoder"] = encoder_spec
+    with open(tmp_dir / PIPELINE_FILE, "w", encoding="utf-8") as f:
+        json.dump(pipeline, f, ensure_ascii=False)
+
+    rows = None
+    if training_data is not None:
+        _export_columns(training_data, tmp_dir / DATA_DIR)
+        rows = len(training_data)
+
+    files = sorted(
+        path.relative_to(tmp_dir).as_posix() for path in tmp_dir.rglob("*") if path.is_file()
+    )
+    manifest = {
+        "version": BUNDLE_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rows": rows,
+        "libraries": _library_versions(),
+        "sources": {name: file_sha256(path) for name, path in (sources or {}).items()},
+        "files": {name: file_sha256(tmp_dir / name) for name in files}
+    }
+    with open(tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+def _export_columns(df: pd.DataFrame, data_dir: Path):
+    """Her kolonu ayrı .npy dosyasına yaz (metin kolonları: int32 kod + kategori sözlüğü)"""
+    data_dir.mkdir()
+    # Kolonlar kompakt tiplerle yazılır: yüklemede compact_listings kopyalamaz, mmap korunur
+    df = features.compact_listings(df)
+    # Hesaplanan fark, yüklemede fair_value'dan yeniden üretilir
+    names = [name for name in df.columns if name != 'diff_percent']
+    columns = []
+
+    np.save(data_dir / "index.npy", df.index.to_numpy())
+    for i, name in enumerate(names):
+        entry = {"name": name, "file": f"c{i:02d}.npy"}
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(series):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, categories = pd.factorize(series, use_na_sentinel=True)
+            np.save(data_dir / entry["file"], codes.astype(np.int32))
+            entry["dtype"] = "dictionary"
+            entry["categories"] = categories.tolist()
+        else:
+            values = series.to_numpy()
+            np.save(data_dir / entry["file"], values)
+            entry["dtype"] = values.dtype.str
+        columns.append(entry)
+
+    with open(data_dir / COLUMNS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"rows": len(df), "columns": columns}, f, ensure_ascii=False)
+
+
+def _library_versions() -> dict:
+    import lightgbm
+    return {"lightgbm": lightgbm.__version__, "numpy": np.__version__, "pandas": pd.__version__}
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_bundle_dir(bundle_dir) -> bool:
+    return bundle_dir is not None and (Path(bundle_dir) / MANIFEST_FILE).exists()
+
+
+def read_manifest(bundle_dir) -> dict:
+    with open(Path(bundle_dir) / MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != BUNDLE_FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle version: {manifest.get('version')}")
+    return manifest
+
+
+def verify_bundle(bundle_dir, sources: dict = None) -> dict:
+    """Manifest'teki özetleri kontrol et; sorun varsa BundleError
+
+    sources verilirse ({isim: yol}, var olan dosyalar) paketin bu pickle'lardan
+    üretildiği de doğrulanır - pickle'lar değiştiyse paket eskidir.
+    """
+    bundle_dir = Path(bundle_dir)
+    manifest = read_manifest(bundle_dir)
+    for name, expected in manifest["files"].items():
+        path = bundle_dir / name
+        if not path.exists():
+            raise BundleError(f"Bundle file missing: {name}")
+        if file_sha256(path) != expected:
+            raise BundleError(f"Bundle checksum mismatch: {name}")
+    for name, path in (sources or {}).items():
+        expected = manifest["sources"].get(name)
+        if expected is not None and Path(path).exists() and file_sha256(path) != expected:
+            raise BundleError(f"Bundle is older than {name}, rebuild it with artifacts.py")
+    return manifest
+
+
+def load_pipeline(bundle_dir):
+    """model.txt + pipeline.json + encoder/ ortalamalarından (encoder, CompiledPipeline) oluştur"""
+    import lightgbm as lgb
+
+    bundle_dir = Path(bundle_dir)
+    with open(bundle_dir / PIPELINE_FILE, encoding="utf-8") as f:
+        pipeline = json.load(f)
+
+    spec = pipeline["encoder"]
+    encoder = encoder_module.Optimization(cols=spec["cols"], target_col=spec["target_col"])
+    encoder.global_mean = spec["global_mean"]
+    encoder.mappings = {
+        col: dict(zip(mapping["categories"], np.load(bundle_dir / mapping["means"]).tolist()))
+        for col, mapping in spec["mappings"].items()
+    }
+
+    booster = lgb.Booster(model_file=str(bundle_dir / MODEL_FILE))
+    compiled = CompiledPipeline(
+        booster,
+        encoder,
+        pipeline["n_features"],
+        [(item["column"], item["categories"], item["start"]) for item in pipeline["onehot"]],
+        [(item["column"], item["position"]) for item in pipeline["passthrough"]]
+    )
+    return encoder, compiled
+
+
+def load_training_data(bundle_dir):
+    """Eğitim verisini memory-map ile aç (veri yoksa None)
+
+    Sayısal kolonlar kopyalanmadan salt okunur mmap dizileri olarak kalır;
+    sözlük kodlu metin kolonları category (kod + sözlük) olarak açılır.
+    """
+    data_dir = Path(bundle_dir) / DATA_DIR
+    if not (data_dir / COLUMNS_FILE).exists():
+        return None
+    with open(data_dir / COLUMNS_FILE, encoding="utf-8") as f:
+        layout = json.load(f)
+
+    columns = {}
+    for entry in layout["columns"]:
+        values = np.load(data_dir / entry["file"], mmap_mode='r')
+        if entry["dtype"] == "dictionary":
+            values = pd.Categorical.from_codes(values, entry["categories"])
+        columns[entry["name"]] = values
+
+    index = pd.Index(np.load(data_dir / "index.npy"))
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def main():
+    import warnings
+    from predictor import HousePricePredictor
+
+    parser = argparse.ArgumentParser(description='Build a versioned artifact bundle from the model/encoder pickles and processed_data.pkl.')
+    parser.add_argument('--models_dir', type=str, default=None, help='Path to the models directory (pickles)')
+    parser.add_argument('--out', type=str, default=None, help='Output directory (default: <models_dir>/bundle)')
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        predictor = HousePricePredictor()
+        predictor.load(args.models_dir, bundle_dir=None, background=False, prefer_bundle=False)
+
+    if predictor.compiled is None:
+        raise SystemExit("Error: this model cannot be compiled, bundles are not supported")
+
+    out_dir = Path(args.out) if args.out else predictor.source_paths()["model.pkl"].parent / "bundle"
+    out_dir = export_bundle(
+        predictor.compiled, predictor.encoder, predictor.training_data, out_dir,
+        sources=predictor.source_paths()
+    )
+    print(f"✅ Bundle written to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Batcher - Eşzamanlı tekil istekleri tek toplu çağrıda birleştiren mikro-batch zamanlayıcı
+
+import asyncio
+import contextvars
+import os
+
+import metrics
+import profiling
+
+# Bir batch çalışırken gelen istekler en fazla bu kadar bekler (0 = kapalı, istekler tek tek çalışır)
+PREDICT_BATCH_WAIT_MS = float(os.environ.get("PREDICT_BATCH_WAIT_MS", "2"))
+# Bu kadar farklı istek toplanınca beklemeden çalıştırılır
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", "32"))
+
+
+class MicroBatcher:
+    """Eşzamanlı istekleri toplayıp run_batch ile tek çağrıda çalıştırır
+
+    Çalışan batch yokken gelen istek hemen gönderilir. Bir batch çalışırken gelenler
+    birikir ve o batch bitince, en geç max_wait saniye sonra ya da max_size farklı
+    öğe dolunca gönderilir.
+
+    run_batch(items): öğe başına sonuç ya da o öğeye ait Exception listesi döndüren coroutine.
+    Aynı anahtarlı istekler (bekleyen ya da çalışmakta olan) tek öğe olarak hesaplanır ve
+    aynı sonucu alır. Tüm durum event loop thread'inde değişir; kilit gerekmez.
+
+    Batch kendi izinde çalışır; aşama süreleri bekleyen her isteğin izine (yavaş istek
+    günlüğü) eklenir. CPU profili istenen istekler batch'e alınmamalıdır (bkz. main.predict).
+    """
+
+    def __init__(self, name: str, run_batch, max_size: int, max_wait: float, key=None):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.key = key or (lambda item: item)
+        self._pending = {}   # anahtar -> (öğe, future, bekleyen izler), henüz gönderilmemiş
+        self._running = {}   # anahtar -> (future, bekleyen izler), çalışan batch'lerdeki öğeler
+        self._timer = None
+        self._tasks = set()
+        self.batch_size = metrics.PREDICT_BATCH_SIZE.labels(name)
+        self.deduplicated = metrics.PREDICT_BATCH_DEDUPLICATED.labels(name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_size > 1
+
+    async def submit(self, item):
+        """Öğeyi sıradaki batch'e ekle ve sonucunu bekle"""
+        key = self.key(item)
+        trace = profiling.current_trace.get()
+        if key in self._running:
+            future, traces = self._running[key]
+        elif key in self._pending:
+            _, future, traces = self._pending[key]
+        else:
+            future = None
+        if future is not None:
+            if trace is not None:
+                traces.append(trace)
+            self.deduplicated.inc()
+            profiling.annotate('micro_batch', {'deduplicated': True})
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = (item, future, [trace] if trace is not None else [])
+        # Çalışan batch yoksa beklemenin anlamı yok: tek istek gecikme eklenmeden gider
+        if len(self._pending) >= self.max_size or not self._running:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        # Bir istemcinin iptali aynı sonucu bekleyen diğerlerini etkilemesin
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        for key, (_, future, traces) in batch.items():
+            self._running[key] = (future, traces)
+        self.batch_size.observe(len(batch))
+        # Batch tek bir isteğe ait değil: kendi izini kuracağı boş bağlamda çalışır
+        task = asyncio.get_running_loop().create_task(self._run(batch), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict):
+        keys = list(batch)
+        # Batch'in izi (boş bağlamda): aşama süreleri burada toplanıp isteklerin izlerine dağıtılır
+        batch_trace, _ = profiling.start_trace()
+        try:
+            results = await self.run_batch([batch[key][0] for key in keys])
+        except Exception as e:
+            results = [e] * len(keys)
+        for key, result in zip(keys, results):
+            _, future, traces = batch[key]
+            if self._running.get(key, (None,))[0] is future:
+                del self._running[key]
+            for trace in traces:
+                for name, seconds in batch_trace.stages.items():
+                    trace.add_stage(name, seconds)
+                trace.details.setdefault('micro_batch', {})['size'] = len(keys)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        # Bu batch çalışırken biriken istekler artık beklemeden gönderilir
+        if self._pending and not self._running:
+            self._flush()
@@ -0,0 +1,153 @@
+# Bulk Worker - Toplu tahmin, fırsat ve emsal işleri (bulk havuzunun worker süreçlerinde çalışır)
+#
+# Fonksiyonlar modül düzeyindedir (süreçler arası pickle). Worker süreci kendi predictor'ını
+# sunucu süreciyle aynı kaynaklardan yükler (paket mmap'li olduğundan sayfalar paylaşılır).
+# Her iş, sunucunun etkin artifact imzasını taşır; worker farklı sürümdeyse işten önce yeniden
+# yükler. Worker süreçleri kapalıysa aynı fonksiyonlar sunucu sürecinde çalışır (imza zaten aynı).
+
+import json
+
+from pydantic import ValidationError
+
+from models import BatchPredictItem, BatchPredictResponse, OpportunityItem, PredictRequest, PredictResponse
+from predictor import predictor
+
+# Tek toplu istekte kabul edilen maksimum öğe sayısı
+MAX_BATCH_SIZE = 10000
+
+# initialize() ile başlatılmış worker sürecinde miyiz (sunucu sürecinde imza eşitlemesi yapılmaz)
+_in_worker = False
+# Yeniden yüklemesi denenmiş son imza: dosyalar sunucunun yüklediğinden yeniyse her işte tekrar denenmez
+_requested_signature = None
+
+
+class JobError(Exception):
+    """İstemciye dönecek hata (HTTP durum kodu + mesaj); HTTPException'ın aksine süreçler arasında taşınır"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def initialize(load_args: dict):
+    """Worker süreci başlangıcı: modeli ve eğitim verisini (beklemeden) yükle"""
+    global _in_worker
+    predictor.load(**load_args, background=False)
+    _in_worker = True
+
+
+def _sync(signature: tuple):
+    """Sunucu başka bir artifact sürümüne geçtiyse aynısını yükle"""
+    global _requested_signature
+    if not _in_worker or predictor.signature == signature or signature == _requested_signature:
+        return
+    _requested_signature = signature
+    try:
+        predictor.reload()
+    except Exception as e:
+        print(f"⚠️ Bulk worker reload failed, serving {predictor.model_version}: {e}")
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> list:
+    """JSON dizi veya NDJSON gövdesini öğelere ayır (hatalı satır, hata mesajı olarak döner)"""
+    try:
+        text = body.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        raise JobError(400, "Body must be UTF-8 encoded")
+
+    if "ndjson" not in content_type and text.startswith("["):
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise JobError(400, f"Invalid JSON: {e}")
+        return items
+
+    # application/json gövdesi tek bir JSON değeriyse dizi olmalı; satır satır NDJSON'a düşmez
+    if "json" in content_type and "ndjson" not in content_type:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = None  # tek bir JSON değeri değil: NDJSON olarak ayrıştır
+        else:
+            if not isinstance(value, list):
+                raise JobError(
+                    422,
+                    "JSON body must be an array of PredictRequest objects (use application/x-ndjson for one request per line)"
+                )
+            return value
+
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            items.append(ValueError(f"Invalid JSON line: {e}"))
+    return items
+
+
+def run_batch(signature: tuple, body: bytes, content_type: str) -> str:
+    """Toplu isteği işle ve BatchPredictResponse JSON'unu döndür"""
+    _sync(signature)
+    items = _parse_batch_body(body, content_type)
+    if len(items) > MAX_BATCH_SIZE:
+        raise JobError(413, f"Batch size exceeds {MAX_BATCH_SIZE}")
+
+    # Öğe bazında doğrulama - hatalı öğe tüm isteği düşürmez
+    results = [BatchPredictItem(index=i) for i in range(len(items))]
+    valid_indices = []
+    valid_requests = []
+    for i, item in enumerate(items):
+        if isinstance(item, Exception):
+            results[i].error = str(item)
+            continue
+        try:
+            valid_requests.append(PredictRequest.model_validate(item))
+            valid_indices.append(i)
+        except ValidationError as e:
+            results[i].error = str(e)
+
+    try:
+        predictions = predictor.predict_batch(valid_requests)
+    except Exception as e:
+        raise JobError(500, str(e))
+
+    for i, prediction in zip(valid_indices, predictions):
+        if isinstance(prediction, Exception):
+            results[i].error = str(prediction)
+        else:
+            results[i].result = PredictResponse(**prediction)
+
+    failed = sum(1 for item in results if item.error is not None)
+    return BatchPredictResponse(
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed
+    ).model_dump_json()
+
+
+def opportunities_page(signature: tuple, filters: tuple, limit: int, rank: str, offset: int) -> dict:
+    """predictor.get_opportunities sayfası"""
+    _sync(signature)
+    return predictor.get_opportunities(*filters, limit, rank, offset)
+
+
+def opportunities_stream(signature: tuple, filters: tuple, rank: str, offset: int) -> tuple:
+    """offset'ten sonraki tüm fırsatlar -> (toplam, model sürümü, NDJSON gövdesi)
+
+    Satırlar burada (worker'da) üretilir; JSON yanıtıyla aynı şema.
+    """
+    _sync(signature)
+    total, version, items = predictor.stream_opportunities(*filters, rank, offset)
+    body = "".join(OpportunityItem(**item).model_dump_json() + "\n" for item in items)
+    return total, version, body.encode("utf-8")
+
+
+def comparables(signature: tuple, request, k: int) -> tuple:
+    """İsteğe en benzer k ilan -> (emsaller, arama kapsamı, model sürümü)"""
+    _sync(signature)
+    found, scope = predictor.get_comparables(request, k)
+    return found, scope, predictor.model_version
@@ -0,0 +1,170 @@
+# Comparables Index - Benzer ilan (emsal) arama indeksi
+
+import numpy as np
+
+from opportunity_index import OpportunityIndex
+
+# Benzerlik boyutları: kolon -> bir birim mesafeye karşılık gelen fark.
+# m² log ölçekte tutulur; ±%30 (fırsat aramasındaki tolerans) ≈ 1 birim
+SIMILARITY_SCALES = {
+    'm² (Net)': np.log(1.3),
+    'Rooms_Num': 1.0,
+    'Age_Num': 10.0,
+    'Floor': 3.0,
+    'Number of floors': 5.0,
+    'Number of bathrooms': 1.0,
+    'Balcony_Bool': 2.0,
+    'Elevator': 2.0,
+    'Parking Lot': 2.0,
+    'Security': 2.0,
+}
+LOG_SCALED = ('m² (Net)',)
+
+# Grup seçimi fırsat aramasıyla aynı: küçük ilçede tüm veri, yeterli örneği olan mahalle
+MIN_DISTRICT_ROWS = 20
+MIN_NEIGHBORHOOD_ROWS = 5
+
+
+def query_from_request(request) -> dict:
+    """Emsal isteğini benzerlik boyutlarına (kolon -> değer) dönüştür; verilmeyenler None"""
+    def flag(value):
+        return None if value is None else int(bool(value))
+
+    return {
+        'm² (Net)': request.m2,
+        'Rooms_Num': request.rooms,
+        'Age_Num': request.building_age,
+        'Floor': request.floor,
+        'Number of floors': request.total_floors,
+        'Number of bathrooms': request.bathrooms,
+        'Balcony_Bool': flag(request.balcony),
+        'Elevator': flag(request.elevator),
+        'Parking Lot': flag(request.parking),
+        'Security': flag(request.security),
+    }
+
+
+class ComparablesIndex:
+    """Fırsat indeksinin satırları üzerinde ilçe/mahalle bazında KD-tree'ler
+
+    Satır pozisyonları OpportunityIndex ile ortaktır; sonuçlar onun çıktı formatında döner.
+    """
+
+    def __init__(self, data, opportunity_index: OpportunityIndex):
+        # Açılış yolunu yavaşlatmamak için scipy yalnızca indeks kurulurken yüklenir
+        from scipy.spatial import cKDTree
+
+        self.opportunities = opportunity_index
+        self.columns = [col for col in SIMILARITY_SCALES if col in data.columns]
+
+        # Ölçeklenmiş özellik matrisi, fırsat indeksinin sıralamasıyla
+        matrix = np.empty((len(opportunity_index), len(self.columns)), dtype=np.float64)
+        for i, col in enumerate(self.columns):
+            values = data[col].to_numpy(dtype=np.float64)[opportunity_index.order]
+            if col in LOG_SCALED:
+                values = np.log(np.maximum(values, 1.0))
+            # Eksik değerler boyutu nötrler: kolon medyanı
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = np.nanmedian(values) if not missing.all() else 0.0
+            matrix[:, i] = values / SIMILARITY_SCALES[col]
+        self.matrix = matrix
+
+        # Her grup: (pozisyonlar, ağaç, sorgu boşlukları için grup medyanı)
+        self.groups = {}
+        groups = [(('all',), opportunity_index.all_rows)]
+        groups += [(('district', key), rows) for key, rows in opportunity_index.by_district.items()]
+        groups += [(('neighborhood', key), rows) for key, rows in opportunity_index.by_neighborhood.items()]
+        groups += [(('pair',) + key, rows) for key, rows in opportunity_index.by_pair.items()]
+        # Skorlanamayan (adil değeri olmayan) ilanlar emsal olarak döndürülmez
+        scored = ~np.isnan(opportunity_index.fair_value)
+        for key, rows in groups:
+            rows = rows[scored[rows]]
+            if len(rows) == 0:
+                continue
+            points = matrix[rows]
+            self.groups[key] = (rows, cKDTree(points), np.median(points, axis=0))
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def _group(self, district: str, neighborhood: str, min_rows: int):
+        """Aranacak grubu seç -> (kapsam adı, grup)"""
+        group = self.groups.get(('district', district))
+        if group is None or len(group[0]) < MIN_DISTRICT_ROWS:
+            scope, group = 'all', self.groups[('all',)]
+            local = self.groups.get(('neighborhood', neighborhood)) if neighborhood else None
+        else:
+            scope = 'district'
+            local = self.groups.get(('pair', district, neighborhood)) if neighborhood else None
+
+        # Mahalle, istenen sayıda emsali karşılayabiliyorsa kullanılır
+        if local is not None and len(local[0]) >= max(MIN_NEIGHBORHOOD_ROWS, min_rows):
+            scope, group = 'neighborhood', local
+        return scope, group
+
+    def _point(self, query: dict, medians: np.ndarray) -> np.ndarray:
+        point = medians.copy()
+        for i, col in enumerate(self.columns):
+            value = query.get(col)
+            if value is None:
+                continue
+            value = float(value)
+            if col in LOG_SCALED:
+                value = np.log(max(value, 1.0))
+            point[i] = value / SIMILARITY_SCALES[col]
+        return point
+
+    def nearest(self, district: str, neighborhood: str, query: dict, k: int = 10,
+                discounted_only: bool = False, stats: dict = None) -> list:
+        """En benzer k ilanı (yakından uzağa) API çıktı formatında döndür"""
+        positions, distances, _ = self.neighbors(district, neighborhood, query, k, discounted_only, stats)
+        items = []
+        for pos, distance in zip(positions.tolist(), distances.tolist()):
+            item = self.opportunities.to_item(pos)
+            item['distance'] = round(distance, 3)
+            items.append(item)
+        return items
+
+    def neighbors(self, district: str, neighborhood: str, query: dict, k: int = None,
+                  discounted_only: bool = False, stats: dict = None) -> tuple:
+        """Yakından uzağa (pozisyonlar, mesafeler, aday sayısı); k=None grubun tamamı
+
+        query: kolon -> değer; eksik boyutlar grubun medyanıyla doldurulur.
+        discounted_only: yalnızca en az %5 indirimli ilanlar (fırsat sıralaması). Bu modda
+        grup seçimi k'dan bağımsızdır: sayfalar aynı sıralamanın devamıdır.
+        """
+        if not self.groups:
+            return np.empty(0, dtype=np.intp), np.empty(0), 0
+        min_rows = MIN_NEIGHBORHOOD_ROWS if discounted_only or k is None else k
+        scope, (rows, tree, medians) = self._group(district, neighborhood, min_rows)
+        point = self._point(query, medians)
+
+        n = len(rows)
+        candidates = int(np.count_nonzero(self.opportunities.diff_percent[rows] < -5)) if discounted_only else n
+        k = candidates if k is None else min(k, candidates)
+
+        # İndirim filtresi komşuları eler; yeterli sonuç bulunana kadar arama genişler.
+        # k. sonucun mesafesi getirilen en uzak mesafeden küçük olmalı: sınırdaki eşit
+        # mesafeli ilanların hepsi elde olur ve sıralama k'dan bağımsızdır (sayfalar = akış)
+        wanted = min(k * 4, n) if discounted_only else min(k + 1, n)
+        positions, distances = np.empty(0, dtype=np.intp), np.empty(0)
+        while k > 0:
+            distances, local = tree.query(point, k=wanted)
+            distances, local = np.atleast_1d(distances), np.atleast_1d(local)
+            positions = rows[local]
+            farthest = distances[-1]
+            if discounted_only:
+                keep = self.opportunities.diff_percent[positions] < -5
+                positions, distances = positions[keep], distances[keep]
+            if wanted >= n or (len(positions) >= k and distances[k - 1] < farthest):
+                break
+            wanted = min(wanted * 4, n)
+
+        # cKDTree eşit mesafeleri k'ya göre farklı sıralayabilir: eşitlikte satır pozisyonu
+        ordering = np.lexsort((positions, distances))
+        positions, distances = positions[ordering], distances[ordering]
+
+        if stats is not None:
+            stats.update(scope=scope, group_rows=n, searched=wanted if k > 0 else 0)
+        return positions[:k], distances[:k], candidates
@@ -0,0 +1,58 @@
+# Districts - İlçe -> mahalle ağacı (form seçenekleri) ve hazır JSON yanıtı
+
+import hashlib
+import json
+
+import pandas as pd
+
+from listing_groups import ListingGroups
+
+# İlçe kimliği: küçük harf, Türkçe karaktersiz, boşluk yerine tire
+_ID_REPLACEMENTS = str.maketrans({
+    "ı": "i", "İ": "i", "ğ": "g", "Ğ": "g",
+    "ü": "u", "Ü": "u", "ş": "s", "Ş": "s",
+    "ö": "o", "Ö": "o", "ç": "c", "Ç": "c",
+    " ": "-",
+})
+
+
+def to_id(name: str) -> str:
+    # Önce Türkçe harfler: "İ".lower() birleşik nokta karakteri üretir
+    return name.translate(_ID_REPLACEMENTS).lower()
+
+
+def district_tree(groups: ListingGroups) -> dict:
+    """İlçe -> alfabetik mahalle listesi; ilçeler alfabetik
+
+    İlçe+mahalle grupları zaten tekil çiftlerdir; satırlar üzerinde dolaşılmaz.
+    """
+    tree = {}
+    for district, neighborhood in groups.pair_slices:
+        tree.setdefault(district, []).append(neighborhood)
+    return {district: sorted(tree[district]) for district in sorted(tree)}
+
+
+def district_catalog(tree: dict) -> list:
+    """Frontend'in District formatı: [{id, name, neighborhoods}]"""
+    return [
+        {"id": to_id(district), "name": district, "neighborhoods": neighborhoods}
+        for district, neighborhoods in tree.items()
+    ]
+
+
+class DistrictCatalog:
+    """Yüklemede bir kez üretilen ilçe/mahalle listesi: JSON gövdesi ve içerikten türetilen ETag
+
+    ETag model sürümüne bağlı değildir: liste değişmedikçe yeniden yüklemeden sonra da aynı kalır.
+    """
+
+    def __init__(self, data: pd.DataFrame, groups: ListingGroups = None):
+        groups = groups if groups is not None else ListingGroups(data)
+        self.tree = district_tree(groups)
+        self.body = json.dumps(
+            {"districts": district_catalog(self.tree)}, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:20] + '"'
+
+    def __len__(self) -> int:
+        return len(self.tree)
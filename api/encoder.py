@@ -19,18 +19,73 @@ class Optimization:
                 # Calculate mean per category
                 means = df.groupby(col)[self.target_col].mean()
                 self.mappings[col] = means.to_dict()
-        
+
+        self._compiled = None
         return self
 
     def transform(self, X):
         X_out = X.copy()
+        compiled = self.compile()
         for col in self.cols:
             if col in X_out.columns:
-                # Map means
-                # Use map, fillna with global_mean for unseen categories
-                if col in self.mappings:
-                    X_out[col] = X_out[col].map(self.mappings[col]).fillna(self.global_mean)
-                else:
-                    # If column somehow missing from mappings, fill global mean
-                    X_out[col] = self.global_mean
+                # Map means, global_mean for unseen categories
+                # (same result as .map(self.mappings[col]).fillna(self.global_mean))
+                X_out[col] = compiled.encode(col, X_out[col].to_numpy())
         return X_out
+
+    def compile(self):
+        # Array based form of the fitted mappings, built once and reused
+        compiled = getattr(self, '_compiled', None)
+        if compiled is None:
+            compiled = self._compiled = CompiledOptimization(self)
+        return compiled
+
+    def __getstate__(self):
+        # Compiled tables are rebuilt on demand; pickles keep the original format
+        state = self.__dict__.copy()
+        state.pop('_compiled', None)
+        return state
+
+
+class CompiledOptimization:
+    """Fitted Optimization encoder as integer codes + NumPy mean arrays (no DataFrames)."""
+
+    def __init__(self, encoder):
+        self.cols = list(encoder.cols)
+        self.global_mean = encoder.global_mean
+        self.codes = {}
+        self.means = {}
+        self.indexes = {}
+
+        for col in self.cols:
+            mapping = encoder.mappings.get(col, {})
+            categories = list(mapping.keys())
+            self.codes[col] = {category: code for code, category in enumerate(categories)}
+            self.indexes[col] = pd.Index(categories, dtype=object)
+            # Last slot holds global_mean: code -1 (unseen category) lands there
+            self.means[col] = np.array(list(mapping.values()) + [self.global_mean], dtype=np.float64)
+
+    def encode(self, col, values):
+        """Encode an array of categories for one column."""
+        codes = self.indexes[col].get_indexer(np.asarray(values, dtype=object))
+        return self.means[col][codes]
+
+    def encode_value(self, col, value):
+        """Encode a single category for one column."""
+        return float(self.means[col][self.codes[col].get(value, -1)])
+
+    def transform_record(self, record):
+        """Encode a single {column: value} dict, returning a new dict."""
+        out = dict(record)
+        for col in self.cols:
+            if col in out:
+                out[col] = self.encode_value(col, out[col])
+        return out
+
+    def transform_arrays(self, columns):
+        """Encode a {column: array} mapping of batch columns, returning a new mapping."""
+        out = dict(columns)
+        for col in self.cols:
+            if col in out:
+                out[col] = self.encode(col, out[col])
+        return out
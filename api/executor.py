@@ -0,0 +1,196 @@
+# Executor - CPU yoğun tahmin işlerini event loop dışında çalıştıran sınırlı havuzlar
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+import profiling
+from profiling import profiled
+
+# Bulk işleri ayrı süreçlerde (1) ya da sunucu sürecindeki thread'lerde (0) çalışır
+BULK_PROCESSES = os.environ.get("BULK_PROCESSES", "1") == "1"
+# Worker süreçlerinin önceliği (nice): CPU azken sunucu süreci önce çalışsın
+BULK_NICE = int(os.environ.get("BULK_NICE", "10"))
+
+
+class PoolSaturatedError(Exception):
+    """Havuz ve bekleme kuyruğu dolu - istek reddedilmeli (back-pressure)"""
+
+
+class InferencePool:
+    """Sabit sayıda worker thread + sınırlı bekleme kuyruğu
+
+    Aynı anda en fazla max_workers iş çalışır, max_queue iş sırada bekler;
+    fazlası PoolSaturatedError ile hemen reddedilir.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        """fn(*args)'ı havuzda çalıştır ve sonucunu bekle"""
+        self._acquire()
+        # contextvars (istek bağlamı) worker thread'e taşınsın; profil istendiyse iş o thread'de profillenir
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, profiled(fn), *args)
+        # Slot, iş bittiğinde (veya başlamadan iptal edildiğinde) boşalır
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturatedError(f"{self.name} pool is saturated")
+            self.in_flight += 1
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProcessInferencePool(InferencePool):
+    """InferencePool'un süreç sürümü: işler ayrı Python süreçlerinde, kendi GIL'leriyle çalışır
+
+    Büyük gövde ayrıştırma, JSON üretimi ve taramalar sunucu sürecinin GIL'ini tutmaz;
+    /health ve /api/predict gecikmesi bunlardan etkilenmez. İşler modül düzeyinde
+    fonksiyon olmalıdır (pickle). Worker'ın kaydettiği aşama süreleri, iz ayrıntıları ve
+    metrikler sonuçla birlikte döner ve bu süreçteki ize/metriklere eklenir.
+
+    start() çağrılmadıysa ya da istek CPU profili istiyorsa iş bu süreçte, thread'de çalışır.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, processes: bool = True):
+        super().__init__(name, max_workers, max_queue)
+        self.processes = processes
+        self._initializer = None
+        self._processes = None
+        self._warm_up = []
+
+    def start(self, initializer, *initargs):
+        """Worker süreçlerini başlat; her süreç önce initializer(*initargs) çalıştırır (ör. model yükleme)"""
+        if not self.processes:
+            return
+        self._initializer = (initializer, initargs)
+        self._processes = self._new_processes()
+
+    def _new_processes(self) -> ProcessPoolExecutor:
+        initializer, initargs = self._initializer
+        # fork değil spawn: sunucu sürecinin thread'leri (uvicorn, izleyici, OpenMP) kopyalanmasın
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+            initargs=(initializer, initargs)
+        )
+        # Süreçler ilk istekte değil şimdi açılıp yüklensin
+        self._warm_up = [executor.submit(_ping) for _ in range(self.max_workers)]
+        return executor
+
+    def ready(self) -> bool:
+        """Worker süreçleri yüklendi mi (süreç kullanılmıyorsa her zaman True)"""
+        return all(future.done() and future.exception() is None for future in self._warm_up)
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        wait(self._warm_up, timeout)
+        return self.ready()
+
+    async def run(self, fn, *args):
+        processes = self._processes
+        if processes is None or profiling.profiling_active():
+            return await super().run(fn, *args)
+        self._acquire()
+        try:
+            future = processes.submit(_run_job, fn, args)
+        except BrokenProcessPool:
+            self._release(None)
+            processes = self._restart(processes)
+            self._acquire()
+            future = processes.submit(_run_job, fn, args)
+        future.add_done_callback(self._release)
+        try:
+            result, stages, details, samples = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # Bir worker öldü (ör. bellek yetmedi): sonraki işler yeni süreçlerde çalışsın
+            self._restart(processes)
+            raise
+        metrics.REGISTRY.merge(samples)
+        trace = profiling.current_trace.get()
+        if trace is not None:
+            for stage, seconds in stages.items():
+                trace.add_stage(stage, seconds)
+            trace.details.update(details)
+        return result
+
+    def _restart(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is broken:
+                print(f"⚠️ {self.name} worker process died, restarting the pool")
+                self._processes = self._new_processes()
+            processes = self._processes
+        broken.shutdown(wait=False, cancel_futures=True)
+        return processes
+
+    def shutdown(self):
+        super().shutdown()
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_process(initializer, initargs):
+    if BULK_NICE and hasattr(os, "nice"):
+        os.nice(BULK_NICE)
+    initializer(*initargs)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_job(fn, args):
+    """Worker sürecinde: işi kendi iziyle çalıştır -> (sonuç, aşamalar, ayrıntılar, metrik örnekleri)"""
+    trace, token = profiling.start_trace()
+    try:
+        result = fn(*args)
+    finally:
+        profiling.end_trace(token)
+    return result, trace.stages, trace.details, metrics.REGISTRY.drain()
+
+
+# Tekil tahminler (/api/predict) - kısa işler
+predict_pool = InferencePool(
+    "predict",
+    max_workers=int(os.environ.get("PREDICT_WORKERS", "4")),
+    max_queue=int(os.environ.get("PREDICT_QUEUE_LIMIT", "64"))
+)
+
+# Uzun süren işler (/api/opportunities, /api/comparables, /api/predict/batch) - ayrı süreçler,
+# tekil tahminleri ve /health'i GIL üzerinden bekletmesin
+bulk_pool = ProcessInferencePool(
+    "bulk",
+    max_workers=int(os.environ.get("BULK_WORKERS", "2")),
+    max_queue=int(os.environ.get("BULK_QUEUE_LIMIT", "8")),
+    processes=BULK_PROCESSES
+)
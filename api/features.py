@@ -0,0 +1,390 @@
+# Features - Ham ilan verisinden / isteklerden model girdisine tek ortak özellik hattı
+#
+# Eğitim notebook'u, tests/calculate_metrics.py ve API (predictor) aynı fonksiyonları kullanır:
+#   clean_listings + fill_missing   ham CSV satırları -> temizlenmiş eğitim/değerlendirme tablosu
+#   listing_features                temizlenmiş ilanlar (processed_data) -> model kolonları
+#   request_features(_batch)        PredictRequest(ler) -> model kolonları
+#   compact_listings                API'de tutulan eğitim verisi -> category + küçük sayısal tipler
+# Tüm yollar kolon bazında (vektörel) çalışır; tekil istek yolu DataFrame oluşturmaz.
+
+import numpy as np
+import pandas as pd
+
+# Modelin eğitildiği kolon sırası (Pipeline.feature_names_in_)
+FEATURE_COLUMNS = [
+    'District', 'Neighborhood',
+    'm² (Net)', 'Rooms_Num', 'Age_Num', 'Room_Size_Ratio',
+    'Floor location', 'Heating', 'Number of bathrooms', 'Number of floors',
+    'Balcony_Bool', 'Elevator', 'Parking Lot', 'Security'
+]
+TARGET_COLUMN = 'Price'
+
+# Ham CSV'den okunan kolonlar (diğerleri hiç ayrıştırılmaz)
+RAW_COLUMNS = [
+    'Price', 'District', 'Neighborhood', 'm² (Net)', 'Number of rooms', 'Building Age',
+    'Floor location', 'Heating', 'Number of bathrooms', 'Number of floors',
+    'Balcony', 'Elevator', 'Parking Lot', 'Security'
+]
+# Metin kolonları her zaman string okunur: her parça (chunk) aynı şekilde ayrıştırılır
+RAW_TEXT_DTYPES = {'Price': str, 'Number of rooms': str, 'Building Age': str, 'Balcony': str}
+
+BINARY_COLUMNS = ['Balcony_Bool', 'Elevator', 'Parking Lot', 'Security']
+NUMERIC_COLUMNS = ['m² (Net)', 'Rooms_Num', 'Age_Num', 'Room_Size_Ratio', 'Number of bathrooms', 'Number of floors']
+CATEGORICAL_COLUMNS = ['District', 'Neighborhood', 'Floor location', 'Heating']
+
+# Eğitim verisinde olmayan (veya istekte boş gelen) alanlar için sunum tarafı varsayılanları
+SERVING_DEFAULTS = {
+    'Age_Num': 5,
+    'Floor': 3,
+    'Number of floors': 10,
+    'Heating': "Kombi",
+    'Number of bathrooms': 1,
+    'Balcony_Bool': 1,
+    'Elevator': 1,
+    'Parking Lot': 0,
+    'Security': 0
+}
+
+# Tahmin için tamsayıya çevrilmesi gereken (boş olamayacak) alanlar
+REQUIRED_FOR_SCORING = ('Floor', 'Number of floors', 'Rooms_Num')
+
+# Outlier filtresi: fiyatın %1 - %99 dilimleri
+PRICE_QUANTILES = (0.01, 0.99)
+
+
+# --- Ham veri temizleme (notebook ile aynı kurallar) ---
+
+def clean_price(price_str):
+    """Fiyat stringini sayısala çevirir."""
+    if pd.isna(price_str):
+        return np.nan
+    clean_str = str(price_str).replace(' TL', '').replace('.', '').strip()
+    try:
+        return int(clean_str)
+    except ValueError:
+        return np.nan
+
+
+def clean_rooms(room_str):
+    """'3+1' formatını toplam odaya çevirir."""
+    if pd.isna(room_str):
+        return np.nan
+    try:
+        parts = str(room_str).split('+')
+        return sum(int(p) for p in parts)
+    except ValueError:
+        if "Stüdyo" in str(room_str):
+            return 1
+        return np.nan
+
+
+def clean_age(age_str):
+    """Bina yaşı aralıklarını sayısala çevirir."""
+    if pd.isna(age_str):
+        return np.nan
+    s = str(age_str)
+    if "0" == s: return 0
+    if "1-5" in s: return 3
+    if "5-10" in s: return 7.5
+    if "11-15" in s: return 13
+    if "16-20" in s: return 18
+    if "21-25" in s: return 23
+    if "26-30" in s: return 28
+    if "31 ve üzeri" in s: return 35
+    try:
+        return int(s)
+    except ValueError:
+        return np.nan
+
+
+def clean_balcony(val):
+    if pd.isna(val): return 0
+    if 'Available' in str(val) or 'Yes' in str(val): return 1
+    return 0
+
+
+def clean_price_column(prices: pd.Series) -> pd.Series:
+    """clean_price'ın vektörel hali: ' TL' ve binlik ayraçları at, int() ile aynı değerleri kabul et
+
+    İşaretli/basit tamsayılar toplu çevrilir; geri kalan (nadir) değerler clean_price'a bırakılır,
+    böylece int()'in kabul ettiği her biçim ('+5', '1_000' vb.) aynı sonucu verir.
+    """
+    missing = prices.isna().to_numpy()
+    text = pd.Series(
+        np.char.strip(np.char.replace(np.char.replace(
+            np.asarray(prices.where(~missing, '').astype(str), dtype=str), ' TL', ''), '.', '')),
+        index=prices.index, dtype=object
+    )
+    # int64'e sığan ASCII tamsayılar; 'inf', '1e6' gibi to_numeric'in kabul ettiği biçimler hariç
+    simple = text.str.fullmatch(r'[+-]?[0-9]{1,18}').to_numpy(dtype=bool) & ~missing
+    cleaned = np.full(len(text), np.nan)
+    cleaned[simple] = pd.to_numeric(text[simple], errors='coerce').to_numpy(dtype=np.float64)
+    rest = ~simple & ~missing & (text != '').to_numpy()
+    if rest.any():
+        cleaned[rest] = prices[rest].map(clean_price).to_numpy(dtype=np.float64)
+    return pd.Series(cleaned, index=prices.index)
+
+
+def by_unique(values: pd.Series, clean) -> pd.Series:
+    """Kolon temizleyicisini yalnızca farklı değerlere uygula, sonucu satırlara yay
+
+    İlan kolonları az sayıda değeri tekrar eder ('3+1', '5-10 arası', yuvarlak fiyatlar):
+    her farklı değer bir kez temizlenir.
+    """
+    codes, uniques = pd.factorize(values)
+    # -1 kodu (boş değer) son elemana düşer
+    cleaned = clean(pd.Series(np.append(uniques.astype(object), np.nan), dtype=object))
+    return pd.Series(cleaned.to_numpy(dtype=np.float64)[codes], index=values.index)
+
+
+def _scalar(fn):
+    return lambda values: values.map(fn)
+
+
+# Ham kolon -> (model kolonu, kolon temizleyici)
+COLUMN_CLEANERS = {
+    'Price': ('Price', clean_price_column),
+    'Number of rooms': ('Rooms_Num', _scalar(clean_rooms)),
+    'Building Age': ('Age_Num', _scalar(clean_age)),
+    'Balcony': ('Balcony_Bool', _scalar(clean_balcony)),
+}
+
+
+def room_size_ratio(m2, rooms):
+    """Oda başına m² (oda sayısı 0 ise 1 kabul edilir)
+
+    float64'te hesaplanır: kompakt veride m² float32 olabilir, model float64 oranla eğitildi.
+    """
+    return np.asarray(m2, dtype=np.float64) / np.maximum(rooms, 1)
+
+
+def clean_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """Ham ilan satırları -> hedef + model kolonları (eksik değerler henüz doldurulmadan)
+
+    Fiyatı olmayan satırlar atılır. Veride olmayan kolonlar 0 ile doldurulur.
+    """
+    df = df.copy()
+    df[TARGET_COLUMN] = by_unique(df[TARGET_COLUMN], clean_price_column)
+    df = df[df[TARGET_COLUMN].notna()]
+
+    for col in ['m² (Gross)', 'm² (Net)', 'Number of bathrooms', 'Number of floors']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    for raw_col, (col, clean) in COLUMN_CLEANERS.items():
+        if raw_col != TARGET_COLUMN and raw_col in df.columns:
+            df[col] = by_unique(df[raw_col], clean)
+    if 'm² (Net)' in df.columns and 'Rooms_Num' in df.columns:
+        df['Room_Size_Ratio'] = room_size_ratio(df['m² (Net)'], df['Rooms_Num'])
+
+    columns = [TARGET_COLUMN] + FEATURE_COLUMNS
+    for col in columns:
+        if col not in df.columns:
+            df[col] = 0
+    df_model = df[columns].copy()
+
+    for col in BINARY_COLUMNS:
+        df_model[col] = pd.to_numeric(df_model[col], errors='coerce').fillna(0)
+    return df_model
+
+
+def fill_values(df_model: pd.DataFrame) -> dict:
+    """Sayısal kolonların doldurma değerleri (medyan)"""
+    return {col: df_model[col].median() for col in NUMERIC_COLUMNS}
+
+
+def fill_missing(df_model: pd.DataFrame, medians: dict = None) -> pd.DataFrame:
+    """Eksik sayısal değerleri medyanla, kategorikleri 'Unknown' ile doldur
+
+    medians verilmezse tablonun kendi medyanları kullanılır; parça parça işlemede
+    tüm veri setinin medyanları verilir.
+    """
+    if medians is None:
+        medians = fill_values(df_model)
+    for col in NUMERIC_COLUMNS:
+        df_model[col] = df_model[col].fillna(medians[col])
+    for col in CATEGORICAL_COLUMNS:
+        df_model[col] = df_model[col].fillna("Unknown")
+    return df_model
+
+
+def price_bounds(prices) -> tuple:
+    """Outlier filtresi sınırları (%1 ve %99 dilimleri)"""
+    lower, upper = np.quantile(np.asarray(prices, dtype=np.float64), PRICE_QUANTILES)
+    return float(lower), float(upper)
+
+
+def split_target(df_model: pd.DataFrame):
+    """(X, y): model kolonları eğitim sırasıyla ve hedef"""
+    return df_model[FEATURE_COLUMNS], df_model[TARGET_COLUMN]
+
+
+# --- Sunumda bellekte tutulan eğitim verisi ---
+
+def _downcast(values: np.ndarray) -> np.ndarray:
+    """Sayısal diziyi değer kaybetmeden en küçük tipe indir (tam sayılar int8/16/32, diğerleri float32)
+
+    Tip zaten en küçükse dizinin kendisi döner (kopya yok): paketten memory-map ile
+    açılan kolonlar mmap olarak kalır.
+    """
+    if not len(values):
+        return values
+    if values.dtype.kind in 'iu':
+        integral = True
+    else:
+        integral = bool(np.isfinite(values).all() and (values == np.trunc(values)).all())
+    if integral:
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if low >= info.min and high <= info.max:
+                return values if values.dtype == dtype else values.astype(dtype)
+        if values.dtype.kind in 'iu':
+            return values
+    if values.dtype == np.float32:
+        return values
+    single = values.astype(np.float32)
+    if np.array_equal(single.astype(values.dtype), values, equal_nan=True):
+        return single
+    return values
+
+
+def compact_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """Temizlenmiş ilanları kompakt tiplere çevir: metin kolonları category, sayılar kayıpsız küçük tipler
+
+    Değerler değişmez (float64'e geri çevrildiğinde birebir aynı); model girdileri ve
+    istatistikler etkilenmez, bellek birkaç kat azalır. Zaten kompakt kolonlar
+    (artifacts paketi export sırasında kompaktlanır) kopyalanmadan kullanılır.
+    """
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if name in CATEGORICAL_COLUMNS:
+            columns[name] = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            columns[name] = _downcast(series.to_numpy())
+        else:
+            columns[name] = series
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+# --- Sunum tarafı: istekler ve temizlenmiş ilanlar -> model kolonları ---
+
+def floor_location(floor: int, total_floors: int) -> str:
+    """Kat numarasından kat konumu kategorisi oluştur"""
+    if floor <= 0:
+        return "Zemin Kat"
+    elif floor == 1:
+        return "1. Kat"
+    elif floor == 2:
+        return "2. Kat"
+    elif floor == 3:
+        return "3. Kat"
+    elif floor >= total_floors:
+        return "En Üst Kat"
+    else:
+        return "Orta Kat"
+
+
+def floor_locations(floors: np.ndarray, total_floors: np.ndarray) -> np.ndarray:
+    """floor_location'ın dizi üzerinde çalışan versiyonu"""
+    return np.select(
+        [floors <= 0, floors == 1, floors == 2, floors == 3, floors >= total_floors],
+        ["Zemin Kat", "1. Kat", "2. Kat", "3. Kat", "En Üst Kat"],
+        default="Orta Kat"
+    ).astype(object)
+
+
+def request_features(request) -> dict:
+    """Tek isteği model özelliklerine (kolon -> değer) dönüştür"""
+    return {
+        'District': request.district,
+        'Neighborhood': request.location,  # frontend 'location' olarak gönderiyor
+        'm² (Net)': request.m2,
+        'Rooms_Num': request.rooms,
+        'Age_Num': request.building_age,
+        'Room_Size_Ratio': request.m2 / max(request.rooms, 1),
+        'Floor location': floor_location(request.floor, request.total_floors),
+        'Heating': request.heating or SERVING_DEFAULTS['Heating'],
+        'Number of bathrooms': request.bathrooms or SERVING_DEFAULTS['Number of bathrooms'],
+        'Number of floors': request.total_floors,
+        'Balcony_Bool': 1 if request.balcony else 0,
+        'Elevator': 1 if request.elevator else 0,
+        'Parking Lot': 1 if request.parking else 0,
+        'Security': 1 if request.security else 0
+    }
+
+
+def request_batch_features(requests: list) -> dict:
+    """Birden fazla isteği kolon dizilerine (kolon -> dizi) dönüştür"""
+    floors = np.array([r.floor for r in requests])
+    total_floors = np.array([r.total_floors for r in requests])
+    m2 = np.array([r.m2 for r in requests], dtype=np.float64)
+    rooms = np.array([r.rooms for r in requests])
+    heating = SERVING_DEFAULTS['Heating']
+    bathrooms = SERVING_DEFAULTS['Number of bathrooms']
+
+    return {
+        'District': [r.district for r in requests],
+        'Neighborhood': [r.location for r in requests],
+        'm² (Net)': m2,
+        'Rooms_Num': rooms,
+        'Age_Num': np.array([r.building_age for r in requests]),
+        'Room_Size_Ratio': room_size_ratio(m2, rooms),
+        'Floor location': floor_locations(floors, total_floors),
+        'Heating': [r.heating or heating for r in requests],
+        'Number of bathrooms': np.array([r.bathrooms or bathrooms for r in requests]),
+        'Number of floors': total_floors,
+        'Balcony_Bool': np.array([1 if r.balcony else 0 for r in requests]),
+        'Elevator': np.array([1 if r.elevator else 0 for r in requests]),
+        'Parking Lot': np.array([1 if r.parking else 0 for r in requests]),
+        'Security': np.array([1 if r.security else 0 for r in requests])
+    }
+
+
+def scoreable_mask(df: pd.DataFrame) -> np.ndarray:
+    """listing_features ile skorlanabilecek satırlar (kat/oda alanları dolu)"""
+    mask = np.ones(len(df), dtype=bool)
+    for col in REQUIRED_FOR_SCORING:
+        if col in df.columns:
+            mask &= df[col].notna().to_numpy()
+    return mask
+
+
+def listing_features(df: pd.DataFrame) -> dict:
+    """Temizlenmiş ilan satırlarından (processed_data) toplu model girdisi oluştur
+
+    Eksik kolonlar SERVING_DEFAULTS ile doldurulur; kat konumu, istek yolundaki
+    gibi kat numarasından hesaplanır.
+    """
+    n = len(df)
+
+    def column(name, default=np.nan):
+        if name in df.columns:
+            return df[name].to_numpy()
+        return np.full(n, SERVING_DEFAULTS.get(name, default))
+
+    m2 = column('m² (Net)')
+    rooms = column('Rooms_Num')
+    total_floors = column('Number of floors')
+    floor_loc = floor_locations(
+        np.trunc(column('Floor').astype(np.float64)),
+        np.trunc(total_floors.astype(np.float64))
+    )
+
+    return {
+        'District': column('District', None),
+        'Neighborhood': column('Neighborhood', None),
+        'm² (Net)': m2,
+        'Rooms_Num': rooms,
+        'Age_Num': column('Age_Num'),
+        'Room_Size_Ratio': room_size_ratio(m2, rooms),
+        'Floor location': floor_loc,
+        'Heating': column('Heating'),
+        'Number of bathrooms': column('Number of bathrooms'),
+        'Number of floors': total_floors,
+        'Balcony_Bool': column('Balcony_Bool'),
+        'Elevator': column('Elevator'),
+        'Parking Lot': column('Parking Lot'),
+        'Security': column('Security')
+    }
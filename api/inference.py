@@ -0,0 +1,234 @@
+# Inference - DataFrame kullanmayan derlenmiş model yolu
+
+import ctypes
+import threading
+
+import numpy as np
+import pandas as pd
+
+# SingleRowPredictor'ın dayandığı LightGBM iç API'si: lightgbm.basic'in özel adları ve C fonksiyonları.
+# Bunlar herkese açık API değildir; sürüm değişiminde yoklanır, eksikse Booster.predict kullanılır.
+SINGLE_ROW_MIN_LIGHTGBM = 4
+_LIGHTGBM_PRIVATE_NAMES = ('_LIB', '_safe_call', '_c_str')
+_LIGHTGBM_C_FUNCTIONS = (
+    'LGBM_BoosterPredictForMatSingleRowFastInit',
+    'LGBM_BoosterPredictForMatSingleRowFast',
+    'LGBM_FastConfigFree',
+)
+
+
+class CompiledPipeline:
+    """Encoder + sklearn Pipeline (OneHotEncoder + passthrough) + LightGBM'i dizi işlemlerine derler
+
+    Pipeline'ın ColumnTransformer adımı burada tekrar kurulur: one-hot kolonları
+    kategori -> pozisyon tablosuyla, passthrough kolonları sabit pozisyonlarla
+    doldurulur ve doğrudan LightGBM booster'ı çağrılır.
+    """
+
+    def __init__(self, booster, encoder, n_features: int, onehot: list, passthrough: list):
+        # onehot: [(kolon, kategoriler, başlangıç pozisyonu)], passthrough: [(kolon, pozisyon)]
+        self.booster = booster
+        self.encoder = encoder.compile()
+        self.n_features = int(n_features)
+        self.passthrough = [(column, int(position)) for column, position in passthrough]
+
+        # (kolon, {kategori: pozisyon}, pd.Index, başlangıç pozisyonu)
+        self.onehot = []
+        for column, categories, start in onehot:
+            categories = list(categories)
+            positions = {category: start + i for i, category in enumerate(categories)}
+            self.onehot.append((column, positions, pd.Index(categories, dtype=object), int(start)))
+
+        self.encoded_columns = set(self.encoder.cols)
+
+        # Tek satır için LightGBM C API hızlı yolu (kullanılamazsa Booster.predict)
+        self.single_row = SingleRowPredictor.create(booster, self.n_features)
+
+    @classmethod
+    def from_pipeline(cls, model, encoder) -> "CompiledPipeline":
+        """Eğitilmiş sklearn Pipeline'ından (ColumnTransformer + LGBMRegressor) derle"""
+        steps = getattr(model, 'steps', None)
+        if not steps or len(steps) != 2:
+            raise ValueError("Expected a (preprocessor, regressor) Pipeline")
+        preprocessor, regressor = steps[0][1], steps[1][1]
+        booster = getattr(regressor, 'booster_', None)
+        if booster is None:
+            raise ValueError("Regressor is not a fitted LightGBM model")
+        if getattr(preprocessor, 'sparse_output_', False):
+            raise ValueError("Sparse preprocessor output is not supported")
+
+        feature_names = list(preprocessor.feature_names_in_)
+        onehot = []
+        passthrough = []
+        for name, transformer, columns in preprocessor.transformers_:
+            output = preprocessor.output_indices_[name]
+            if transformer == 'drop' or output.start == output.stop:
+                continue
+            if name == 'remainder' or transformer == 'passthrough' or _is_identity(transformer):
+                columns = [feature_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+                for offset, column in enumerate(columns):
+                    passthrough.append((column, output.start + offset))
+            elif _is_plain_onehot(transformer):
+                position = output.start
+                for column, categories in zip(columns, transformer.categories_):
+                    onehot.append((column, categories.tolist(), position))
+                    position += len(categories)
+            else:
+                raise ValueError(f"Unsupported transformer: {name}")
+
+        return cls(booster, encoder, regressor.n_features_in_, onehot, passthrough)
+
+    def layout(self) -> dict:
+        """Booster dışındaki derlenmiş yapı (JSON'a yazılabilir)"""
+        return {
+            "n_features": self.n_features,
+            "onehot": [
+                {"column": column, "categories": index.tolist(), "start": start}
+                for column, _, index, start in self.onehot
+            ],
+            "passthrough": [
+                {"column": column, "position": position}
+                for column, position in self.passthrough
+            ]
+        }
+
+    def build_vector(self, features: dict) -> np.ndarray:
+        """Tek kaydı (kolon -> değer) model matrisine (1 x n_features) dönüştür"""
+        row = np.zeros((1, self.n_features), dtype=np.float64)
+        values = row[0]
+        for column, positions, _, _ in self.onehot:
+            position = positions.get(features[column])
+            if position is not None:
+                values[position] = 1.0
+        for column, position in self.passthrough:
+            value = features[column]
+            if column in self.encoded_columns:
+                value = self.encoder.encode_value(column, value)
+            values[position] = value
+        return row
+
+    def build_matrix(self, columns: dict, n: int) -> np.ndarray:
+        """Kolon dizilerini (kolon -> dizi) model matrisine (n x n_features) dönüştür"""
+        matrix = np.zeros((n, self.n_features), dtype=np.float64)
+        rows = np.arange(n)
+        for column, _, index, start in self.onehot:
+            codes = index.get_indexer(np.asarray(columns[column], dtype=object))
+            known = codes >= 0
+            matrix[rows[known], start + codes[known]] = 1.0
+        for column, position in self.passthrough:
+            values = columns[column]
+            if column in self.encoded_columns:
+                values = self.encoder.encode(column, values)
+            matrix[:, position] = values
+        return matrix
+
+    def predict_record(self, features: dict) -> float:
+        """Tek kayıt için tahmin"""
+        row = self.build_vector(features)
+        if self.single_row is not None:
+            return self.single_row.predict(row[0])
+        return float(self.booster.predict(row)[0])
+
+    def predict_columns(self, columns: dict, n: int) -> np.ndarray:
+        """Kolon dizileri için toplu tahmin"""
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+        return np.asarray(self.booster.predict(self.build_matrix(columns, n)), dtype=np.float64)
+
+
+class SingleRowPredictor:
+    """LightGBM'in tek satır hızlı tahmin API'si (LGBM_BoosterPredictForMatSingleRowFast)
+
+    Booster.predict her çağrıda tahminci kurar ve girdiyi doğrular; burada
+    yapılandırma bir kez hazırlanır. FastConfig thread'ler arasında paylaşılmaz.
+    """
+
+    def __init__(self, booster, n_features: int):
+        from lightgbm import basic
+
+        self._lib = basic._LIB
+        self._safe_call = basic._safe_call
+        self._c_str = basic._c_str
+        self._booster = booster
+        self._n_features = n_features
+        # Pipeline.predict ile aynı iterasyon seçimi (early stopping varsa en iyi iterasyon)
+        self._num_iteration = booster.best_iteration if booster.best_iteration > 0 else -1
+        self._local = threading.local()
+        self._configs = []
+        self._lock = threading.Lock()
+        self._config()
+
+    @classmethod
+    def create(cls, booster, n_features: int):
+        """Hızlı yolu kur ve Booster.predict ile doğrula; kullanılamıyorsa nedenini yazıp None döndür"""
+        import lightgbm
+        from lightgbm import basic
+
+        try:
+            major = int(lightgbm.__version__.split('.')[0])
+            if major < SINGLE_ROW_MIN_LIGHTGBM:
+                raise RuntimeError(f"requires lightgbm>={SINGLE_ROW_MIN_LIGHTGBM}")
+            missing = [name for name in _LIGHTGBM_PRIVATE_NAMES if not hasattr(basic, name)]
+            missing += [name for name in _LIGHTGBM_C_FUNCTIONS
+                        if not missing and not hasattr(basic._LIB, name)]
+            if missing:
+                raise RuntimeError(f"missing {', '.join(missing)}")
+            predictor = cls(booster, n_features)
+            # İmza değişikliği çökme yerine yanlış sonuç da verebilir: bilinen bir satırla karşılaştır
+            probe = np.zeros((1, n_features), dtype=np.float64)
+            expected = float(booster.predict(probe, num_iteration=predictor._num_iteration)[0])
+            if predictor.predict(probe[0]) != expected:
+                raise RuntimeError("probe prediction differs from Booster.predict")
+        except Exception as e:
+            print(f"⚠️ LightGBM {lightgbm.__version__} single-row fast path disabled, using Booster.predict: {e}")
+            return None
+        return predictor
+
+    def _config(self):
+        config = getattr(self._local, 'config', None)
+        if config is None:
+            handle = ctypes.c_void_p()
+            self._safe_call(self._lib.LGBM_BoosterPredictForMatSingleRowFastInit(
+                self._booster._handle,
+                ctypes.c_int(0),  # C_API_PREDICT_NORMAL
+                ctypes.c_int(0),  # start_iteration
+                ctypes.c_int(self._num_iteration),
+                ctypes.c_int(1),  # C_API_DTYPE_FLOAT64
+                ctypes.c_int32(self._n_features),
+                self._c_str("num_threads=1"),
+                ctypes.byref(handle)
+            ))
+            config = self._local.config = (handle, np.empty(1, dtype=np.float64), ctypes.c_int64())
+            with self._lock:
+                self._configs.append(handle)
+        return config
+
+    def predict(self, row: np.ndarray) -> float:
+        """Tek satır (n_features, float64, contiguous) için tahmin"""
+        handle, out, out_len = self._config()
+        self._safe_call(self._lib.LGBM_BoosterPredictForMatSingleRowFast(
+            handle,
+            row.ctypes.data_as(ctypes.c_void_p),
+            ctypes.byref(out_len),
+            out.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+        ))
+        return float(out[0])
+
+    def __del__(self):
+        for handle in getattr(self, '_configs', []):
+            self._lib.LGBM_FastConfigFree(handle)
+
+
+def _is_identity(transformer) -> bool:
+    # remainder='passthrough' yeni sklearn sürümlerinde FunctionTransformer(func=None) olarak saklanır
+    return type(transformer).__name__ == 'FunctionTransformer' and transformer.func is None
+
+
+def _is_plain_onehot(transformer) -> bool:
+    return (
+        type(transformer).__name__ == 'OneHotEncoder'
+        and transformer.drop is None
+        and transformer.handle_unknown in ('ignore', 'infrequent_if_exist')
+        and not getattr(transformer, '_infrequent_enabled', False)
+        and not getattr(transformer, 'sparse_output', False)
+    )
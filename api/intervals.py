@@ -0,0 +1,50 @@
+# Prediction Intervals - İlçe bazında artık (fiyat / tahmin) dilimlerinden güven aralığı
+
+import numpy as np
+import pandas as pd
+
+from listing_groups import ListingGroups
+
+# Aralığın alt/üst dilimleri: %80 tahmin aralığı
+INTERVAL_QUANTILES = (0.10, 0.90)
+# İlçe dilimi için gereken minimum skorlanmış ilan sayısı (azsa genel dilimler)
+MIN_DISTRICT_SAMPLES = 30
+
+
+class ResidualIntervals:
+    """Eğitim ilanlarında fiyat / adil değer oranının ilçe bazında alt ve üst dilimleri
+
+    Aralık = tahmin × (alt oran, üst oran); istekte yalnızca bir sözlük araması yapılır.
+    Oranlar modelin eğitim verisindeki artıklarıdır (örneklem içi), bu yüzden
+    gerçek kapsama oranı nominal düzeyin biraz altında kalabilir.
+    """
+
+    def __init__(self, data: pd.DataFrame, groups: ListingGroups = None,
+                 quantiles: tuple = INTERVAL_QUANTILES):
+        groups = groups if groups is not None else ListingGroups(data)
+        fair_values = data['fair_value'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = data['Price'].to_numpy(dtype=np.float64) / fair_values
+        ratios[~(fair_values > 0)] = np.nan
+        # İlçe grupları bu dizide bitişik aralıklardır
+        grouped = ratios[groups.order]
+
+        self.quantiles = quantiles
+        self.level = round(quantiles[1] - quantiles[0], 4)
+        self.global_factors = self._factors(ratios)
+        self.district_factors = {}
+        for district, rows in groups.district_slices.items():
+            factors = self._factors(grouped[rows])
+            if factors is not None:
+                self.district_factors[district] = factors
+
+    def _factors(self, ratios: np.ndarray):
+        ratios = ratios[np.isfinite(ratios)]
+        if len(ratios) < MIN_DISTRICT_SAMPLES:
+            return None
+        lower, upper = np.quantile(ratios, self.quantiles)
+        return float(lower), float(upper)
+
+    def lookup(self, district: str):
+        """(alt oran, üst oran): ilçe dilimleri, yoksa tüm verinin dilimleri (veri yetersizse None)"""
+        return self.district_factors.get(district, self.global_factors)
@@ -0,0 +1,68 @@
+# Listing Groups - İlçe/mahalle kodlarına göre sıralanmış satır aralıkları
+
+import numpy as np
+import pandas as pd
+
+
+class ListingGroups:
+    """Eğitim satırlarını ilçe/mahalle koduna göre sıralayıp her grubun aralığını tutar
+
+    Bir grubun satırları order[aralık] dilimidir; nesne (string) karşılaştırması yapılmaz.
+    Veri sırası değişmez: sıralama ayrı bir permütasyon olarak saklanır. Kararlı
+    sıralama sayesinde bir ilçe+mahalle grubunun içinde satırlar veri sırasındadır.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        district = pd.Categorical(data['District'])
+        neighborhood = pd.Categorical(data['Neighborhood'])
+        district_codes = district.codes.astype(np.int64)
+        neighborhood_codes = neighborhood.codes.astype(np.int64)
+
+        # İlçe, sonra mahalle: ilçe aralıkları ilçe+mahalle aralıklarından oluşur
+        self.order = np.lexsort((neighborhood_codes, district_codes))
+        sorted_districts = district_codes[self.order]
+        sorted_neighborhoods = neighborhood_codes[self.order]
+        self.district_slices = {
+            district.categories[code]: rows
+            for code, rows in self._ranges(sorted_districts)
+        }
+        self.pair_slices = {
+            (district.categories[sorted_districts[rows.start]], neighborhood.categories[code]): rows
+            for code, rows in self._ranges(sorted_neighborhoods, sorted_districts)
+            if sorted_districts[rows.start] >= 0
+        }
+
+        # İlçeden bağımsız mahalle grupları (küçük/bilinmeyen ilçede kullanılır)
+        self.neighborhood_order = np.argsort(neighborhood_codes, kind='stable')
+        self.neighborhood_slices = {
+            neighborhood.categories[code]: rows
+            for code, rows in self._ranges(neighborhood_codes[self.neighborhood_order])
+        }
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @staticmethod
+    def _ranges(codes: np.ndarray, *outer: np.ndarray):
+        """Sıralı kod dizisindeki (ve dış gruplardaki) değişim noktaları -> (kod, slice); boş (-1) kodlar atlanır"""
+        n = len(codes)
+        if n == 0:
+            return
+        change = np.zeros(n, dtype=bool)
+        change[0] = True
+        for values in (codes,) + outer:
+            change[1:] |= values[1:] != values[:-1]
+        starts = np.flatnonzero(change)
+        ends = np.append(starts[1:], n)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if codes[start] >= 0:
+                yield int(codes[start]), slice(start, end)
+
+    def items(self, kind: str):
+        """(anahtar, veri satır pozisyonları) çiftleri; kind: 'district', 'pair' ya da 'neighborhood'"""
+        if kind == 'neighborhood':
+            order, slices = self.neighborhood_order, self.neighborhood_slices
+        else:
+            order, slices = self.order, self.district_slices if kind == 'district' else self.pair_slices
+        for key, rows in slices.items():
+            yield key, order[rows]
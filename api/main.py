@@ -1,33 +1,78 @@
 # FastAPI Main Application
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import secrets
+import time
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from models import (
-    PredictRequest, PredictResponse, HealthResponse,
-    OpportunitiesRequest, OpportunitiesResponse, OpportunityItem
+    PredictRequest, PredictResponse, HealthResponse, ReadinessResponse,
+    BatchPredictResponse, CacheStatsResponse,
+    OpportunitiesRequest, OpportunitiesResponse, OpportunityItem, ReloadResponse,
+    ComparablesRequest, ComparablesResponse, ComparableItem, RegionAnalyticsResponse,
+    DistrictsResponse
 )
-from predictor import predictor
+import bulk_worker
+import metrics
+import profiling
+from predictor import ReloadInProgressError, predictor
+from executor import PoolSaturatedError, predict_pool, bulk_pool
+from bulk_worker import JobError
+from batcher import PREDICT_BATCH_MAX_SIZE, PREDICT_BATCH_WAIT_MS, MicroBatcher
+
+# Yönetim uç noktaları (model yeniden yükleme) için token; boşsa bu uç noktalar kapalı
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup ve shutdown event handler"""
-    # Startup: Model ve encoder'ı yükle
+    # Startup: Model ve encoder'ı yükle (eğitim verisi arka planda hazırlanır)
     try:
-        predictor.load()
-        print("🚀 API hazır!")
+        await asyncio.to_thread(predictor.load)
+        timings = ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in predictor.startup_timings.items())
+        print(f"🚀 API hazır! ({timings})")
     except Exception as e:
         print(f"❌ Model yükleme hatası: {e}")
         raise e
     
+    # Toplu/fırsat/emsal işleri için worker süreçleri (her biri modeli aynı kaynaklardan yükler)
+    bulk_pool.start(bulk_worker.initialize, predictor.load_args())
+    
+    # Model dosyaları değişirse arka planda yeniden yükle (MODEL_WATCH_INTERVAL)
+    predictor.start_watcher()
+    
     yield
     
     # Shutdown
+    predictor.stop_watcher()
+    predict_pool.shutdown()
+    bulk_pool.shutdown()
     print("👋 API kapatılıyor...")
 
 
+def _require_admin(token: str):
+    """X-Admin-Token başlığını ADMIN_TOKEN ile karşılaştır"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not token or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def _saturated(e: PoolSaturatedError) -> HTTPException:
+    """Havuz doluyken istemciye tekrar deneme süresiyle 503 döndür"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
 # Create FastAPI app
 app = FastAPI(
     title="İstanbul Emlak Değerleme API",
@@ -36,6 +81,125 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+class MetricsMiddleware:
+    """Her HTTP isteği için uç nokta/durum kodu sayacı ve gecikme histogramı (saf ASGI)"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Etiket olarak yol şablonu (ör. /api/predict); eşleşmeyen yollar tek etikette toplanır
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            metrics.observe_request(endpoint, scope["method"], status[0], time.perf_counter() - started)
+
+
+class RequestTraceMiddleware:
+    """İstek izi: yavaş istek günlüğü ve admin'e özel CPU profili (saf ASGI)
+    
+    Profil: X-Profile: 1 başlığı veya ?profile=1 + X-Admin-Token. Havuzda çalışan iş
+    cProfile ile profillenir, PROFILE_DIR'e yazılır; dosya adı X-Profile yanıt başlığında döner.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        profile = _profile_requested(scope, headers)
+        if profile:
+            try:
+                _require_admin(headers.get(b"x-admin-token", b"").decode("latin-1"))
+            except HTTPException as e:
+                await JSONResponse({"detail": e.detail}, status_code=e.status_code)(scope, receive, send)
+                return
+        elif profiling.SLOW_REQUEST_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+        
+        trace, token = profiling.start_trace(profile)
+        started = time.perf_counter()
+        status = [500]
+        profile_name = [None]
+        body = bytearray()
+        body_truncated = [False]
+        
+        async def receive_with_body():
+            message = await receive()
+            if message["type"] == "http.request" and not body_truncated[0]:
+                chunk = message.get("body", b"")
+                room = profiling.MAX_LOGGED_BODY - len(body)
+                if len(chunk) > room:
+                    body_truncated[0] = True
+                    chunk = chunk[:room]
+                body.extend(chunk)
+            return message
+        
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                # Havuzdaki iş yanıt başlamadan biter: profil bu noktada tamamdır
+                if profile:
+                    profile_name[0] = profiling.save_profile(trace, scope["method"], scope["path"])
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", []), (b"x-profile", profile_name[0].encode())]
+                    }
+            await send(message)
+        
+        try:
+            await self.app(scope, receive_with_body, send_with_profile)
+        finally:
+            profiling.end_trace(token)
+            elapsed = time.perf_counter() - started
+            if 0 < profiling.SLOW_REQUEST_SECONDS <= elapsed:
+                profiling.log_slow_request(
+                    trace, scope["method"], scope["path"], scope["query_string"].decode("latin-1"),
+                    status[0], elapsed, bytes(body), body_truncated[0],
+                    model_version=predictor.model_version, profile=profile_name[0]
+                )
+
+
+def _profile_requested(scope, headers: dict) -> bool:
+    if headers.get(b"x-profile", b"") in (b"1", b"true"):
+        return True
+    query = scope["query_string"]
+    if b"profile" not in query:
+        return False
+    return parse_qs(query.decode("latin-1")).get("profile", [""])[-1] in ("1", "true")
+
+
+def _collect_pool_metrics():
+    for pool in (predict_pool, bulk_pool):
+        stats = pool.stats()
+        metrics.POOL_IN_FLIGHT.labels(pool.name).set(stats["in_flight"])
+        metrics.POOL_REJECTED.labels(pool.name).set_total(stats["rejected"])
+
+
+metrics.REGISTRY.add_collector(_collect_pool_metrics)
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestTraceMiddleware)
+
 # CORS middleware - Frontend erişimi için
 app.add_middleware(
     CORSMiddleware,
@@ -52,20 +216,44 @@ async def root():
     return HealthResponse(
         status="ok",
         model_loaded=predictor.model_loaded,
-        encoder_loaded=predictor.encoder_loaded
+        encoder_loaded=predictor.encoder_loaded,
+        model_version=predictor.model_version
     )
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Liveness: süreç ayakta ve istek kabul ediyor"""
     return HealthResponse(
         status="ok",
         model_loaded=predictor.model_loaded,
-        encoder_loaded=predictor.encoder_loaded
+        encoder_loaded=predictor.encoder_loaded,
+        model_version=predictor.model_version
     )
 
 
+@app.get("/health/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response):
+    """Readiness: model, eğitim verisi (fırsat indeksi) ve bulk worker süreçleri hazır; değilse 503"""
+    readiness = predictor.readiness()
+    readiness["bulk_workers_ready"] = bulk_pool.ready()
+    readiness["ready"] = readiness["ready"] and readiness["bulk_workers_ready"]
+    if not readiness["ready"]:
+        response.status_code = 503
+    return ReadinessResponse(**readiness)
+
+
+# Eşzamanlı /api/predict istekleri birkaç milisaniye toplanıp tek model çağrısında çalışır;
+# aynı içerikli istekler tek kez hesaplanır
+predict_batcher = MicroBatcher(
+    "predict",
+    lambda requests: predict_pool.run(predictor.predict_many, requests),
+    max_size=PREDICT_BATCH_MAX_SIZE,
+    max_wait=PREDICT_BATCH_WAIT_MS / 1000,
+    key=lambda request: tuple(request.__dict__.values())
+)
+
+
 @app.post("/api/predict", response_model=PredictResponse)
 async def predict(request: PredictRequest):
     """
@@ -84,18 +272,106 @@ async def predict(request: PredictRequest):
     - **fair_value**: Model tahmini
     - **advice**: FIRSAT / NORMAL / PAHALI
     - **diff_percent**: Fiyat farkı yüzdesi
-    - **region_stats**: Bölge istatistikleri
-    - **confidence**: Güven aralığı
+    - **region_stats**: Bölge istatistikleri (eğitim verisi hazırlanırken null)
+    - **confidence**: Güven aralığı (eğitim verisi hazırlanırken ±5% bant, level null)
     """
     try:
-        result = predictor.predict(request)
+        # CPU yoğun iş event loop dışında: /health ve diğer istekler beklemez.
+        # Profil istenen istek batch'e girmez: iş bu isteğin bağlamında profillenmeli
+        if predict_batcher.enabled and not profiling.profiling_active():
+            result = await predict_batcher.submit(request)
+        else:
+            result = await predict_pool.run(predictor.predict, request)
         return PredictResponse(**result)
+    except PoolSaturatedError as e:
+        raise _saturated(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/opportunities", response_model=OpportunitiesResponse)
-async def get_opportunities(request: OpportunitiesRequest):
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus metin formatında metrikler"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/cache/stats", response_model=CacheStatsResponse)
+async def cache_stats():
+    """Tahmin önbelleği isabet/ıska/atılma sayaçları"""
+    return CacheStatsResponse(**predictor.cache_stats())
+
+
+@app.post(
+    "/api/predict/batch",
+    response_model=BatchPredictResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/PredictRequest"}}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            }
+        }
+    }
+)
+async def predict_batch(request: Request):
+    """
+    Toplu ev fiyat tahmini
+    
+    Gövde: PredictRequest listesi (JSON dizi) veya her satırda bir istek (NDJSON).
+    application/json gövdesi dizi değilse (ör. tek nesne) 422 döner.
+    Tüm geçerli öğeler tek bir encoder/model çağrısıyla tahmin edilir.
+    
+    Returns:
+    - **results**: Her öğe için sonuç veya hata (istek sırasıyla)
+    - **succeeded** / **failed**: Başarılı ve hatalı öğe sayıları
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        # Ayrıştırma, doğrulama, tahmin ve JSON üretimi bulk havuzunda
+        content = await bulk_pool.run(bulk_worker.run_batch, predictor.signature, body, content_type)
+    except PoolSaturatedError as e:
+        raise _saturated(e)
+    except JobError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return Response(content=content, media_type="application/json")
+
+
+def _cursor_filters(request: OpportunitiesRequest) -> str:
+    """Cursor'un ait olduğu filtrelerin kısa özeti (farklı filtreyle kullanım reddedilir)"""
+    filters = [request.district, request.neighborhood, request.m2, request.rooms, request.rank]
+    return hashlib.sha256(json.dumps(filters, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def _encode_cursor(request: OpportunitiesRequest, model_version: str, offset: int) -> str:
+    payload = json.dumps({"v": model_version, "f": _cursor_filters(request), "o": offset})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(request: OpportunitiesRequest) -> tuple:
+    """İstekteki cursor -> (offset, model sürümü); cursor yoksa ilk sayfa"""
+    if not request.cursor:
+        return 0, None
+    try:
+        padded = request.cursor + "=" * (-len(request.cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset, version, filters = int(payload["o"]), payload["v"], payload["f"]
+    except (ValueError, KeyError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0 or filters != _cursor_filters(request):
+        raise HTTPException(status_code=400, detail="Cursor does not match the request filters")
+    return offset, version
+
+
+@app.post(
+    "/api/opportunities",
+    response_model=OpportunitiesResponse,
+    responses={200: {"content": {"application/x-ndjson": {"schema": {"type": "string"}}}}}
+)
+async def get_opportunities(request: OpportunitiesRequest, accept: str = Header(default="")):
     """
     Benzer özelliklerde fırsat evleri bul
     
@@ -103,31 +379,177 @@ async def get_opportunities(request: OpportunitiesRequest):
     - **neighborhood**: Mevcut mahalle (opsiyonel)
     - **m2**: Hedef metrekare (opsiyonel)
     - **rooms**: Hedef oda sayısı (opsiyonel)
-    - **limit**: Maksimum sonuç sayısı (varsayılan: 10)
+    - **limit**: Sayfa boyutu (varsayılan: 10, en fazla 50)
+    - **rank**: "discount" (en yüksek indirim) ya da "similarity" (hedefe en benzer indirimli ilanlar)
+    - **cursor**: Önceki yanıtın next_cursor değeri; sıralama model sürümü boyunca sabittir
     
     Returns:
     - **opportunities**: Fırsat listesi (en düşük farktan başlayarak)
-    - **total_found**: Toplam bulunan fırsat sayısı
+    - **total_found**: Filtrelere uyan toplam fırsat sayısı
+    - **next_cursor**: Sonraki sayfa (son sayfada boş)
+    
+    **Accept: application/x-ndjson** ile (cursor'dan itibaren) tüm fırsatlar satır satır akıtılır;
+    toplam sayı ve model sürümü X-Total-Found / X-Model-Version başlıklarında döner.
     """
+    if not predictor.data_ready.is_set():
+        raise HTTPException(status_code=503, detail="Training data is still loading", headers={"Retry-After": "1"})
+    offset, cursor_version = _decode_cursor(request)
+    stream = "application/x-ndjson" in accept
+    filters = (request.district, request.neighborhood, request.m2, request.rooms)
     try:
-        opportunities = predictor.get_opportunities(
-            district=request.district,
-            neighborhood=request.neighborhood,
-            target_m2=request.m2,
-            target_rooms=request.rooms,
-            limit=request.limit
+        if stream:
+            total, version, content = await bulk_pool.run(
+                bulk_worker.opportunities_stream, predictor.signature, filters, request.rank, offset
+            )
+        else:
+            page = await bulk_pool.run(
+                bulk_worker.opportunities_page, predictor.signature, filters, request.limit, request.rank, offset
+            )
+            version = page["model_version"]
+    except PoolSaturatedError as e:
+        raise _saturated(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Yeniden yüklemeden sonra sıralama değişir: eski cursor ile devam edilmez
+    if cursor_version is not None and cursor_version != version:
+        raise HTTPException(
+            status_code=409, detail=f"Cursor belongs to model version {cursor_version}, restart from the first page"
         )
-        
-        opportunity_items = [OpportunityItem(**opp) for opp in opportunities]
-        
-        return OpportunitiesResponse(
-            opportunities=opportunity_items,
-            total_found=len(opportunity_items)
+    
+    if stream:
+        headers = {"X-Total-Found": str(total), "X-Model-Version": version or ""}
+        return Response(content=content, media_type="application/x-ndjson", headers=headers)
+    
+    next_offset = offset + len(page["opportunities"])
+    return OpportunitiesResponse(
+        opportunities=[OpportunityItem(**opp) for opp in page["opportunities"]],
+        total_found=page["total_found"],
+        next_cursor=_encode_cursor(request, version, next_offset) if next_offset < page["total_found"] else None,
+        model_version=version
+    )
+
+
+@app.post("/api/comparables", response_model=ComparablesResponse)
+async def get_comparables(request: ComparablesRequest):
+    """
+    Verilen ilana en benzer eğitim ilanları (emsaller)
+    
+    Benzerlik m², oda, bina yaşı, kat, toplam kat, banyo ve olanaklar üzerinden ölçülür;
+    verilmeyen özellikler aramada nötr sayılır.
+    
+    Returns:
+    - **comparables**: En benzerden başlayarak en fazla k ilan (mesafesiyle)
+    - **scope**: Aramanın yapıldığı grup (neighborhood, district ya da all)
+    """
+    if not predictor.data_ready.is_set():
+        raise HTTPException(status_code=503, detail="Training data is still loading", headers={"Retry-After": "1"})
+    try:
+        comparables, scope, version = await bulk_pool.run(
+            bulk_worker.comparables, predictor.signature, request, request.k
+        )
+        return ComparablesResponse(
+            comparables=[ComparableItem(**item) for item in comparables],
+            scope=scope,
+            model_version=version
         )
+    except PoolSaturatedError as e:
+        raise _saturated(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Bölge özetleri ve ilçe listesi yalnızca model yeniden yüklenince değişir; ETag ile yeniden doğrulanır
+ANALYTICS_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+DISTRICTS_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _cached_json(body: bytes, etag: str, cache_control: str, if_none_match: str) -> Response:
+    """Hazır JSON gövdesi; istemcinin kopyası güncelse gövdesiz 304"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/analytics/regions", response_model=RegionAnalyticsResponse)
+async def get_region_analytics(
+    district: str = Query(default=None, description="Yalnızca bu ilçe"),
+    neighborhoods: bool = Query(default=True, description="Mahalle özetleri dahil edilsin mi"),
+    if_none_match: str = Header(default="")
+):
+    """
+    İlçe ve mahalle bazında piyasa özetleri
+    
+    Her bölge için ilan sayısı, fiyat ve m² fiyatı dilimleri, model tahminine göre
+    medyan fark ve FIRSAT ilanlarının payı. Özetler veri yüklenirken bir kez hesaplanır;
+    yanıt ETag taşır, **If-None-Match** eşleşirse 304 döner.
+    """
+    if not predictor.data_ready.is_set():
+        raise HTTPException(status_code=503, detail="Training data is still loading", headers={"Retry-After": "1"})
+    cached = predictor.get_region_analytics(district, neighborhoods)
+    if cached is None:
+        if predictor.data_error is not None:
+            raise HTTPException(status_code=500, detail=predictor.data_error)
+        raise HTTPException(status_code=404, detail=f"Unknown district: {district}")
+    
+    return _cached_json(*cached, ANALYTICS_CACHE_CONTROL, if_none_match)
+
+
+@app.get("/api/districts", response_model=DistrictsResponse)
+async def get_districts(if_none_match: str = Header(default="")):
+    """
+    Eğitim verisindeki ilçeler ve mahalleleri (form seçenekleri)
+    
+    Liste veri yüklenirken bir kez üretilir; ETag içerikten türetilir, **If-None-Match**
+    eşleşirse 304 döner.
+    """
+    if not predictor.data_ready.is_set():
+        raise HTTPException(status_code=503, detail="Training data is still loading", headers={"Retry-After": "1"})
+    cached = predictor.get_districts()
+    if cached is None:
+        raise HTTPException(status_code=500, detail=predictor.data_error or "District list is not available")
+    return _cached_json(*cached, DISTRICTS_CACHE_CONTROL, if_none_match)
+
+
+@app.post("/api/admin/reload", response_model=ReloadResponse)
+async def reload_model(x_admin_token: str = Header(default="")):
+    """
+    Model, encoder ve eğitim verisini kesintisiz yeniden yükle
+    
+    Yeni sürüm arka planda yüklenip ısıtılır, sonra atomik olarak devreye alınır;
+    devam eden istekler eski sürümle tamamlanır. Hata olursa eski sürüm kalır.
+    Başlık: **X-Admin-Token** (ADMIN_TOKEN)
+    """
+    _require_admin(x_admin_token)
+    try:
+        result = await asyncio.to_thread(predictor.reload)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous model kept: {e}")
+    return ReloadResponse(**result)
+
+
+@app.get("/api/admin/profiles/{name}", response_class=PlainTextResponse)
+async def get_profile(name: str, x_admin_token: str = Header(default="")):
+    """
+    Kayıtlı istek profilinin özeti (kümülatif süreye göre ilk fonksiyonlar)
+    
+    Ham .prof dosyası PROFILE_DIR altındadır (pstats / snakeviz ile açılabilir).
+    Başlık: **X-Admin-Token** (ADMIN_TOKEN)
+    """
+    _require_admin(x_admin_token)
+    try:
+        return await asyncio.to_thread(profiling.profile_summary, name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {name}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,335 @@
+# Metrics - Prometheus metin formatında sayaçlar, göstergeler ve histogramlar
+#
+# Harici bağımlılık yok. Sıcak yolda yalnızca önceden bağlanmış (labels(...) ile
+# alınmış) metrik nesnelerinin inc/observe çağrıları yapılır; önbellek ve havuz
+# gibi durumlar /metrics okunurken toplayıcılarla (collector) alınır.
+
+import bisect
+import math
+import threading
+
+from profiling import current_trace
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Saniye cinsinden gecikme kovaları (100 µs - 10 s)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Satır sayısı kovaları (fırsat aramasında taranan aday satırlar)
+ROW_BUCKETS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Etiketli metrik ailesi; labels(...) ile çocuk metrik alınır (ve tekrar kullanılır)"""
+
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set_total(self, value: float):
+        """Toplayıcılar için: değeri başka yerde tutulan bir sayaçtan al"""
+        self.value = value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_label_text(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_label_text(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        # Son kova +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        position = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[position] += 1
+            self.sum += value
+
+    def render(self, name, labelnames, values):
+        with self._lock:
+            counts = list(self.counts)
+            total_sum = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_label_text(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labelnames, values)} {_format_value(total_sum)}")
+        lines.append(f"{name}_count{_label_text(labelnames, values)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+
+class Registry:
+    """Metrikler + okuma anında değer güncelleyen toplayıcılar"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """collector(): /metrics okunmadan hemen önce çağrılır (göstergeleri günceller)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> list:
+        """Sayaç ve histogramların son drain'den beri biriken değerleri (sıfırlanarak)
+
+        Bulk worker süreçleri her işin sonunda çağırır; örnekler sunucu sürecinde
+        merge() ile aynı metriklere eklenir. Göstergeler (toplayıcılar) taşınmaz.
+        """
+        samples = []
+        for metric in self._metrics:
+            if metric.kind not in ("counter", "histogram"):
+                continue
+            for values, child in list(metric._children.items()):
+                with child._lock:
+                    if metric.kind == "counter":
+                        if not child.value:
+                            continue
+                        sample, child.value = child.value, 0.0
+                    else:
+                        if not any(child.counts):
+                            continue
+                        sample = (child.counts, child.sum)
+                        child.counts, child.sum = [0] * len(child.counts), 0.0
+                samples.append((metric.name, values, sample))
+        return samples
+
+    def merge(self, samples: list):
+        """Başka bir süreçte drain() ile alınan örnekleri ekle"""
+        by_name = {metric.name: metric for metric in self._metrics}
+        for name, values, sample in samples:
+            child = by_name[name].labels(*values)
+            with child._lock:
+                if isinstance(sample, tuple):
+                    counts, total = sample
+                    for position, count in enumerate(counts):
+                        child.counts[position] += count
+                    child.sum += total
+                else:
+                    child.value += sample
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help_text, labelnames=()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def gauge(name, help_text, labelnames=()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labelnames))
+
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+# HTTP
+HTTP_REQUESTS = counter(
+    "http_requests_total", "HTTP requests by endpoint, method and status code",
+    ("endpoint", "method", "status")
+)
+HTTP_DURATION = histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint", ("endpoint",)
+)
+
+# Tahmin aşamaları
+STAGE_DURATION = histogram(
+    "predictor_stage_duration_seconds",
+    "Time spent in each predictor stage (prepare_features, cache_lookup, model, region_stats, ...)",
+    ("stage",)
+)
+
+# Fırsat araması
+OPPORTUNITY_ROWS_SCANNED = histogram(
+    "opportunities_rows_scanned", "Candidate rows left after the district/neighborhood/m2/rooms filters",
+    buckets=ROW_BUCKETS
+)
+OPPORTUNITY_RESULTS = histogram(
+    "opportunities_results", "Opportunities returned per request", buckets=(0, 1, 5, 10, 25, 50)
+)
+
+# Model yükleme
+MODEL_LOAD_SECONDS = gauge(
+    "model_load_phase_seconds", "Duration of each phase of the last startup load or reload", ("phase",)
+)
+MODEL_RELOADS = counter("model_reloads_total", "Model reload attempts by outcome", ("outcome",))
+MODEL_INFO = gauge("model_info", "Active model version (value is always 1)", ("version",))
+
+# Tahmin önbelleği (değerler LRUCache sayaçlarından okunur)
+CACHE_HITS = counter("predict_cache_hits_total", "Prediction cache hits")
+CACHE_MISSES = counter("predict_cache_misses_total", "Prediction cache misses")
+CACHE_EVICTIONS = counter("predict_cache_evictions_total", "Prediction cache evictions")
+CACHE_SIZE = gauge("predict_cache_size", "Entries in the prediction cache")
+CACHE_HIT_RATIO = gauge("predict_cache_hit_ratio", "Prediction cache hit ratio since start")
+
+# Mikro-batch (/api/predict istek birleştirme)
+PREDICT_BATCH_SIZE = histogram(
+    "micro_batch_size", "Distinct requests per micro-batch", ("batcher",), buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+PREDICT_BATCH_DEDUPLICATED = counter(
+    "micro_batch_deduplicated_total", "Requests answered by an identical in-flight request", ("batcher",)
+)
+
+# Thread havuzları
+POOL_IN_FLIGHT = gauge("inference_pool_in_flight", "Running + queued jobs per pool", ("pool",))
+POOL_REJECTED = counter("inference_pool_rejected_total", "Jobs rejected because the pool was saturated", ("pool",))
+
+
+class _Stage:
+    """Aşama histogramı; süre etkin isteğin izine (profiling.RequestTrace) de yazılır"""
+
+    __slots__ = ("name", "histogram")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.histogram = STAGE_DURATION.labels(name)
+
+    def observe(self, seconds: float):
+        self.histogram.observe(seconds)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_stage(self.name, seconds)
+
+    def observe_shared(self, total: float, count: int):
+        """Toplu işte istek başına ortalama pay: count gözlem, ize yazılmaz (iz batch_* aşamasını alır)"""
+        if count:
+            share = total / count
+            for _ in range(count):
+                self.histogram.observe(share)
+
+
+def stage(name: str) -> _Stage:
+    """Bir aşama için önceden bağlanmış histogram (sıcak yolda observe edilir)"""
+    return _Stage(name)
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float):
+    HTTP_REQUESTS.labels(endpoint, method, status).inc()
+    HTTP_DURATION.labels(endpoint).observe(seconds)
@@ -37,6 +37,9 @@ class Confidence(BaseModel):
     """Güven aralığı"""
     lower: float
     upper: float
+    level: Optional[float] = Field(
+        None, description="Nominal kapsama oranı (ör. 0.8); boşsa ±5% bant (eğitim verisi henüz hazır değil)"
+    )
 
 
 InvestmentAdvice = Literal["FIRSAT", "NORMAL", "PAHALI"]
@@ -49,8 +52,35 @@ class PredictResponse(BaseModel):
     fair_value_max: float = Field(..., description="Tahmin üst sınırı (TL) - +%5")
     advice: InvestmentAdvice = Field(..., description="Yatırım tavsiyesi")
     diff_percent: float = Field(..., description="Fiyat farkı yüzdesi")
-    region_stats: RegionStats = Field(..., description="Bölge istatistikleri")
+    region_stats: Optional[RegionStats] = Field(
+        ..., description="Bölge istatistikleri; eğitim verisi henüz hazır değilse null (bkz. /health/ready)"
+    )
     confidence: Optional[Confidence] = Field(None, description="Güven aralığı")
+    model_version: Optional[str] = Field(None, description="Tahmini yapan model sürümü")
+
+
+class BatchPredictItem(BaseModel):
+    """Toplu tahmin sonucundaki tek öğe"""
+    index: int = Field(..., description="İsteğin gövdedeki sırası (0'dan başlar)")
+    result: Optional[PredictResponse] = Field(None, description="Tahmin sonucu")
+    error: Optional[str] = Field(None, description="Öğeye ait hata mesajı")
+
+
+class BatchPredictResponse(BaseModel):
+    """Toplu tahmin yanıtı"""
+    results: list[BatchPredictItem] = Field(..., description="İstek sırasıyla sonuçlar")
+    succeeded: int = Field(..., description="Başarılı öğe sayısı")
+    failed: int = Field(..., description="Hatalı öğe sayısı")
+
+
+class CacheStatsResponse(BaseModel):
+    """Tahmin önbelleği istatistikleri"""
+    size: int = Field(..., description="Önbellekteki kayıt sayısı")
+    maxsize: int = Field(..., description="Maksimum kayıt sayısı")
+    hits: int = Field(..., description="İsabet sayısı")
+    misses: int = Field(..., description="Iska sayısı")
+    evictions: int = Field(..., description="Kapasite nedeniyle atılan kayıt sayısı")
+    hit_rate: float = Field(..., description="İsabet oranı (0-1)")
 
 
 class HealthResponse(BaseModel):
@@ -58,6 +88,19 @@ class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
     encoder_loaded: bool
+    model_version: Optional[str] = None
+
+
+class ReadinessResponse(BaseModel):
+    """Hazır olma (readiness) yanıtı"""
+    ready: bool = Field(..., description="Tüm bileşenler hazır mı")
+    model_loaded: bool
+    encoder_loaded: bool
+    training_data_loaded: bool = Field(..., description="Bölge istatistikleri ve fırsat indeksi hazır mı")
+    bulk_workers_ready: bool = Field(True, description="Toplu/fırsat/emsal worker süreçleri yüklendi mi")
+    model_version: Optional[str] = Field(None, description="Etkin model sürümü")
+    error: Optional[str] = Field(None, description="Eğitim verisi hazırlama hatası")
+    startup_timings: dict[str, float] = Field(..., description="Başlangıç aşama süreleri (saniye)")
 
 
 class OpportunityItem(BaseModel):
@@ -80,9 +123,105 @@ class OpportunitiesRequest(BaseModel):
     m2: Optional[float] = Field(None, description="Hedef metrekare")
     rooms: Optional[int] = Field(None, description="Hedef oda sayısı")
     limit: int = Field(default=10, ge=1, le=50, description="Maksimum sonuç sayısı")
+    rank: Literal["discount", "similarity"] = Field(
+        default="discount", description="Sıralama: en yüksek indirim ya da hedefe en benzer indirimli ilanlar"
+    )
+    cursor: Optional[str] = Field(None, description="Önceki sayfanın next_cursor değeri (aynı filtrelerle)")
 
 
 class OpportunitiesResponse(BaseModel):
     """Fırsat evleri yanıtı"""
     opportunities: list[OpportunityItem] = Field(..., description="Fırsat listesi")
-    total_found: int = Field(..., description="Toplam bulunan sayısı")
+    total_found: int = Field(..., description="Filtrelere uyan toplam fırsat sayısı (tüm sayfalar)")
+    next_cursor: Optional[str] = Field(None, description="Sonraki sayfa için cursor (son sayfada boş)")
+    model_version: Optional[str] = Field(None, description="Fırsatları skorlayan model sürümü")
+
+
+class ComparablesRequest(BaseModel):
+    """Emsal ilan isteği (verilmeyen özellikler benzerlikte nötr sayılır)"""
+    district: str = Field(..., description="İlçe")
+    neighborhood: Optional[str] = Field(None, description="Mahalle")
+    m2: float = Field(..., gt=0, description="Net metrekare")
+    rooms: int = Field(..., ge=1, description="Toplam oda sayısı")
+    building_age: Optional[int] = Field(None, ge=0, description="Bina yaşı")
+    floor: Optional[int] = Field(None, description="Bulunduğu kat")
+    total_floors: Optional[int] = Field(None, ge=1, description="Toplam kat sayısı")
+    bathrooms: Optional[int] = Field(None, ge=1, description="Banyo sayısı")
+    balcony: Optional[bool] = Field(None, description="Balkon var mı")
+    elevator: Optional[bool] = Field(None, description="Asansör var mı")
+    parking: Optional[bool] = Field(None, description="Otopark var mı")
+    security: Optional[bool] = Field(None, description="Güvenlik var mı")
+    k: int = Field(default=10, ge=1, le=50, description="Döndürülecek emsal sayısı")
+
+
+class ComparableItem(OpportunityItem):
+    """Emsal ilan öğesi"""
+    distance: float = Field(..., description="Benzerlik mesafesi (0 = aynı özellikler)")
+
+
+class ComparablesResponse(BaseModel):
+    """Emsal ilan yanıtı"""
+    comparables: list[ComparableItem] = Field(..., description="En benzerden başlayarak emsaller")
+    scope: Optional[Literal["neighborhood", "district", "all"]] = Field(
+        None, description="Aramanın yapıldığı grup"
+    )
+    model_version: Optional[str] = Field(None, description="Adil değerleri hesaplayan model sürümü")
+
+
+class PriceQuantiles(BaseModel):
+    """Dilimler (%10, %25, medyan, %75, %90)"""
+    p10: Optional[float] = None
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+
+
+class RegionSummary(BaseModel):
+    """Bir bölgenin ilan özeti"""
+    count: int = Field(..., description="İlan sayısı")
+    price: PriceQuantiles = Field(..., description="İlan fiyatı dilimleri (TL)")
+    price_per_m2: PriceQuantiles = Field(..., description="m² fiyatı dilimleri (TL)")
+    median_diff_percent: Optional[float] = Field(
+        None, description="İlan fiyatının model tahmininden farkının medyanı (%, negatif = ucuz)"
+    )
+    opportunity_share: Optional[float] = Field(None, description="FIRSAT (en az %5 ucuz) ilanların payı (0-1)")
+
+
+class NeighborhoodAnalytics(RegionSummary):
+    """Mahalle özeti"""
+    neighborhood: str = Field(..., description="Mahalle")
+
+
+class DistrictAnalytics(RegionSummary):
+    """İlçe özeti ve mahalleleri"""
+    district: str = Field(..., description="İlçe")
+    neighborhoods: Optional[list[NeighborhoodAnalytics]] = Field(
+        None, description="Mahalle özetleri (neighborhoods=false ile çıkarılır)"
+    )
+
+
+class RegionAnalyticsResponse(BaseModel):
+    """Bölge özetleri yanıtı"""
+    model_version: Optional[str] = Field(None, description="Özetleri hesaplayan model sürümü")
+    districts: list[DistrictAnalytics] = Field(..., description="İlçe adına göre sıralı özetler")
+
+
+class DistrictItem(BaseModel):
+    """İlçe ve mahalleleri"""
+    id: str = Field(..., description="İlçe kimliği (küçük harf, Türkçe karaktersiz)")
+    name: str = Field(..., description="İlçe")
+    neighborhoods: list[str] = Field(..., description="Alfabetik mahalleler")
+
+
+class DistrictsResponse(BaseModel):
+    """İlçe/mahalle listesi yanıtı"""
+    districts: list[DistrictItem] = Field(..., description="Alfabetik ilçeler")
+
+
+class ReloadResponse(BaseModel):
+    """Model yeniden yükleme yanıtı"""
+    model_version: str = Field(..., description="Yeni etkin model sürümü")
+    previous_version: Optional[str] = Field(None, description="Önceki model sürümü")
+    seconds: float = Field(..., description="Yükleme + ısıtma süresi")
+    timings: dict[str, float] = Field(default_factory=dict, description="Aşama süreleri (saniye)")
@@ -0,0 +1,124 @@
+# Opportunity Index - Önceden skorlanmış fırsat arama indeksi
+
+import numpy as np
+import pandas as pd
+
+from listing_groups import ListingGroups
+
+
+class OpportunityIndex:
+    """Eğitim ilanlarını ilçe/mahalle bazında indirim oranına göre sıralı tutan indeks"""
+
+    def __init__(self, data: pd.DataFrame, groups: ListingGroups = None):
+        # data: 'fair_value' ve 'diff_percent' kolonları eklenmiş eğitim verisi
+        diff_percent = data['diff_percent'].to_numpy(dtype=np.float64)
+
+        # Yuvarlanmış fark üzerinden kararlı sıralama: eşitlikte veri sırası korunur,
+        # skorlanamayan (NaN) satırlar sona düşer
+        sort_keys = np.array([round(v, 1) for v in diff_percent.tolist()], dtype=np.float64)
+        order = np.argsort(sort_keys, kind='stable')
+        # Sıralı pozisyon -> veri satırı (aynı satırlar üzerinde kurulan indeksler için)
+        self.order = order
+
+        def column(name, dtype=np.float64):
+            if name not in data.columns:
+                return None
+            return data[name].to_numpy(dtype=dtype)[order]
+
+        self.district = column('District', object)
+        self.neighborhood = column('Neighborhood', object)
+        self.m2 = column('m² (Net)')
+        self.rooms = column('Rooms_Num')
+        self.price = column('Price')
+        self.fair_value = column('fair_value')
+        self.diff_percent = diff_percent[order]
+        self.age = column('Age_Num')
+        self.floor = column('Floor')
+
+        # Her grup, sıralı dizilerdeki pozisyonları artan sırada tutar
+        # (alt kümeler de indirim sırasını korur)
+        self.all_rows = np.arange(len(order))
+        groups = groups if groups is not None else ListingGroups(data)
+        position = np.empty(len(order), dtype=np.intp)
+        position[order] = self.all_rows
+
+        def positions(kind):
+            return {key: np.sort(position[rows]) for key, rows in groups.items(kind)}
+
+        self.by_district = positions('district')
+        self.by_neighborhood = positions('neighborhood')
+        self.by_pair = positions('pair')
+
+    def __len__(self) -> int:
+        return len(self.all_rows)
+
+    def search(self, district: str, neighborhood: str = None,
+               target_m2: float = None, target_rooms: int = None,
+               limit: int = 10, stats: dict = None) -> list:
+        """İlçe/mahalle grubunu bul, m²/oda aralıklarıyla daralt, en iyi fırsatları döndür"""
+        top = self.matches(district, neighborhood, target_m2, target_rooms, stats)[:limit]
+        return [self.to_item(pos) for pos in top.tolist()]
+
+    def matches(self, district: str, neighborhood: str = None,
+                target_m2: float = None, target_rooms: int = None, stats: dict = None) -> np.ndarray:
+        """Filtrelere uyan tüm fırsatların pozisyonları, en yüksek indirimden başlayarak
+
+        Sıralama yükleme sırasında yapıldı; sonuç sabit bir sıradır (sayfalama için).
+        stats verilirse her filtre adımından sonra kalan satır sayısı yazılır.
+        """
+        # 1. İlçe filtresi - yeterli veri yoksa tüm veri
+        rows = self.by_district.get(district)
+        if rows is None or len(rows) < 20:
+            rows = self.all_rows
+            neighborhood_rows = self.by_neighborhood.get(neighborhood) if neighborhood else None
+        else:
+            neighborhood_rows = self.by_pair.get((district, neighborhood)) if neighborhood else None
+
+        if stats is not None:
+            stats['district_rows'] = len(rows)
+
+        # 2. Mahalle filtresi (en az 5 örnek varsa)
+        if neighborhood_rows is not None and len(neighborhood_rows) >= 5:
+            rows = neighborhood_rows
+        if stats is not None:
+            stats['neighborhood_rows'] = len(rows)
+
+        # 3. m² filtresi (±30% tolerans)
+        if target_m2 and self.m2 is not None:
+            m2 = self.m2[rows]
+            m2_mask = (m2 >= target_m2 * 0.7) & (m2 <= target_m2 * 1.3)
+            if m2_mask.sum() >= 10:
+                rows = rows[m2_mask]
+        if stats is not None:
+            stats['m2_rows'] = len(rows)
+
+        # 4. Oda sayısı filtresi (±1 tolerans)
+        if target_rooms and self.rooms is not None:
+            rooms = self.rooms[rows]
+            rooms_mask = (rooms >= target_rooms - 1) & (rooms <= target_rooms + 1)
+            if rooms_mask.sum() >= 10:
+                rows = rows[rooms_mask]
+        if stats is not None:
+            stats['rooms_rows'] = len(rows)
+
+        # 5. Satırlar zaten indirime göre sıralı: en az %5 indirimli kayıtlar
+        discounted = rows[self.diff_percent[rows] < -5]
+        if stats is not None:
+            stats['discounted_rows'] = len(discounted)
+        return discounted
+
+    def to_item(self, pos: int) -> dict:
+        """İndeks satırını API çıktı formatına dönüştür"""
+        age = self.age[pos] if self.age is not None else np.nan
+        floor = self.floor[pos] if self.floor is not None else np.nan
+        return {
+            'district': self.district[pos],
+            'neighborhood': self.neighborhood[pos],
+            'm2': float(self.m2[pos]),
+            'rooms': int(self.rooms[pos]),
+            'price': round(float(self.price[pos]) / 1000) * 1000,  # 1000'e yuvarla
+            'fair_value': round(float(self.fair_value[pos]) / 1000) * 1000,
+            'diff_percent': round(float(self.diff_percent[pos]), 1),
+            'building_age': int(age) if pd.notna(age) else None,
+            'floor': int(floor) if pd.notna(floor) else None
+        }
@@ -2,7 +2,10 @@
 
 import os
 import sys
-import joblib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -10,34 +13,150 @@ from pathlib import Path
 # Add parent directory to path for encoder module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import encoder  # noqa: F401 - needed for pickle
+import artifacts
+import features
+import metrics
+import profiling
+from analytics import RegionAnalytics
+from cache import LRUCache
+from comparables import ComparablesIndex, query_from_request
+from districts import DistrictCatalog
+from inference import CompiledPipeline
+from intervals import ResidualIntervals
+from listing_groups import ListingGroups
+from opportunity_index import OpportunityIndex
+from region_stats import RegionStatsIndex
+
+# Model/encoder/veri dosyalarının değişip değişmediğini kontrol etme aralığı (saniye; 0 = kapalı)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "5"))
+
+# Yeni model devreye alınmadan önce ısıtma için tahmin edilen eğitim satırı sayısı
+WARMUP_ROWS = 32
+
+# Tahmin önbelleği kapasitesi (fiyattan bağımsız adil değer; 0 = kapalı)
+PREDICT_CACHE_SIZE = int(os.environ.get("PREDICT_CACHE_SIZE", "10000"))
+
+# Mikro-batch'te bu sayıdan az önbellek ıskası tek satır hızlı yolla tahmin edilir
+BATCH_MODEL_MIN_ROWS = 32
+
+# Artifact paketi klasörü (bkz. artifacts.py); verilmezse <models>/bundle denenir
+ARTIFACT_BUNDLE_DIR = os.environ.get("ARTIFACT_BUNDLE_DIR")
+
+# Eğitim verisi (bölge istatistikleri + fırsat indeksi) arka planda hazırlansın mı;
+# açıkken /api/predict veri hazır olmadan servis edilir
+BACKGROUND_DATA_LOAD = os.environ.get("BACKGROUND_DATA_LOAD", "1") == "1"
+
+# Aşama süreleri için önceden bağlanmış histogramlar
+STAGE_PREPARE = metrics.stage("prepare_features")
+STAGE_CACHE = metrics.stage("cache_lookup")
+STAGE_MODEL = metrics.stage("model")
+STAGE_REGION = metrics.stage("region_stats")
+STAGE_RESULT = metrics.stage("build_result")
+STAGE_BATCH_PREPARE = metrics.stage("batch_prepare_features")
+STAGE_BATCH_MODEL = metrics.stage("batch_model")
+STAGE_BATCH_RESULT = metrics.stage("batch_build_results")
+STAGE_OPPORTUNITIES = metrics.stage("opportunities_search")
+STAGE_COMPARABLES = metrics.stage("comparables_search")
+
+
+class ReloadInProgressError(Exception):
+    """Başka bir yeniden yükleme sürüyor"""
+
+
+class ModelState:
+    """Bir model sürümüne ait her şey: model/encoder ve eğitim verisinden türetilen indeksler
+    
+    Kurulduktan sonra değiştirilmez. Yeniden yüklemede yeni bir nesne hazırlanır ve
+    HousePricePredictor._state tek atamayla değiştirilir; devam eden istekler
+    başladıkları nesneyle (eski sürümle) tamamlanır.
+    """
+    
+    def __init__(self, model, encoder, compiled, version: str, generation: int,
+                 source: str, signature: tuple, training_data: pd.DataFrame = None,
+                 region_stats: RegionStatsIndex = None, opportunity_index: OpportunityIndex = None,
+                 comparables: ComparablesIndex = None, intervals: ResidualIntervals = None,
+                 analytics: RegionAnalytics = None, districts: DistrictCatalog = None):
+        self.model = model
+        self.encoder = encoder
+        self.compiled = compiled
+        self.version = version
+        # Önbellek anahtarının parçası: eski sürümün adil değerleri yeni sürümde kullanılmaz
+        self.generation = generation
+        self.source = source
+        self.signature = signature
+        self.training_data = training_data
+        self.region_stats = region_stats
+        self.opportunity_index = opportunity_index
+        self.comparables = comparables
+        # Eğitim verisi hazır olana kadar None: güven aralığı ±5% banda düşer
+        self.intervals = intervals
+        self.analytics = analytics
+        self.districts = districts
+    
+    def with_data(self, training_data, region_stats, opportunity_index, comparables, intervals,
+                  analytics, districts) -> "ModelState":
+        """Aynı model, hazırlanmış eğitim verisiyle"""
+        return ModelState(
+            self.model, self.encoder, self.compiled, self.version, self.generation,
+            self.source, self.signature, training_data, region_stats, opportunity_index,
+            comparables, intervals, analytics, districts
+        )
 
 
 class HousePricePredictor:
     """LightGBM model ile ev fiyat tahmini"""
     
     def __init__(self):
-        self.model = None
-        self.encoder = None
-        self.training_data = None
-        self.model_loaded = False
-        self.encoder_loaded = False
-        
-    def load(self, models_dir: str = None):
-        """Model ve encoder'ı yükle"""
-        if models_dir is None:
-            # Check if running in Docker (/app) or locally
-            app_path = Path("/app")
-            if app_path.exists() and (app_path / "models").exists():
-                # Docker environment
-                base_path = app_path
-                models_dir = app_path / "models"
-            else:
-                # Local development - parent directory's models folder
-                base_path = Path(__file__).parent.parent
-                models_dir = base_path / "models"
-        else:
-            base_path = Path(__file__).parent.parent
-            models_dir = Path(models_dir)
+        # Etkin model sürümü (ModelState); okuyucular bir kez alıp onunla çalışır
+        self._state = None
+        self._generation = 0
+        self._sources = {}
+        self._bundle_dir = None
+        self._prefer_bundle = True
+        self._load_args = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_stop = threading.Event()
+        self.predict_cache = LRUCache(PREDICT_CACHE_SIZE)
+        # Başlangıç aşamalarının süreleri (saniye) ve eğitim verisinin hazır olma durumu
+        self.startup_timings = {}
+        self._phase_timings = self.startup_timings
+        self.data_ready = threading.Event()
+        self.data_error = None
+        self.last_reload = None
+    
+    # Etkin sürümün alanları (okuma kolaylığı için)
+    model = property(lambda self: self._state.model if self._state else None)
+    encoder = property(lambda self: self._state.encoder if self._state else None)
+    compiled = property(lambda self: self._state.compiled if self._state else None)
+    training_data = property(lambda self: self._state.training_data if self._state else None)
+    region_stats = property(lambda self: self._state.region_stats if self._state else None)
+    opportunity_index = property(lambda self: self._state.opportunity_index if self._state else None)
+    comparables = property(lambda self: self._state.comparables if self._state else None)
+    model_version = property(lambda self: self._state.version if self._state else None)
+    signature = property(lambda self: self._state.signature if self._state else None)
+    model_loaded = property(lambda self: self._state is not None)
+    encoder_loaded = property(lambda self: self._state is not None)
+        
+    def load(self, models_dir: str = None, bundle_dir: str = ARTIFACT_BUNDLE_DIR,
+             background: bool = BACKGROUND_DATA_LOAD, prefer_bundle: bool = True):
+        """Model ve encoder'ı yükle
+        
+        Geçerli bir artifact paketi varsa (bkz. artifacts.py) model, encoder ve
+        eğitim verisi pickle yerine paketten yüklenir; paket bozuk veya pickle'lardan
+        eskiyse uyarı verilip pickle'lara dönülür.
+        
+        Model, encoder ve eğitim verisi dosyaları paralel okunur. background açıksa
+        bölge istatistikleri ve fırsat indeksi ayrı bir thread'de hazırlanır;
+        tamamlandığında data_ready set edilir.
+        """
+        started = time.perf_counter()
+        self.startup_timings = self._phase_timings = {}
+        self.data_ready.clear()
+        self.data_error = None
+        self._load_args = {"models_dir": models_dir, "bundle_dir": bundle_dir, "prefer_bundle": prefer_bundle}
+        
+        models_dir, base_path = self._resolve_models_dir(models_dir)
         
         # Load the model
         model_path = models_dir / "model.pkl"
@@ -45,81 +164,517 @@ class HousePricePredictor:
             # Fallback to versioned names
             model_path = models_dir / "model_lightgbm_tuned_v3.pkl"
         
-        encoder_path = models_dir / "encoder.pkl"
+        self._sources = {
+            "model.pkl": model_path,
+            "encoder.pkl": models_dir / "encoder.pkl",
+            "processed_data.pkl": base_path / "processed_data.pkl"
+        }
+        self._bundle_dir = Path(bundle_dir) if bundle_dir else models_dir / "bundle"
+        self._prefer_bundle = prefer_bundle
         
-        # Load model
-        if model_path.exists():
-            self.model = joblib.load(model_path)
-            self.model_loaded = True
-            print(f"✅ Model loaded: {model_path.name}")
-        else:
-            raise FileNotFoundError(f"Model not found at {model_path}")
+        state, training_data = self._read_state()
+        self._state = state
+        self.predict_cache.clear()
+        self.startup_timings["model_ready"] = time.perf_counter() - started
         
-        # Load encoder
-        if encoder_path.exists():
-            self.encoder = joblib.load(encoder_path)
-            self.encoder_loaded = True
-            print(f"✅ Encoder loaded: {encoder_path.name}")
+        if training_data is None:
+            self.data_ready.set()
+        elif background:
+            threading.Thread(
+                target=self._prepare_training_data, args=(state, training_data, started),
+                name="startup-data", daemon=True
+            ).start()
         else:
-            raise FileNotFoundError(f"Encoder not found at {encoder_path}")
+            self._prepare_training_data(state, training_data, started)
+    
+    def load_args(self) -> dict:
+        """Başka bir süreçte (bulk worker) aynı kaynaklardan yüklemek için load() argümanları"""
+        return dict(self._load_args)
+    
+    def _resolve_models_dir(self, models_dir) -> tuple:
+        """(models klasörü, processed_data.pkl'in bulunduğu kök) yollarını bul"""
+        if models_dir is None:
+            # Check if running in Docker (/app) or locally
+            app_path = Path("/app")
+            if app_path.exists() and (app_path / "models").exists():
+                # Docker environment
+                return app_path / "models", app_path
+            # Local development - parent directory's models folder
+            base_path = Path(__file__).parent.parent
+            return base_path / "models", base_path
+        return Path(models_dir), Path(__file__).parent.parent
+    
+    def source_paths(self) -> dict:
+        """Var olan kaynak pickle dosyaları (isim -> yol)"""
+        return {name: path for name, path in self._sources.items() if path.exists()}
+    
+    @contextmanager
+    def _timed(self, phase: str):
+        """Bir yükleme aşamasının süresini kaydet (açılışta startup_timings'e)"""
+        started = time.perf_counter()
+        timings = self._phase_timings
+        try:
+            yield
+        finally:
+            timings[phase] = time.perf_counter() - started
+    
+    def _select_bundle(self):
+        """Kullanılabilir paket klasörü (yoksa, bozuksa veya eskiyse None)"""
+        if not self._prefer_bundle or not artifacts.is_bundle_dir(self._bundle_dir):
+            return None
+        try:
+            with self._timed("bundle_verify"):
+                artifacts.verify_bundle(self._bundle_dir, self.source_paths())
+        except (artifacts.BundleError, OSError, ValueError) as e:
+            print(f"⚠️ Bundle ignored, loading pickles: {e}")
+            return None
+        return self._bundle_dir
+    
+    def _read_state(self) -> tuple:
+        """Artifact'ları okuyup (eğitim verisi olmadan) yeni ModelState ve ham eğitim verisini döndür
+        
+        Model, encoder ve eğitim verisi dosyaları paralel okunur. Etkin sürüme dokunmaz.
+        """
+        signature = self._get_artifact_signature()
+        bundle = self._select_bundle()
         
-        # Load training data for region statistics
-        data_path = base_path / "processed_data.pkl"
-        if data_path.exists():
-            self.training_data = pd.read_pickle(data_path)
-            print(f"✅ Training data loaded: {len(self.training_data)} samples")
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load") as pool:
+            if bundle is not None:
+                data_future = pool.submit(self._read_training_data, artifacts.load_training_data, bundle)
+                # sklearn Pipeline'ı yok: yalnızca derlenmiş yol
+                model = None
+                with self._timed("model_load"):
+                    encoder, compiled = artifacts.load_pipeline(bundle)
+                version = artifacts.read_manifest(bundle)["sources"].get("model.pkl")
+                if version is None:
+                    version = artifacts.file_sha256(bundle / artifacts.MODEL_FILE)
+                source = str(bundle)
+                print(f"✅ Model and encoder loaded from bundle: {bundle}")
+            else:
+                model_path = self._sources["model.pkl"]
+                encoder_path = self._sources["encoder.pkl"]
+                if not model_path.exists():
+                    raise FileNotFoundError(f"Model not found at {model_path}")
+                if not encoder_path.exists():
+                    raise FileNotFoundError(f"Encoder not found at {encoder_path}")
+                
+                # Load training data for region statistics (model okunurken paralel)
+                data_path = self._sources["processed_data.pkl"]
+                data_future = pool.submit(self._read_training_data, pd.read_pickle, data_path) if data_path.exists() else None
+                model, encoder, compiled = self._read_pickles(model_path, encoder_path, pool)
+                version = artifacts.file_sha256(model_path)
+                source = str(model_path.parent)
+            
+            training_data = data_future.result() if data_future is not None else None
+        
+        self._generation += 1
+        state = ModelState(model, encoder, compiled, version[:12], self._generation, source, signature)
+        return state, training_data
     
-    def prepare_input(self, request) -> pd.DataFrame:
-        """Request'i model input formatına dönüştür"""
-        # Create DataFrame with expected columns
-        data = {
-            'District': [request.district],
-            'Neighborhood': [request.location],  # frontend 'location' olarak gönderiyor
-            'm² (Net)': [request.m2],
-            'Rooms_Num': [request.rooms],
-            'Age_Num': [request.building_age],
-            'Floor location': [self._get_floor_location(request.floor, request.total_floors)],
-            'Heating': [request.heating or "Kombi"],
-            'Number of bathrooms': [request.bathrooms or 1],
-            'Number of floors': [request.total_floors],
-            'Balcony_Bool': [1 if request.balcony else 0],
-            'Elevator': [1 if request.elevator else 0],
-            'Parking Lot': [1 if request.parking else 0],
-            'Security': [1 if request.security else 0],
-            'Room_Size_Ratio': [request.m2 / max(request.rooms, 1)]
+    def _read_pickles(self, model_path: Path, encoder_path: Path, pool: ThreadPoolExecutor) -> tuple:
+        """model.pkl ve encoder.pkl'i oku, derlenmiş yolu kur"""
+        # joblib (ve sklearn) yalnızca pickle yolunda gerekli
+        import joblib
+        
+        def read(path, phase):
+            with self._timed(phase):
+                return joblib.load(path)
+        
+        encoder_future = pool.submit(read, encoder_path, "encoder_load")
+        model = read(model_path, "model_load")
+        encoder = encoder_future.result()
+        print(f"✅ Model loaded: {model_path.name}")
+        print(f"✅ Encoder loaded: {encoder_path.name}")
+        
+        # DataFrame'siz hızlı yol; desteklenmeyen pipeline'da DataFrame yoluna düş
+        with self._timed("compile"):
+            try:
+                compiled = CompiledPipeline.from_pipeline(model, encoder)
+            except (ValueError, AttributeError) as e:
+                print(f"⚠️ Compiled inference disabled, using DataFrame path: {e}")
+                compiled = None
+        return model, encoder, compiled
+    
+    def _read_training_data(self, reader, path):
+        with self._timed("training_data_read"):
+            return reader(path)
+    
+    def _with_training_data(self, state: ModelState, training_data: pd.DataFrame) -> ModelState:
+        """Veriyi kompakt tiplere çevirip bölge istatistiklerini, fırsat/emsal indekslerini, güven aralıklarını, bölge özetlerini ve ilçe listesini hazırla"""
+        print(f"✅ Training data loaded: {len(training_data)} samples")
+        with self._timed("compact_data"):
+            training_data = features.compact_listings(training_data)
+            groups = ListingGroups(training_data)
+        with self._timed("region_stats"):
+            region_stats = RegionStatsIndex(training_data, groups)
+        with self._timed("opportunity_index"):
+            # Pakette adil değerler export sırasında hesaplandı
+            opportunity_index = self._build_opportunity_index(
+                state, training_data, rescore='fair_value' not in training_data.columns, groups=groups
+            )
+        with self._timed("comparables_index"):
+            comparables = ComparablesIndex(training_data, opportunity_index)
+            print(f"✅ Comparables index built: {len(comparables.groups)} groups over {len(comparables.columns)} features")
+        with self._timed("intervals"):
+            # Adil değerler (opportunity index) hazır: ilçe bazında artık dilimleri
+            intervals = ResidualIntervals(training_data, groups)
+        with self._timed("region_analytics"):
+            # Yanıt gövdeleri ve ETag'ler burada bir kez üretilir
+            analytics = RegionAnalytics(training_data, groups, state.version)
+        with self._timed("districts"):
+            districts = DistrictCatalog(training_data, groups)
+        return state.with_data(
+            training_data, region_stats, opportunity_index, comparables, intervals, analytics, districts
+        )
+    
+    def _prepare_training_data(self, state: ModelState, training_data: pd.DataFrame, started: float):
+        """Açılışta eğitim verisini hazırla, sonra data_ready'yi set et"""
+        try:
+            prepared = self._with_training_data(state, training_data)
+            with self._reload_lock:
+                # Bu sırada yeniden yükleme olduysa yeni sürüm zaten verisiyle birlikte geldi
+                if self._state is state:
+                    self._state = prepared
+        except Exception as e:
+            self.data_error = str(e)
+            print(f"❌ Eğitim verisi hazırlanamadı: {e}")
+        finally:
+            self.startup_timings["data_ready"] = time.perf_counter() - started
+            self.data_ready.set()
+    
+    def readiness(self) -> dict:
+        """Hazır olma durumu: model yüklendi mi, eğitim verisi (fırsatlar) hazır mı"""
+        data_ready = self.data_ready.is_set() and self.data_error is None
+        return {
+            "ready": self.model_loaded and data_ready,
+            "model_loaded": self.model_loaded,
+            "encoder_loaded": self.encoder_loaded,
+            "training_data_loaded": data_ready,
+            "model_version": self.model_version,
+            "error": self.data_error,
+            "startup_timings": {phase: round(seconds, 4) for phase, seconds in self.startup_timings.items()}
         }
+    
+    def reload(self) -> dict:
+        """Artifact'ları yeniden yükle, ısıt ve etkin sürümü atomik olarak değiştir
+        
+        Yükleme sırasında istekler eski sürümle servis edilmeye devam eder; herhangi
+        bir adım başarısız olursa eski sürüm etkin kalır ve hata yükseltilir.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("A reload is already in progress")
+        try:
+            return self._reload()
+        except Exception:
+            metrics.MODEL_RELOADS.labels("failure").inc()
+            raise
+        finally:
+            self._reload_lock.release()
+    
+    def _reload(self) -> dict:
+        """reload() gövdesi (_reload_lock alınmış olarak çağrılır)"""
+        started = time.perf_counter()
+        self._phase_timings = timings = {}
+        previous = self._state
+        state, training_data = self._read_state()
+        if training_data is not None:
+            state = self._with_training_data(state, training_data)
+        with self._timed("warm_up"):
+            self._warm_up(state)
+        
+        # Atomik değişim: bundan sonraki istekler yeni sürümü görür
+        self._state = state
+        self.predict_cache.clear()
         
-        return pd.DataFrame(data)
-    
-    def _get_floor_location(self, floor: int, total_floors: int) -> str:
-        """Kat numarasından kat konumu kategorisi oluştur"""
-        if floor <= 0:
-            return "Zemin Kat"
-        elif floor == 1:
-            return "1. Kat"
-        elif floor == 2:
-            return "2. Kat"
-        elif floor == 3:
-            return "3. Kat"
-        elif floor >= total_floors:
-            return "En Üst Kat"
+        self.last_reload = {
+            "model_version": state.version,
+            "previous_version": previous.version if previous else None,
+            "seconds": round(time.perf_counter() - started, 3),
+            "timings": {phase: round(seconds, 4) for phase, seconds in timings.items()}
+        }
+        print(f"🔄 Model reloaded: {self.last_reload['previous_version']} -> {state.version} "
+              f"({self.last_reload['seconds']:.2f}s)")
+        metrics.MODEL_RELOADS.labels("success").inc()
+        return self.last_reload
+    
+    def _warm_up(self, state: ModelState):
+        """Yeni sürümle birkaç tahmin yap: bozuk model devreye alınmadan yakalanır"""
+        df = state.training_data
+        if df is None:
+            return
+        sample = df[features.scoreable_mask(df)].head(WARMUP_ROWS)
+        if len(sample) == 0:
+            return
+        columns = features.listing_features(sample)
+        batch = self._predict_columns(state, columns, len(sample))
+        if state.compiled is not None:
+            # Tek satır yolu (LightGBM hızlı tahmin yapılandırması) da denensin
+            single = [state.compiled.predict_record({col: values[i] for col, values in columns.items()})
+                      for i in range(len(sample))]
+            batch = np.concatenate([batch, single])
+        if not np.isfinite(batch).all():
+            raise ValueError("Warm-up produced non-finite predictions")
+    
+    def start_watcher(self, interval: float = MODEL_WATCH_INTERVAL):
+        """Artifact dosyalarını izleyen thread'i başlat; değişince reload() çağrılır"""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._watcher_stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="model-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watcher(self):
+        self._watcher_stop.set()
+        self._watcher = None
+    
+    def _watch(self, interval: float):
+        failed_signature = None
+        while not self._watcher_stop.wait(interval):
+            state = self._state
+            if state is None or self._reload_lock.locked():
+                continue
+            try:
+                signature = self._get_artifact_signature()
+            except OSError:
+                continue
+            # Aynı bozuk dosyayı her turda tekrar denemeyelim
+            if signature == state.signature or signature == failed_signature:
+                continue
+            
+            print("🔄 Model dosyaları değişti, yeniden yükleniyor...")
+            try:
+                self.reload()
+                failed_signature = None
+            except ReloadInProgressError:
+                pass
+            except Exception as e:
+                # Yarım yazılmış dosya vb. - mevcut modelle devam et, dosya tekrar değişince dene
+                failed_signature = signature
+                print(f"❌ Model yeniden yükleme hatası: {e}")
+    
+    def _get_artifact_signature(self) -> tuple:
+        """Kaynak pickle'ların ve paket manifest'inin değişiklik imzası (yol, mtime, boyut)"""
+        paths = list(self._sources.values())
+        if self._prefer_bundle:
+            paths.append(self._bundle_dir / artifacts.MANIFEST_FILE)
+        signature = []
+        for path in paths:
+            if path.exists():
+                stat = os.stat(path)
+                signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+    
+    def _build_opportunity_index(self, state: ModelState, df: pd.DataFrame, rescore: bool = True,
+                                 groups: ListingGroups = None) -> OpportunityIndex:
+        """Eğitim verisini bir kez skorla ve fırsat indeksini oluştur"""
+        if rescore:
+            fair_values = np.full(len(df), np.nan)
+            
+            scoreable = features.scoreable_mask(df)
+            if scoreable.any():
+                fair_values[scoreable] = self._predict_columns(
+                    state, features.listing_features(df[scoreable]), int(scoreable.sum())
+                )
+            df['fair_value'] = fair_values
         else:
-            return "Orta Kat"
+            fair_values = df['fair_value'].to_numpy(dtype=np.float64)
+        
+        actual_prices = df['Price'].to_numpy(dtype=np.float64)
+        df['diff_percent'] = ((actual_prices - fair_values) / fair_values) * 100
+        
+        opportunity_index = OpportunityIndex(df, groups)
+        print(f"✅ Opportunity index built: {len(opportunity_index)} listings scored")
+        return opportunity_index
+    
+    def prepare_features(self, request) -> dict:
+        """Request'i model özelliklerine (kolon -> değer) dönüştür"""
+        return features.request_features(request)
+    
+    def prepare_input(self, request) -> pd.DataFrame:
+        """Request'i model input formatına dönüştür"""
+        return pd.DataFrame({col: [value] for col, value in self.prepare_features(request).items()})
+    
+    def prepare_batch_features(self, requests: list) -> dict:
+        """Birden fazla isteği kolon dizilerine (kolon -> dizi) dönüştür"""
+        return features.request_batch_features(requests)
     
     def predict(self, request) -> dict:
         """Fiyat tahmini yap ve sonuç döndür"""
-        if not self.model_loaded or not self.encoder_loaded:
+        # İstek boyunca aynı sürüm kullanılır (yeniden yükleme araya girse de)
+        state = self._state
+        if state is None:
             raise RuntimeError("Model or encoder not loaded")
         
+        # Adil değer fiyattan bağımsız: önbellek anahtarı fiyat hariç model özellikleri
+        started = time.perf_counter()
+        record = self.prepare_features(request)
+        cache_key = (state.generation, tuple(record.values()))
+        prepared = time.perf_counter()
+        STAGE_PREPARE.observe(prepared - started)
+        
+        fair_value = self.predict_cache.get(cache_key)
+        looked_up = time.perf_counter()
+        STAGE_CACHE.observe(looked_up - prepared)
+        
+        if fair_value is None:
+            if state.compiled is not None:
+                # DataFrame'siz yol: özellik vektörü -> LightGBM booster
+                fair_value = state.compiled.predict_record(record)
+            else:
+                fair_value = self.predict_dataframe(request, state)
+            self.predict_cache.put(cache_key, fair_value)
+            predicted = time.perf_counter()
+            STAGE_MODEL.observe(predicted - looked_up)
+            looked_up = predicted
+        
+        region_stats = self._get_region_stats(request.district, request.location, state)
+        region_done = time.perf_counter()
+        STAGE_REGION.observe(region_done - looked_up)
+        
+        # Fiyata bağlı alanlar (advice, diff_percent) her istekte yeniden hesaplanır
+        result = self._build_result(request, fair_value, state, region_stats)
+        STAGE_RESULT.observe(time.perf_counter() - region_done)
+        return result
+    
+    def predict_dataframe(self, request, state: ModelState = None) -> float:
+        """DataFrame yolu: prepare_input -> encoder.transform -> Pipeline.predict"""
+        state = state or self._state
+        
         # Prepare input
         input_df = self.prepare_input(request)
         
         # Apply target encoding
-        input_encoded = self.encoder.transform(input_df)
+        input_encoded = state.encoder.transform(input_df)
         
         # Predict
-        fair_value = float(self.model.predict(input_encoded)[0])
+        return float(state.model.predict(input_encoded)[0])
+    
+    def predict_batch(self, requests: list) -> list:
+        """Birden fazla isteği tek encoder/model çağrısıyla tahmin et
+        
+        Her istek için sonuç dict'i ya da o öğeye ait hata (Exception) döner;
+        hatalı bir öğe diğerlerinin sonucunu etkilemez.
+        """
+        state = self._state
+        if state is None:
+            raise RuntimeError("Model or encoder not loaded")
         
+        if not requests:
+            return []
+        
+        try:
+            started = time.perf_counter()
+            columns = self.prepare_batch_features(requests)
+            prepared = time.perf_counter()
+            STAGE_BATCH_PREPARE.observe(prepared - started)
+            fair_values = self._predict_columns(state, columns, len(requests))
+            predicted = time.perf_counter()
+            STAGE_BATCH_MODEL.observe(predicted - prepared)
+        except Exception:
+            # Toplu çağrı başarısız: hatalı öğeleri ayırmak için tek tek tahmin et
+            return [self._predict_or_error(request) for request in requests]
+        
+        results = []
+        for request, fair_value in zip(requests, fair_values.tolist()):
+            try:
+                region_stats = self._get_region_stats(request.district, request.location, state)
+                results.append(self._build_result(request, fair_value, state, region_stats))
+            except Exception as e:
+                results.append(e)
+        STAGE_BATCH_RESULT.observe(time.perf_counter() - predicted)
+        return results
+    
+    def predict_many(self, requests: list) -> list:
+        """Eşzamanlı tekil istekler (mikro-batch): önbellekte olmayanlar tek model çağrısında
+        
+        Sonuçlar predict ile aynıdır (önbellek ve bölge istatistikleri dahil); her istek
+        için sonuç dict'i ya da o isteğe ait hata (Exception) döner.
+        """
+        state = self._state
+        if state is None:
+            raise RuntimeError("Model or encoder not loaded")
+        
+        try:
+            started = time.perf_counter()
+            keys = [(state.generation, tuple(self.prepare_features(request).values())) for request in requests]
+            features_done = time.perf_counter()
+            fair_values = [self.predict_cache.get(key) for key in keys]
+            misses = [i for i, value in enumerate(fair_values) if value is None]
+            prepared = time.perf_counter()
+            STAGE_BATCH_PREPARE.observe(prepared - started)
+            # İstek başına aşama histogramları (predict ile aynı adlar) batch süresinin payıyla
+            STAGE_PREPARE.observe_shared(features_done - started, len(requests))
+            STAGE_CACHE.observe_shared(prepared - features_done, len(requests))
+            if len(misses) >= BATCH_MODEL_MIN_ROWS or (misses and state.compiled is None):
+                columns = self.prepare_batch_features([requests[i] for i in misses])
+                predicted = self._predict_columns(state, columns, len(misses)).tolist()
+            elif misses:
+                # Toplu model çağrısının sabit maliyeti (~1 ms) küçük gruplarda tek satır yolundan pahalı
+                predicted = [state.compiled.predict_record(self.prepare_features(requests[i])) for i in misses]
+        except Exception:
+            # Toplu çağrı başarısız: hatalı öğeleri ayırmak için tek tek tahmin et
+            return [self._predict_or_error(request) for request in requests]
+        
+        if misses:
+            for i, fair_value in zip(misses, predicted):
+                fair_values[i] = fair_value
+                self.predict_cache.put(keys[i], fair_value)
+        modeled = time.perf_counter()
+        STAGE_BATCH_MODEL.observe(modeled - prepared)
+        STAGE_MODEL.observe_shared(modeled - prepared, len(misses))
+        
+        results = []
+        region_seconds = 0.0
+        for request, fair_value in zip(requests, fair_values):
+            try:
+                region_started = time.perf_counter()
+                region_stats = self._get_region_stats(request.district, request.location, state)
+                region_seconds += time.perf_counter() - region_started
+                results.append(self._build_result(request, fair_value, state, region_stats))
+            except Exception as e:
+                results.append(e)
+        finished = time.perf_counter()
+        STAGE_BATCH_RESULT.observe(finished - modeled)
+        STAGE_REGION.observe_shared(region_seconds, len(requests))
+        STAGE_RESULT.observe_shared(finished - modeled - region_seconds, len(requests))
+        return results
+    
+    def _predict_columns(self, state: ModelState, columns: dict, n: int) -> np.ndarray:
+        """Kolon dizileri için toplu tahmin (derlenmiş yol yoksa DataFrame yolu)"""
+        if state.compiled is not None:
+            return state.compiled.predict_columns(columns, n)
+        input_encoded = state.encoder.transform(pd.DataFrame(columns))
+        return np.asarray(state.model.predict(input_encoded), dtype=np.float64)
+    
+    def cache_stats(self) -> dict:
+        """Tahmin önbelleği sayaçları"""
+        return self.predict_cache.stats()
+    
+    def collect_metrics(self):
+        """/metrics okunurken önbellek, model sürümü ve yükleme sürelerini güncelle"""
+        cache = self.predict_cache.stats()
+        metrics.CACHE_HITS.labels().set_total(cache["hits"])
+        metrics.CACHE_MISSES.labels().set_total(cache["misses"])
+        metrics.CACHE_EVICTIONS.labels().set_total(cache["evictions"])
+        metrics.CACHE_SIZE.set(cache["size"])
+        metrics.CACHE_HIT_RATIO.set(cache["hit_rate"])
+        
+        metrics.MODEL_INFO.clear()
+        if self._state is not None:
+            metrics.MODEL_INFO.labels(self._state.version).set(1)
+        timings = self.last_reload["timings"] if self.last_reload else self.startup_timings
+        metrics.MODEL_LOAD_SECONDS.clear()
+        for phase, seconds in list(timings.items()):
+            metrics.MODEL_LOAD_SECONDS.labels(phase).set(seconds)
+    
+    def _predict_or_error(self, request):
+        try:
+            return self.predict(request)
+        except Exception as e:
+            return e
+    
+    def _build_result(self, request, fair_value: float, state: ModelState, region_stats: dict) -> dict:
+        """Model tahmininden API yanıtını oluştur"""
         # ±5% Fiyat Aralığı
         RANGE_PERCENT = 0.05
         fair_value_min = fair_value * (1 - RANGE_PERCENT)
@@ -136,8 +691,13 @@ class HousePricePredictor:
         # Negatif = ilan fiyatı adil değerden düşük (fırsat)
         diff_percent = ((request.price - fair_value) / fair_value) * 100
         
-        # Get region stats
-        region_stats = self._get_region_stats(request.district, request.location)
+        # Güven aralığı: ilçenin fiyat/tahmin oranı dilimleri (hazır değilse ±5% bant)
+        factors = state.intervals.lookup(request.district) if state.intervals is not None else None
+        if factors is not None:
+            confidence_lower, confidence_upper = fair_value * factors[0], fair_value * factors[1]
+            confidence_level = state.intervals.level
+        else:
+            confidence_lower, confidence_upper, confidence_level = fair_value_min, fair_value_max, None
         
         # Round to nearest 1000 TL for cleaner display
         def round_to_nearest_1000(value):
@@ -151,9 +711,11 @@ class HousePricePredictor:
             "diff_percent": round(diff_percent, 2),
             "region_stats": region_stats,
             "confidence": {
-                "lower": round_to_nearest_1000(fair_value_min),
-                "upper": round_to_nearest_1000(fair_value_max)
-            }
+                "lower": round_to_nearest_1000(confidence_lower),
+                "upper": round_to_nearest_1000(confidence_upper),
+                "level": confidence_level
+            },
+            "model_version": state.version
         }
     
     def _get_advice_with_range(self, listing_price: float, fair_min: float, fair_max: float) -> str:
@@ -174,135 +736,108 @@ class HousePricePredictor:
         else:
             return "PAHALI"
     
-    def _get_region_stats(self, district: str, neighborhood: str) -> dict:
-        """Bölge istatistiklerini hesapla"""
-        if self.training_data is None:
-            return {
-                "min": 0,
-                "max": 0,
-                "avg": 0,
-                "median": 0,
-                "count": 0
-            }
-        
-        # Filter by district and neighborhood
-        mask = (self.training_data['District'] == district)
-        if neighborhood:
-            neighborhood_mask = (self.training_data['Neighborhood'] == neighborhood)
-            if neighborhood_mask.sum() > 10:  # En az 10 örnek varsa mahalle bazlı
-                mask = mask & neighborhood_mask
-        
-        filtered = self.training_data[mask]
-        
-        if len(filtered) == 0:
-            # Fallback: tüm verilerin istatistikleri
-            filtered = self.training_data
+    def _get_region_stats(self, district: str, neighborhood: str, state: ModelState = None):
+        """Bölge istatistiklerini getir (yüklemede hesaplanmış tablodan)
         
-        return {
-            "min": float(filtered['Price'].min()),
-            "max": float(filtered['Price'].max()),
-            "avg": float(filtered['Price'].mean()),
-            "median": float(filtered['Price'].median()),
-            "count": int(len(filtered))
-        }
+        Eğitim verisi henüz hazırlanmadıysa None: sıfırlar gerçek istatistikle karışmasın.
+        """
+        region_stats = (state or self._state).region_stats
+        if region_stats is None:
+            return None
+        
+        return region_stats.lookup(district, neighborhood)
     
     def get_opportunities(self, district: str, neighborhood: str = None, 
                           target_m2: float = None, target_rooms: int = None,
-                          limit: int = 10) -> list:
-        """Benzer özelliklerde fırsat evleri bul"""
-        if self.training_data is None or not self.model_loaded:
-            return []
+                          limit: int = 10, rank: str = "discount", offset: int = 0) -> dict:
+        """Benzer özelliklerde fırsat evleri bul: sabit sıralamada offset'ten başlayan bir sayfa
         
-        df = self.training_data.copy()
-        
-        # 1. İlçe filtresi - önce aynı ilçe, yoksa komşu ilçeler
-        district_mask = (df['District'] == district)
-        if district_mask.sum() < 20:
-            # Komşu ilçeleri de dahil et (tüm veriden)
-            district_mask = pd.Series([True] * len(df))
-        
-        df_filtered = df[district_mask].copy()
-        
-        # 2. Mahalle filtresi (opsiyonel, gevşek)
-        if neighborhood and (df_filtered['Neighborhood'] == neighborhood).sum() >= 5:
-            # Aynı mahallede yeterli veri varsa öncelik ver
-            neighborhood_match = (df_filtered['Neighborhood'] == neighborhood)
-            df_neighborhood = df_filtered[neighborhood_match]
-            if len(df_neighborhood) >= 5:
-                df_filtered = df_neighborhood
-        
-        # 3. m² filtresi (±30% tolerans)
-        if target_m2 and 'm² (Net)' in df_filtered.columns:
-            m2_min = target_m2 * 0.7
-            m2_max = target_m2 * 1.3
-            m2_mask = (df_filtered['m² (Net)'] >= m2_min) & (df_filtered['m² (Net)'] <= m2_max)
-            if m2_mask.sum() >= 10:
-                df_filtered = df_filtered[m2_mask]
-        
-        # 4. Oda sayısı filtresi (±1 tolerans)
-        if target_rooms and 'Rooms_Num' in df_filtered.columns:
-            rooms_mask = (df_filtered['Rooms_Num'] >= target_rooms - 1) & \
-                        (df_filtered['Rooms_Num'] <= target_rooms + 1)
-            if rooms_mask.sum() >= 10:
-                df_filtered = df_filtered[rooms_mask]
-        
-        # 5. Her ev için tahmin yap ve fark hesapla
-        opportunities = []
-        
-        for idx, row in df_filtered.iterrows():
-            try:
-                # Basit tahmin için input hazırla
-                floor_loc = self._get_floor_location(
-                    int(row.get('Floor', 3)), 
-                    int(row.get('Number of floors', 10))
-                )
-                
-                input_data = {
-                    'District': [row['District']],
-                    'Neighborhood': [row['Neighborhood']],
-                    'm² (Net)': [row['m² (Net)']],
-                    'Rooms_Num': [row['Rooms_Num']],
-                    'Age_Num': [row.get('Age_Num', 5)],
-                    'Floor location': [floor_loc],
-                    'Heating': [row.get('Heating', 'Kombi')],
-                    'Number of bathrooms': [row.get('Number of bathrooms', 1)],
-                    'Number of floors': [row.get('Number of floors', 10)],
-                    'Balcony_Bool': [row.get('Balcony_Bool', 1)],
-                    'Elevator': [row.get('Elevator', 1)],
-                    'Parking Lot': [row.get('Parking Lot', 0)],
-                    'Security': [row.get('Security', 0)],
-                    'Room_Size_Ratio': [row['m² (Net)'] / max(row['Rooms_Num'], 1)]
-                }
-                
-                input_df = pd.DataFrame(input_data)
-                input_encoded = self.encoder.transform(input_df)
-                fair_value = float(self.model.predict(input_encoded)[0])
-                
-                actual_price = float(row['Price'])
-                diff_percent = ((actual_price - fair_value) / fair_value) * 100
-                
-                # Sadece fırsatları al (negatif fark = değerinin altında)
-                if diff_percent < -5:  # En az %5 indirimli olanlar
-                    opportunities.append({
-                        'district': row['District'],
-                        'neighborhood': row['Neighborhood'],
-                        'm2': float(row['m² (Net)']),
-                        'rooms': int(row['Rooms_Num']),
-                        'price': round(actual_price / 1000) * 1000,  # 1000'e yuvarla
-                        'fair_value': round(fair_value / 1000) * 1000,
-                        'diff_percent': round(diff_percent, 1),
-                        'building_age': int(row.get('Age_Num', 0)) if pd.notna(row.get('Age_Num')) else None,
-                        'floor': int(row.get('Floor', 0)) if pd.notna(row.get('Floor')) else None
-                    })
-            except Exception as e:
-                # Skip problematic rows
-                continue
+        rank="discount": aralık filtreleri + en yüksek indirim (varsayılan)
+        rank="similarity": emsal indeksinde hedefe en yakın indirimli ilanlar
+        total_found filtrelere uyan tüm fırsatların sayısıdır (sayfa boyutundan bağımsız).
+        """
+        state = self._state
+        if state is None or state.opportunity_index is None:
+            return {"opportunities": [], "total_found": 0, "model_version": None}
         
-        # En iyi fırsatları sırala (en düşük diff_percent = en iyi fırsat)
-        opportunities.sort(key=lambda x: x['diff_percent'])
+        positions, total = self._opportunity_positions(
+            state, district, neighborhood, target_m2, target_rooms, rank, offset + limit
+        )
+        index = state.opportunity_index
+        opportunities = [index.to_item(pos) for pos in positions[offset:offset + limit].tolist()]
+        metrics.OPPORTUNITY_RESULTS.observe(len(opportunities))
+        return {"opportunities": opportunities, "total_found": total, "model_version": state.version}
+    
+    def stream_opportunities(self, district: str, neighborhood: str = None,
+                             target_m2: float = None, target_rooms: int = None,
+                             rank: str = "discount", offset: int = 0) -> tuple:
+        """offset'ten sonraki tüm fırsatlar -> (toplam, model sürümü, öğe üreteci)
+        
+        Sıralama burada yapılır; öğeler yanıt yazılırken tek tek üretilir.
+        """
+        state = self._state
+        if state is None or state.opportunity_index is None:
+            return 0, None, iter(())
+        
+        positions, total = self._opportunity_positions(
+            state, district, neighborhood, target_m2, target_rooms, rank, None
+        )
+        index = state.opportunity_index
+        return total, state.version, (index.to_item(pos) for pos in positions[offset:].tolist())
+    
+    def _opportunity_positions(self, state: ModelState, district: str, neighborhood: str,
+                               target_m2: float, target_rooms: int, rank: str, needed: int = None) -> tuple:
+        """Sıralı fırsat pozisyonları (en az 'needed' tanesi, None = hepsi) ve toplam eşleşme sayısı"""
+        started = time.perf_counter()
+        stats = {}
+        if rank == "similarity" and state.comparables is not None:
+            query = {'m² (Net)': target_m2, 'Rooms_Num': target_rooms}
+            positions, _, total = state.comparables.neighbors(
+                district, neighborhood, query, needed, discounted_only=True, stats=stats
+            )
+            STAGE_COMPARABLES.observe(time.perf_counter() - started)
+            profiling.annotate('comparables_search', stats)
+            return positions, total
         
-        return opportunities[:limit]
+        # Tahminler yüklemede yapıldı ve indeks indirime göre sıralı: filtrelere uyan
+        # tüm fırsatlar tek aramada, sayfa ve toplam aynı sonuçtan
+        positions = state.opportunity_index.matches(district, neighborhood, target_m2, target_rooms, stats=stats)
+        STAGE_OPPORTUNITIES.observe(time.perf_counter() - started)
+        metrics.OPPORTUNITY_ROWS_SCANNED.observe(stats['rooms_rows'])
+        # Yavaş istek günlüğü için filtre adımı başına kalan satır sayıları
+        profiling.annotate('opportunity_filters', stats)
+        return positions, len(positions)
+    
+    def get_comparables(self, request, k: int = 10) -> tuple:
+        """İsteğe en benzer k eğitim ilanı -> (emsaller, arama kapsamı)"""
+        state = self._state
+        if state is None or state.comparables is None:
+            return [], None
+        
+        started = time.perf_counter()
+        stats = {}
+        comparables = state.comparables.nearest(
+            request.district, request.neighborhood, query_from_request(request), k, stats=stats
+        )
+        STAGE_COMPARABLES.observe(time.perf_counter() - started)
+        profiling.annotate('comparables_search', stats)
+        return comparables, stats.get('scope')
+    
+    def get_region_analytics(self, district: str = None, include_neighborhoods: bool = True):
+        """Önceden üretilmiş bölge özeti -> (JSON gövdesi, ETag); veri hazır değilse ya da ilçe bilinmiyorsa None"""
+        state = self._state
+        if state is None or state.analytics is None:
+            return None
+        return state.analytics.response(district, include_neighborhoods)
+    
+    def get_districts(self):
+        """İlçe/mahalle listesi -> (JSON gövdesi, ETag); veri hazır değilse None"""
+        state = self._state
+        if state is None or state.districts is None:
+            return None
+        return state.districts.body, state.districts.etag
 
 
 # Singleton instance
 predictor = HousePricePredictor()
+metrics.REGISTRY.add_collector(predictor.collect_metrics)
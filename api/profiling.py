@@ -0,0 +1,168 @@
+# Profiling - İstek izleme (aşama süreleri), yavaş istek günlüğü ve isteğe bağlı CPU profili
+#
+# Her HTTP isteği için bir RequestTrace, contextvar üzerinden worker thread'lere taşınır
+# (InferencePool bağlamı kopyalar). metrics.stage(...) gözlemleri ve predictor'ın eklediği
+# ayrıntılar (ör. fırsat aramasında filtre adımı başına satır sayıları) bu izde toplanır.
+# İstek SLOW_REQUEST_SECONDS'ı aşarsa iz, dönen (rotating) JSON satır günlüğüne yazılır.
+
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import time
+import uuid
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+LOG_DIR = Path(__file__).parent / "logs"
+
+# Bu süreyi (saniye) aşan istekler günlüğe yazılır; 0 = kapalı
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_LOG = Path(os.environ.get("SLOW_REQUEST_LOG", LOG_DIR / "slow_requests.log"))
+SLOW_REQUEST_LOG_MAX_BYTES = int(os.environ.get("SLOW_REQUEST_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_REQUEST_LOG_BACKUPS = int(os.environ.get("SLOW_REQUEST_LOG_BACKUPS", "3"))
+
+# Günlüğe yazılan istek gövdesinin en fazla boyutu (toplu istekler çok büyük olabilir)
+MAX_LOGGED_BODY = 16 * 1024
+
+# Profil dosyalarının (.prof, pstats formatı) yazıldığı klasör
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", LOG_DIR / "profiles"))
+PROFILE_TOP_FUNCTIONS = 40
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+_slow_logger = None
+
+
+class RequestTrace:
+    """Tek isteğin aşama süreleri, ayrıntıları ve (istenirse) CPU profili"""
+
+    __slots__ = ("stages", "details", "profiler")
+
+    def __init__(self, profile: bool = False):
+        self.stages = {}
+        self.details = {}
+        self.profiler = cProfile.Profile() if profile else None
+
+    def add_stage(self, name: str, seconds: float):
+        # Toplu işlerde aynı aşama birden fazla kez görülebilir: süreler toplanır
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+def start_trace(profile: bool = False):
+    """Yeni iz başlat; (iz, contextvar token'ı) döner"""
+    trace = RequestTrace(profile)
+    return trace, current_trace.set(trace)
+
+
+def end_trace(token):
+    current_trace.reset(token)
+
+
+def profiling_active() -> bool:
+    """Etkin istek CPU profili istiyor mu"""
+    trace = current_trace.get()
+    return trace is not None and trace.profiler is not None
+
+
+def annotate(key: str, value):
+    """Etkin isteğin izine ayrıntı ekle (iz yoksa hiçbir şey yapmaz)"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.details[key] = value
+
+
+def profiled(fn):
+    """Etkin iz profil istiyorsa fn'i, çağrıldığı (worker) thread'de cProfile altında çalıştır"""
+    trace = current_trace.get()
+    if trace is None or trace.profiler is None:
+        return fn
+
+    def run(*args):
+        trace.profiler.enable()
+        try:
+            return fn(*args)
+        finally:
+            trace.profiler.disable()
+
+    return run
+
+
+def save_profile(trace: RequestTrace, method: str, path: str) -> str:
+    """Profili PROFILE_DIR'e .prof olarak yaz, dosya adını döndür"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    slug = path.strip("/").replace("/", "_") or "root"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method.lower()}-{slug}-{uuid.uuid4().hex[:8]}.prof"
+    trace.profiler.dump_stats(str(PROFILE_DIR / name))
+    return name
+
+
+def profile_summary(name: str, limit: int = PROFILE_TOP_FUNCTIONS) -> str:
+    """Kayıtlı profilin kümülatif süreye göre ilk 'limit' fonksiyonu (metin)"""
+    # Yalnızca PROFILE_DIR içindeki .prof dosyaları
+    if Path(name).name != name or not name.endswith(".prof"):
+        raise FileNotFoundError(name)
+    path = PROFILE_DIR / name
+    if not path.exists():
+        raise FileNotFoundError(name)
+    # Profilleyici altında hiç Python kodu çalışmadıysa dosya boştur (pstats TypeError verir)
+    with open(path, "rb") as f:
+        if not marshal.load(f):
+            return f"Profile {name} is empty: no code ran under the profiler for this request.\n"
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def _get_slow_logger() -> logging.Logger:
+    global _slow_logger
+    if _slow_logger is None:
+        SLOW_REQUEST_LOG.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_REQUEST_LOG,
+            maxBytes=SLOW_REQUEST_LOG_MAX_BYTES,
+            backupCount=SLOW_REQUEST_LOG_BACKUPS,
+            encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger("kernel_invaders.slow_requests")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _slow_logger = logger
+    return _slow_logger
+
+
+def log_slow_request(trace: RequestTrace, method: str, path: str, query: str,
+                     status: int, seconds: float, body: bytes, body_truncated: bool,
+                     model_version: str = None, profile: str = None):
+    """Yavaş isteği JSON satırı olarak günlüğe yaz"""
+    try:
+        payload = json.loads(body) if body and not body_truncated else None
+    except ValueError:
+        payload = None
+    if payload is None and body:
+        payload = body.decode("utf-8", errors="replace")
+
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "method": method,
+        "path": path,
+        "query": query or None,
+        "status": status,
+        "seconds": round(seconds, 6),
+        "model_version": model_version,
+        "stages": {name: round(value, 6) for name, value in trace.stages.items()},
+        "details": trace.details,
+        "payload": payload,
+        "payload_truncated": body_truncated,
+        "profile": profile
+    }
+    try:
+        _get_slow_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+    except OSError as e:
+        print(f"⚠️ Slow request log could not be written: {e}")
@@ -0,0 +1,53 @@
+# Region Stats - Önceden hesaplanmış bölge fiyat istatistikleri
+
+import numpy as np
+import pandas as pd
+
+from listing_groups import ListingGroups
+
+# Mahalle bazlı istatistik için gereken minimum örnek sayısı (bu değerden fazla)
+MIN_NEIGHBORHOOD_SAMPLES = 10
+
+
+class RegionStatsIndex:
+    """İlçe ve ilçe/mahalle bazında fiyat istatistiklerini yüklemede bir kez hesaplar"""
+
+    def __init__(self, data: pd.DataFrame, groups: ListingGroups = None):
+        groups = groups if groups is not None else ListingGroups(data)
+        prices = data['Price'].to_numpy(dtype=np.float64)
+        # İlçe ve ilçe/mahalle grupları bu dizide bitişik aralıklardır
+        grouped = prices[groups.order]
+
+        self.global_stats = self._describe(prices)
+        self.district_stats = {
+            district: self._describe(grouped[rows]) for district, rows in groups.district_slices.items()
+        }
+        self.pair_stats = {
+            pair: self._describe(grouped[rows]) for pair, rows in groups.pair_slices.items()
+        }
+        # Mahalle kuralı tüm verideki örnek sayısına bakar (ilçeden bağımsız)
+        self.neighborhood_counts = {
+            neighborhood: rows.stop - rows.start for neighborhood, rows in groups.neighborhood_slices.items()
+        }
+
+    @staticmethod
+    def _describe(prices: np.ndarray) -> dict:
+        return {
+            "min": float(prices.min()),
+            "max": float(prices.max()),
+            "avg": float(prices.mean()),
+            "median": float(np.median(prices)),
+            "count": int(len(prices))
+        }
+
+    def lookup(self, district: str, neighborhood: str = None) -> dict:
+        """Mahallede yeterli örnek varsa ilçe+mahalle, yoksa ilçe, o da yoksa genel istatistik"""
+        if neighborhood and self.neighborhood_counts.get(neighborhood, 0) > MIN_NEIGHBORHOOD_SAMPLES:
+            stats = self.pair_stats.get((district, neighborhood))
+        else:
+            stats = self.district_stats.get(district)
+
+        if stats is None:
+            # Fallback: tüm verilerin istatistikleri
+            stats = self.global_stats
+        return dict(stats)
@@ -53,7 +53,8 @@ import { ValuationResult, ValuationFormData, PropertyStatus, OpportunityItem } f
 import { formatCurrency, formatShortDate } from "@/lib/utils";
 import { AlertTriangle } from "lucide-react";
 import { getDistrictCenter } from "@/lib/istanbul-district-centers";
-import { ISTANBUL_DISTRICTS, ROOM_OPTIONS, predictValue, parseRooms } from "@/lib/api";
+import { ROOM_OPTIONS, predictValue, parseRooms } from "@/lib/api";
+import { useDistricts } from "@/hooks/use-districts";
 import { addToHistory } from "@/lib/storage";
 
 /**
@@ -71,6 +72,7 @@ export default function ResultPage() {
   // Edit form state
   const [editForm, setEditForm] = useState<ValuationFormData | null>(null);
   const [selectedDistrict, setSelectedDistrict] = useState<string>("");
+  const districts = useDistricts();
 
   useEffect(() => {
     // localStorage'dan sonucu al
@@ -95,7 +97,7 @@ export default function ResultPage() {
 
   // Get neighborhoods for selected district
   const neighborhoods = selectedDistrict
-    ? ISTANBUL_DISTRICTS.find((d) => d.name === selectedDistrict)?.neighborhoods || []
+    ? districts.find((d) => d.name === selectedDistrict)?.neighborhoods || []
     : [];
 
   // Handle district change
@@ -315,7 +317,7 @@ export default function ResultPage() {
                           İlçe
                         </Label>
                         <Combobox
-                          options={ISTANBUL_DISTRICTS.map((d) => ({
+                          options={districts.map((d) => ({
                             value: d.name,
                             label: d.name,
                           }))}
@@ -595,38 +597,51 @@ export default function ResultPage() {
 
         {/* Bölge Tab */}
         <TabsContent value="region" className="space-y-6">
-          <RegionStatsChart
-            stats={result.regionStats}
-            currentPrice={result.listingPrice}
-            fairValue={result.fairValue}
-          />
+          {result.regionStats ? (
+            <>
+              <RegionStatsChart
+                stats={result.regionStats}
+                currentPrice={result.listingPrice}
+                fairValue={result.fairValue}
+              />
 
-          <div className="grid sm:grid-cols-3 gap-4">
-            <Card className="border-2 border-zinc-100">
-              <CardContent className="p-4 text-center">
-                <p className="text-sm text-zinc-500">Bölge Minimumu</p>
-                <p className="text-xl font-bold text-zinc-900">
-                  {formatCurrency(result.regionStats.min)}
-                </p>
-              </CardContent>
-            </Card>
-            <Card className="border-2 border-zinc-100">
-              <CardContent className="p-4 text-center">
-                <p className="text-sm text-zinc-500">Bölge Ortalaması</p>
-                <p className="text-xl font-bold text-zinc-900">
-                  {formatCurrency(result.regionStats.avg)}
-                </p>
-              </CardContent>
-            </Card>
+              <div className="grid sm:grid-cols-3 gap-4">
+                <Card className="border-2 border-zinc-100">
+                  <CardContent className="p-4 text-center">
+                    <p className="text-sm text-zinc-500">Bölge Minimumu</p>
+                    <p className="text-xl font-bold text-zinc-900">
+                      {formatCurrency(result.regionStats.min)}
+                    </p>
+                  </CardContent>
+                </Card>
+                <Card className="border-2 border-zinc-100">
+                  <CardContent className="p-4 text-center">
+                    <p className="text-sm text-zinc-500">Bölge Ortalaması</p>
+                    <p className="text-xl font-bold text-zinc-900">
+                      {formatCurrency(result.regionStats.avg)}
+                    </p>
+                  </CardContent>
+                </Card>
+                <Card className="border-2 border-zinc-100">
+                  <CardContent className="p-4 text-center">
+                    <p className="text-sm text-zinc-500">Bölge Maksimumu</p>
+                    <p className="text-xl font-bold text-zinc-900">
+                      {formatCurrency(result.regionStats.max)}
+                    </p>
+                  </CardContent>
+                </Card>
+              </div>
+            </>
+          ) : (
+            // Sunucu eğitim verisini hazırlarken bölge istatistikleri gelmez
             <Card className="border-2 border-zinc-100">
               <CardContent className="p-4 text-center">
-                <p className="text-sm text-zinc-500">Bölge Maksimumu</p>
-                <p className="text-xl font-bold text-zinc-900">
-                  {formatCurrency(result.regionStats.max)}
+                <p className="text-sm text-zinc-500">
+                  Bölge istatistikleri henüz hazır değil. Birkaç saniye sonra tekrar değerleme yapabilirsiniz.
                 </p>
               </CardContent>
             </Card>
-          </div>
+          )}
         </TabsContent>
 
         {/* Harita Tab */}
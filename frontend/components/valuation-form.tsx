@@ -27,7 +27,8 @@ import {
 } from "@/components/ui/select";
 import { Combobox } from "@/components/ui/combobox";
 import { StepProgress, Step } from "@/components/ui/step-progress";
-import { ISTANBUL_DISTRICTS, ROOM_OPTIONS, predictValue } from "@/lib/api";
+import { ROOM_OPTIONS, predictValue } from "@/lib/api";
+import { useDistricts } from "@/hooks/use-districts";
 import { ValuationFormData, PropertyStatus } from "@/lib/types";
 import { addToHistory } from "@/lib/storage";
 
@@ -82,6 +83,7 @@ export function ValuationForm() {
   const router = useRouter();
   const [isLoading, setIsLoading] = useState(false);
   const [selectedDistrict, setSelectedDistrict] = useState<string>("");
+  const districts = useDistricts();
   const [currentStep, setCurrentStep] = useState(1);
   const [hasDraft, setHasDraft] = useState(false);
   const [isSubmitting, setIsSubmitting] = useState(false);
@@ -139,9 +141,9 @@ export function ValuationForm() {
 
   // Seçili ilçeye göre mahalleler
   const neighborhoods = useMemo(() => {
-    const district = ISTANBUL_DISTRICTS.find((d) => d.name === selectedDistrict);
+    const district = districts.find((d) => d.name === selectedDistrict);
     return district?.neighborhoods.map((n) => ({ value: n, label: n })) || [];
-  }, [selectedDistrict]);
+  }, [districts, selectedDistrict]);
 
   // Adım doğrulama
   const validateStep = async (step: number): Promise<boolean> => {
@@ -282,7 +284,7 @@ export function ValuationForm() {
                             </SelectTrigger>
                           </FormControl>
                           <SelectContent>
-                            {ISTANBUL_DISTRICTS.map((district) => (
+                            {districts.map((district) => (
                               <SelectItem key={district.id} value={district.name}>
                                 {district.name}
                               </SelectItem>
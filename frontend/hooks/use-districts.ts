@@ -0,0 +1,25 @@
+"use client";
+
+import { useEffect, useState } from "react";
+import { ISTANBUL_DISTRICTS, fetchDistricts } from "@/lib/api";
+import { District } from "@/lib/types";
+
+/**
+ * İlçe/mahalle listesi
+ * İlk çizimde statik liste, API yanıtı gelince /api/districts listesi
+ */
+export function useDistricts(): District[] {
+  const [districts, setDistricts] = useState<District[]>(ISTANBUL_DISTRICTS);
+
+  useEffect(() => {
+    let active = true;
+    fetchDistricts().then((list) => {
+      if (active) setDistricts(list);
+    });
+    return () => {
+      active = false;
+    };
+  }, []);
+
+  return districts;
+}
@@ -1,4 +1,4 @@
-import { PredictRequest, PredictResponse, ValuationFormData, ValuationResult, OpportunitiesRequest, OpportunitiesResponse, OpportunityItem } from "./types";
+import { PredictRequest, PredictResponse, ValuationFormData, ValuationResult, OpportunitiesRequest, OpportunitiesResponse, OpportunityItem, District } from "./types";
 import { ISTANBUL_DISTRICTS } from "./districts-data";
 
 // Re-export for backward compatibility
@@ -197,12 +197,39 @@ function getLocationMultiplier(district: string): number {
 }
 
 /**
- * İlçe ve mahalle verilerini getirir
+ * İlçe ve mahalle verilerini getirir (statik yedek liste)
  */
 export function getDistricts() {
   return ISTANBUL_DISTRICTS;
 }
 
+// Sayfa ömrü boyunca tek istek; tarayıcı ETag ile yeniden doğrular
+let districtsRequest: Promise<District[]> | null = null;
+
+/**
+ * İlçe ve mahalle listesini API'den getirir (/api/districts)
+ * Backend bağlantısı başarısız olursa statik listeye döner
+ */
+export function fetchDistricts(): Promise<District[]> {
+  if (!districtsRequest) {
+    districtsRequest = fetch(`${API_BASE_URL}/api/districts`)
+      .then(async (response) => {
+        if (!response.ok) {
+          throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        return (data.districts as District[]) || ISTANBUL_DISTRICTS;
+      })
+      .catch((error) => {
+        console.warn("⚠️ İlçe listesi API'den alınamadı, statik liste kullanılıyor:", error);
+        // Sonraki çağrı yeniden denesin
+        districtsRequest = null;
+        return ISTANBUL_DISTRICTS;
+      });
+  }
+  return districtsRequest;
+}
+
 /**
  * Oda sayısı seçenekleri
  */
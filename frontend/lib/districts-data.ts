@@ -3,6 +3,7 @@
  * Bu dosya otomatik olarak oluşturulmuştur.
  * Değişiklik yapmak için scripts/sync-districts.py dosyasını kullanın.
  * Son güncelleme: 39 ilçe, 721 mahalle
+ * Kaynak sha256: b7089c46c3fab502005676c803c4b276135ab977352d896a1e9e9129399789f5
  */
 
 export interface District {
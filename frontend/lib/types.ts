@@ -49,10 +49,11 @@ export interface PredictResponse {
   fair_value_max: number;  // +5%
   advice: InvestmentAdvice;
   diff_percent: number;
-  region_stats: RegionStats;
+  region_stats: RegionStats | null;  // eğitim verisi henüz hazır değilse null
   confidence?: {
     lower: number;
     upper: number;
+    level?: number | null;  // nominal kapsama (ör. 0.8)
   };
 }
 
@@ -64,7 +65,7 @@ export interface ValuationResult {
   listingPrice: number;
   diffPercent: number;
   advice: InvestmentAdvice;
-  regionStats: RegionStats;
+  regionStats: RegionStats | null;
   confidence?: {
     lower: number;
     upper: number;
@@ -114,12 +115,14 @@ export interface OpportunitiesRequest {
   m2?: number;
   rooms?: number;
   limit?: number;
+  cursor?: string;
 }
 
 // Fırsat evleri API yanıtı
 export interface OpportunitiesResponse {
   opportunities: OpportunityItem[];
   totalFound: number;
+  nextCursor?: string | null;
 }
 
 // Sıralama alanları
@@ -4,14 +4,20 @@ Backend'deki processed_data.pkl dosyasından frontend için
 ilçe ve mahalle listesini oluşturan script.
 
 Kullanım:
-  python3 scripts/sync-districts.py
+  python3 scripts/sync-districts.py          # veri değiştiyse yeniden üret
+  python3 scripts/sync-districts.py --force  # her durumda yeniden üret
 
-Bu script frontend/lib/districts-data.ts dosyasını oluşturur.
+Bu script frontend/lib/districts-data.ts dosyasını oluşturur. Frontend listeyi
+çalışırken /api/districts uç noktasından alır; bu dosya API'ye ulaşılamadığında
+kullanılan yedektir. Dosyanın başlığına kaynak verinin sha256 özeti yazılır;
+özet değişmediyse veri hiç okunmaz.
 """
 
-import pickle
+import argparse
+import hashlib
 import json
-import os
+import re
+import sys
 from pathlib import Path
 
 # Proje root dizini
@@ -19,49 +25,51 @@ ROOT_DIR = Path(__file__).parent.parent
 DATA_FILE = ROOT_DIR / "processed_data.pkl"
 OUTPUT_FILE = ROOT_DIR / "frontend" / "lib" / "districts-data.ts"
 
+# Ağaç API ile aynı kodla (api/districts.py) üretilir
+sys.path.insert(0, str(ROOT_DIR / "api"))
 
-def load_districts_from_pickle():
-    """Pickle dosyasından ilçe ve mahalle verilerini yükler."""
-    with open(DATA_FILE, "rb") as f:
-        df = pickle.load(f)
+CHECKSUM_PATTERN = re.compile(r"^ \* Kaynak sha256: ([0-9a-f]{64})$", re.MULTILINE)
 
-    districts_data = {}
-    for _, row in df[["District", "Neighborhood"]].drop_duplicates().iterrows():
-        district = row["District"]
-        neighborhood = row["Neighborhood"]
-        if district not in districts_data:
-            districts_data[district] = []
-        if neighborhood not in districts_data[district]:
-            districts_data[district].append(neighborhood)
 
-    # Alfabetik sırala
-    for district in districts_data:
-        districts_data[district] = sorted(districts_data[district])
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-    return dict(sorted(districts_data.items()))
 
+def load_districts(data_file: Path) -> dict:
+    """Veriden ilçe -> mahalle ağacını oluşturur (yalnızca ilçe/mahalle kolonları)."""
+    # pandas yalnızca yeniden üretimde yüklenir: veri değişmediyse script anında biter
+    import pandas as pd
+    from districts import district_tree
+    from listing_groups import ListingGroups
 
-def generate_typescript(districts_data: dict) -> str:
+    df = pd.read_pickle(data_file)[["District", "Neighborhood"]]
+    return district_tree(ListingGroups(df))
+
+
+def existing_checksum(output_file: Path):
+    """Mevcut çıktının üretildiği verinin özeti (yoksa None)."""
+    if not output_file.exists():
+        return None
+    match = CHECKSUM_PATTERN.search(output_file.read_text(encoding="utf-8"))
+    return match.group(1) if match else None
+
+
+def generate_typescript(districts_data: dict, checksum: str) -> str:
     """TypeScript dosya içeriğini oluşturur."""
-    
-    # District ID oluştur (küçük harf, Türkçe karaktersiz)
-    def to_id(name: str) -> str:
-        replacements = {
-            "ı": "i", "İ": "i", "ğ": "g", "Ğ": "g",
-            "ü": "u", "Ü": "u", "ş": "s", "Ş": "s",
-            "ö": "o", "Ö": "o", "ç": "c", "Ç": "c"
-        }
-        result = name.lower()
-        for tr, en in replacements.items():
-            result = result.replace(tr, en)
-        return result.replace(" ", "-")
+    from districts import district_catalog
 
+    total_neighborhoods = sum(len(n) for n in districts_data.values())
     lines = [
         '/**',
         ' * İstanbul ilçe ve mahalle verileri',
         ' * Bu dosya otomatik olarak oluşturulmuştur.',
         ' * Değişiklik yapmak için scripts/sync-districts.py dosyasını kullanın.',
-        f' * Son güncelleme: {len(districts_data)} ilçe, toplam mahalle sayısı hesaplanıyor...',
+        f' * Son güncelleme: {len(districts_data)} ilçe, {total_neighborhoods} mahalle',
+        f' * Kaynak sha256: {checksum}',
         ' */',
         '',
         'export interface District {',
@@ -73,50 +81,44 @@ def generate_typescript(districts_data: dict) -> str:
         'export const ISTANBUL_DISTRICTS: District[] = ['
     ]
 
-    total_neighborhoods = 0
-    for district_name, neighborhoods in districts_data.items():
-        total_neighborhoods += len(neighborhoods)
-        district_id = to_id(district_name)
-        neighborhoods_str = json.dumps(neighborhoods, ensure_ascii=False)
-        lines.append(f'  {{')
-        lines.append(f'    id: "{district_id}",')
-        lines.append(f'    name: "{district_name}",')
-        lines.append(f'    neighborhoods: {neighborhoods_str},')
-        lines.append(f'  }},')
+    for district in district_catalog(districts_data):
+        lines.append('  {')
+        lines.append(f'    id: "{district["id"]}",')
+        lines.append(f'    name: "{district["name"]}",')
+        lines.append(f'    neighborhoods: {json.dumps(district["neighborhoods"], ensure_ascii=False)},')
+        lines.append('  },')
 
     lines.append('];')
     lines.append('')
     lines.append(f'// Toplam: {len(districts_data)} ilçe, {total_neighborhoods} mahalle')
     lines.append('')
-    
-    # Update the header comment with actual count
-    lines[4] = f' * Son güncelleme: {len(districts_data)} ilçe, {total_neighborhoods} mahalle'
-
     return '\n'.join(lines)
 
 
 def main():
-    print("🔄 Backend verilerinden ilçe/mahalle listesi oluşturuluyor...")
-    
-    if not DATA_FILE.exists():
-        print(f"❌ Veri dosyası bulunamadı: {DATA_FILE}")
+    parser = argparse.ArgumentParser(description="Frontend ilçe/mahalle listesini veriden üret")
+    parser.add_argument("--data", type=Path, default=DATA_FILE, help="processed_data.pkl yolu")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="Üretilecek TypeScript dosyası")
+    parser.add_argument("--force", action="store_true", help="Veri değişmemiş olsa da yeniden üret")
+    args = parser.parse_args()
+
+    if not args.data.exists():
+        print(f"❌ Veri dosyası bulunamadı: {args.data}")
         return 1
 
-    districts_data = load_districts_from_pickle()
-    print(f"✅ {len(districts_data)} ilçe bulundu")
-
-    total_neighborhoods = sum(len(n) for n in districts_data.values())
-    print(f"✅ {total_neighborhoods} mahalle bulundu")
+    checksum = file_sha256(args.data)
+    if not args.force and existing_checksum(args.output) == checksum:
+        print(f"✅ {args.output.name} güncel (veri değişmedi), atlanıyor")
+        return 0
 
-    typescript_content = generate_typescript(districts_data)
-
-    # Çıktı dizinini oluştur
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    print("🔄 Backend verilerinden ilçe/mahalle listesi oluşturuluyor...")
+    districts_data = load_districts(args.data)
+    print(f"✅ {len(districts_data)} ilçe, {sum(len(n) for n in districts_data.values())} mahalle bulundu")
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write(typescript_content)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(generate_typescript(districts_data, checksum), encoding="utf-8")
 
-    print(f"✅ Dosya oluşturuldu: {OUTPUT_FILE}")
+    print(f"✅ Dosya oluşturuldu: {args.output}")
     return 0
 
 
@@ -0,0 +1,436 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from itertools import count, product
+
+import numpy as np
+import pandas as pd
+
+# Add api directory to path to import predictor and request models
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api'))
+sys.path.append(API_DIR)
+from check_parity import requests_from_training_data
+from load_benchmark import SAMPLE_REQUEST, Client, free_port, start_server
+from models import ComparablesRequest
+
+# Karşılaştırmada bu orandan fazla yavaşlama regresyon sayılır
+DEFAULT_THRESHOLD = 0.20
+# Bu mutlak farkın altındaki (saniye) değişimler gürültü kabul edilir
+NOISE_FLOOR_SECONDS = 20e-6
+
+TRANSFORM_ROWS = (1, 100, 10000)
+# Mikro-batch ölçümünde eşzamanlı istemci sayıları
+BATCHING_CLIENTS = (1, 8, 32)
+
+COLD_LOAD_SCRIPT = """
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+started = time.perf_counter()
+sys.path.insert(0, {api_dir!r})
+from predictor import HousePricePredictor
+predictor = HousePricePredictor()
+predictor.load({models_dir!r}, background=False, prefer_bundle={prefer_bundle!r})
+from_bundle = predictor._state.source != str(predictor.source_paths()["model.pkl"].parent)
+print(json.dumps({{"seconds": time.perf_counter() - started, "source": predictor._state.source,
+                  "from_bundle": from_bundle, "timings": predictor.startup_timings}}))
+"""
+
+
+def time_calls(fn, repeat, warmup=3):
+    """fn()'i warmup kez ısıt, sonra repeat kez çağır; çağrı başına süreler (saniye)"""
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - started
+    return timings
+
+
+def summarize(group, timings, **extra):
+    """Süre dizisinden sonuç kaydı (karşılaştırma medyan üzerinden yapılır)"""
+    return {
+        "group": group,
+        "metric": "median",
+        "median": float(np.median(timings)),
+        "p95": float(np.percentile(timings, 95)),
+        "mean": float(timings.mean()),
+        "min": float(timings.min()),
+        "n": int(len(timings)),
+        **extra
+    }
+
+
+def bench_predict(predictor, requests, repeat):
+    results = {}
+    request = requests[0]
+    results["predict/cache_hit"] = summarize("predict", time_calls(lambda: predictor.predict(request), repeat))
+
+    # Her çağrıdan önce önbellek boşaltılır: özellik hazırlama + model + sonuç
+    def miss():
+        predictor.predict_cache.clear()
+        predictor.predict(request)
+    results["predict/cache_miss"] = summarize("predict", time_calls(miss, repeat))
+
+    # Farklı isteklerle (önbellek temiz): bölge istatistikleri de değişir
+    cycle = count()
+
+    def varied():
+        predictor.predict_cache.clear()
+        predictor.predict(requests[next(cycle) % len(requests)])
+    results["predict/varied_requests"] = summarize("predict", time_calls(varied, repeat))
+
+    # Paketten yüklemede sklearn Pipeline yok: DataFrame yolu yalnızca pickle'larla ölçülür
+    if predictor.model is not None:
+        results["predict/dataframe_path"] = summarize(
+            "predict", time_calls(lambda: predictor.predict_dataframe(request), max(repeat // 10, 20))
+        )
+    return results
+
+
+def pick_districts(df):
+    """Büyük ve küçük (indeks eşiği olan 20 satırın üstündeki en küçük) ilçe + bilinmeyen ilçe"""
+    counts = df['District'].value_counts()
+    large = counts.index[0]
+    small = counts[counts >= 20].index[-1]
+    return {"large": large, "small": small, "unknown": "Bilinmeyen"}
+
+
+def bench_opportunities(predictor, repeat):
+    df = predictor.training_data
+    results = {}
+    for size, district in pick_districts(df).items():
+        rows = df[df['District'] == district]
+        if len(rows):
+            # İlçenin en kalabalık mahallesi ve tipik m²/oda değerleri
+            neighborhood = rows['Neighborhood'].value_counts().index[0]
+            m2 = float(rows['m² (Net)'].median())
+            rooms = int(rows['Rooms_Num'].median())
+        else:
+            neighborhood, m2, rooms = "Bilinmeyen", 100.0, 3
+
+        for use_neighborhood, use_m2, use_rooms in product((False, True), repeat=3):
+            args = (
+                district,
+                neighborhood if use_neighborhood else None,
+                m2 if use_m2 else None,
+                rooms if use_rooms else None,
+                10
+            )
+            filters = "+".join(
+                name for name, used in (("neighborhood", use_neighborhood), ("m2", use_m2), ("rooms", use_rooms))
+                if used
+            ) or "district_only"
+            results[f"opportunities/{size}/{filters}"] = summarize(
+                "opportunities",
+                time_calls(lambda: predictor.get_opportunities(*args), repeat),
+                district=district
+            )
+
+        # Aynı hedefle benzerlik sıralaması ve emsal araması (KD-tree)
+        results[f"opportunities/{size}/similarity"] = summarize(
+            "opportunities",
+            time_calls(lambda: predictor.get_opportunities(district, None, m2, rooms, 10, "similarity"), repeat),
+            district=district
+        )
+        request = ComparablesRequest(district=district, m2=m2, rooms=rooms, building_age=10, k=10)
+        results[f"comparables/{size}"] = summarize(
+            "opportunities",
+            time_calls(lambda: predictor.get_comparables(request, request.k), repeat),
+            district=district
+        )
+    return results
+
+
+def bench_transform(predictor, requests, repeat):
+    results = {}
+    encoder = predictor.encoder
+    for n in TRANSFORM_ROWS:
+        batch = [requests[i % len(requests)] for i in range(n)]
+        frame = pd.DataFrame(predictor.prepare_batch_features(batch))
+        calls = max(repeat // max(n // 100, 1), 10)
+        results[f"transform/{n}_rows"] = summarize(
+            "transform", time_calls(lambda: encoder.transform(frame), calls), rows=n
+        )
+    return results
+
+
+def bench_cold_load(models_dir, repeat):
+    """Ayrı Python süreçlerinde load() (import süreleri dahil)"""
+    results = {}
+    for prefer_bundle in (False, True):
+        script = COLD_LOAD_SCRIPT.format(api_dir=API_DIR, models_dir=models_dir, prefer_bundle=prefer_bundle)
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", script], capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        # Paket yoksa (veya eskiyse) ikinci tur da pickle'lardan yükler
+        if prefer_bundle and not runs[-1]["from_bundle"]:
+            print("⚠️ cold_load/bundle skipped: no valid bundle (run api/artifacts.py)")
+            continue
+        name = "cold_load/bundle" if prefer_bundle else "cold_load/pickle"
+        results[name] = summarize(
+            "cold_load", np.array([run["seconds"] for run in runs]),
+            source=runs[-1]["source"], phases=runs[-1]["timings"]
+        )
+    return results
+
+
+def run_load(url, method, path, make_body, clients, duration):
+    """clients thread'i duration saniye istek gönderir -> (başarılı istek süreleri, hata sayısı, geçen süre)"""
+    stop = threading.Event()
+    samples = []
+
+    def worker():
+        client = Client(url)
+        while not stop.is_set():
+            samples.append(client.request(method, path, make_body()))
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ok = np.array([seconds for status, seconds in samples if status == 200])
+    return ok, len(samples) - len(ok), elapsed
+
+
+def bench_http(duration, clients):
+    """Uygulamayı aynı süreçte uvicorn ile başlatıp uç nokta başına istek/saniye ölç"""
+    import logging
+    logging.getLogger("uvicorn.access").disabled = True
+
+    port = free_port()
+    server = start_server(port)
+    url = f"http://127.0.0.1:{port}"
+
+    opportunities = {"district": "Kadıköy", "m2": 100, "rooms": 3}
+    scenarios = {
+        "http/health": ("GET", "/health", None),
+        "http/predict": ("POST", "/api/predict", SAMPLE_REQUEST),
+        "http/opportunities": ("POST", "/api/opportunities", opportunities),
+        "http/comparables": ("POST", "/api/comparables", opportunities),
+        "http/analytics_regions": ("GET", "/api/analytics/regions", None),
+        "http/predict_batch_100": ("POST", "/api/predict/batch", [SAMPLE_REQUEST] * 100),
+    }
+
+    results = {}
+    for name, (method, path, body) in scenarios.items():
+        ok, errors, elapsed = run_load(url, method, path, lambda body=body: body, clients, duration)
+        if len(ok) == 0:
+            print(f"⚠️ {name}: no successful requests")
+            continue
+        results[name] = {
+            **summarize("http", ok, clients=clients, errors=errors),
+            "metric": "rps",
+            "rps": len(ok) / elapsed
+        }
+
+    server.should_exit = True
+    return results
+
+
+def bench_batching(requests, duration, client_counts, waits_ms):
+    """/api/predict mikro-batch ayarlarına göre istek/saniye ve gecikme (verim - gecikme dengesi)
+
+    Her istek farklı bir m² ile gönderilir: önbellek isabeti ve tekilleştirme ölçümü bozmaz.
+    """
+    import logging
+    import main
+    logging.getLogger("uvicorn.access").disabled = True
+
+    port = free_port()
+    server = start_server(port)
+    url = f"http://127.0.0.1:{port}"
+    bodies = [request.model_dump() for request in requests]
+    unique = count()
+
+    def make_body():
+        i = next(unique)
+        body = dict(bodies[i % len(bodies)])
+        body["m2"] = body["m2"] + (i + 1) * 1e-6
+        return body
+
+    batcher = main.predict_batcher
+    configured = batcher.max_wait
+    results = {}
+    try:
+        for wait_ms in waits_ms:
+            batcher.max_wait = wait_ms / 1000
+            for clients in client_counts:
+                ok, errors, elapsed = run_load(url, "POST", "/api/predict", make_body, clients, duration)
+                if len(ok) == 0:
+                    print(f"⚠️ batching/wait_{wait_ms:g}ms/clients_{clients}: no successful requests")
+                    continue
+                results[f"batching/wait_{wait_ms:g}ms/clients_{clients}"] = {
+                    **summarize("batching", ok, clients=clients, wait_ms=wait_ms,
+                                max_size=batcher.max_size, errors=errors),
+                    "metric": "rps",
+                    "rps": len(ok) / elapsed
+                }
+    finally:
+        batcher.max_wait = configured
+        server.should_exit = True
+    return results
+
+
+def environment_info(predictor):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=API_DIR
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    import lightgbm
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "model_version": predictor.model_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "libraries": {"numpy": np.__version__, "pandas": pd.__version__, "lightgbm": lightgbm.__version__}
+    }
+
+
+def compare(results, baseline, threshold):
+    """Sonuçları baseline ile karşılaştır; regresyon olan vaka adlarını döndür"""
+    regressions = []
+    print(f"\n{'case':<52} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current in results["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            print(f"{name:<52} {'-':>12} {format_value(current):>12}      new")
+            continue
+        metric = current["metric"]
+        old, new = base[metric], current[metric]
+        change = (new - old) / old if old else 0.0
+        if metric == "rps":
+            # Verim: düşüş kötü
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold and (new - old) > NOISE_FLOOR_SECONDS
+        flag = "  ❌" if regressed else ""
+        print(f"{name:<52} {format_value(base):>12} {format_value(current):>12} {change:>+8.1%}{flag}")
+        if regressed:
+            regressions.append(name)
+    missing = sorted(set(baseline["cases"]) - set(results["cases"]))
+    for name in missing:
+        print(f"{name:<52} {format_value(baseline['cases'][name]):>12} {'-':>12}  missing")
+    return regressions
+
+
+def report(regressions, threshold) -> int:
+    """Karşılaştırma özetini yaz, çıkış kodunu döndür"""
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+def format_value(case):
+    if case["metric"] == "rps":
+        return f"{case['rps']:.0f} rps"
+    seconds = case["median"]
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark predictor and API hot paths, optionally comparing with a baseline.')
+    parser.add_argument('--models_dir', type=str, default=None, help='Path to the models directory')
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--baseline', type=str, default=None, help='Baseline JSON to compare against (exit 1 on regression)')
+    parser.add_argument('--compare', type=str, default=None, help='Compare this results JSON with --baseline without running')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown ratio (default: 0.20)')
+    parser.add_argument('--groups', type=str, default='predict,opportunities,transform,cold_load,http',
+                        help='Comma separated groups to run (also: batching)')
+    parser.add_argument('--repeat', type=int, default=2000, help='Calls per micro benchmark case')
+    parser.add_argument('--cold_runs', type=int, default=3, help='Processes per cold load case')
+    parser.add_argument('--http_duration', type=float, default=5, help='Seconds per HTTP scenario')
+    parser.add_argument('--http_clients', type=int, default=8, help='Concurrent HTTP clients')
+    parser.add_argument('--batch_waits', type=str, default='0,1,2,5',
+                        help='Micro-batch max waits (ms) measured by the batching group (0 = off)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for generated requests')
+    args = parser.parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare requires --baseline")
+        with open(args.compare, encoding='utf-8') as f:
+            results = json.load(f)
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        sys.exit(report(compare(results, baseline, args.threshold), args.threshold))
+
+    groups = set(args.groups.split(','))
+    warnings.simplefilter('ignore')
+    from predictor import HousePricePredictor
+    predictor = HousePricePredictor()
+    predictor.load(args.models_dir, background=False)
+    if predictor.training_data is None:
+        print("Error: training data not found")
+        sys.exit(1)
+
+    sample = predictor.training_data.dropna(subset=['Rooms_Num', 'Number of floors']).sample(
+        n=500, random_state=args.seed
+    )
+    requests = requests_from_training_data(sample, args.seed)
+
+    cases = {}
+    steps = [
+        ("predict", lambda: bench_predict(predictor, requests, args.repeat)),
+        ("opportunities", lambda: bench_opportunities(predictor, args.repeat)),
+        ("transform", lambda: bench_transform(predictor, requests, args.repeat)),
+        ("cold_load", lambda: bench_cold_load(args.models_dir, args.cold_runs)),
+        ("http", lambda: bench_http(args.http_duration, args.http_clients)),
+        ("batching", lambda: bench_batching(
+            requests, args.http_duration, BATCHING_CLIENTS, [float(ms) for ms in args.batch_waits.split(',')]
+        )),
+    ]
+    for group, run in steps:
+        if group not in groups:
+            continue
+        started = time.perf_counter()
+        group_results = run()
+        cases.update(group_results)
+        print(f"✅ {group}: {len(group_results)} cases ({time.perf_counter() - started:.1f} s)")
+
+    results = {"environment": environment_info(predictor), "cases": cases}
+
+    print(f"\n{'case':<52} {'median':>12} {'p95':>12}")
+    for name, case in cases.items():
+        p95 = "" if case["metric"] == "rps" else format_value({"metric": "median", "median": case["p95"]})
+        print(f"{name:<52} {format_value(case):>12} {p95:>12}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        sys.exit(report(compare(results, baseline, args.threshold), args.threshold))
+
+
+if __name__ == "__main__":
+    main()
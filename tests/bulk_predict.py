@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+from pydantic import ValidationError
+
+# Add api directory to path to import predictor and request models
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api')))
+from models import PredictRequest
+from predictor import HousePricePredictor
+
+OUTPUT_COLUMNS = [
+    'index', 'id', 'fair_value', 'fair_value_min', 'fair_value_max', 'advice', 'diff_percent',
+    'confidence_lower', 'confidence_upper',
+    'region_min', 'region_max', 'region_avg', 'region_median', 'region_count', 'model_version', 'error'
+]
+# Parquet kolon tipleri (listede olmayanlar float64); şema OUTPUT_COLUMNS'tan üretilir
+PARQUET_TYPES = {
+    'index': 'int64', 'id': 'string', 'advice': 'string', 'region_count': 'int64',
+    'model_version': 'string', 'error': 'string',
+}
+
+
+def iter_ndjson_chunks(path, chunk_size):
+    """NDJSON dosyasını satır satır okuyup sabit boyutlu parçalar halinde döndür."""
+    chunk = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                chunk.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                chunk.append(ValueError(f"Invalid JSON line: {e}"))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv_chunks(path, chunk_size, sep):
+    """CSV dosyasını parça parça oku; boş hücreler None olur (varsayılan değerler için)."""
+    for df in pd.read_csv(path, sep=sep, chunksize=chunk_size):
+        df = df.astype(object).where(df.notna(), None)
+        yield df.to_dict('records')
+
+
+def to_output_row(index, record_id, result=None, error=None):
+    """Tahmin sonucunu düz (flat) çıktı satırına dönüştür."""
+    row = dict.fromkeys(OUTPUT_COLUMNS)
+    row['index'] = index
+    row['id'] = record_id
+    if error is not None:
+        row['error'] = error
+        return row
+    # Eğitim verisi yoksa bölge istatistikleri null: region_* kolonları boş kalır
+    region = result['region_stats'] or {}
+    confidence = result.get('confidence') or {}
+    row.update({
+        'fair_value': result['fair_value'],
+        'fair_value_min': result['fair_value_min'],
+        'fair_value_max': result['fair_value_max'],
+        'advice': result['advice'],
+        'diff_percent': result['diff_percent'],
+        'model_version': result.get('model_version'),
+        'confidence_lower': confidence.get('lower'),
+        'confidence_upper': confidence.get('upper'),
+        'region_min': region.get('min'),
+        'region_max': region.get('max'),
+        'region_avg': region.get('avg'),
+        'region_median': region.get('median'),
+        'region_count': region.get('count'),
+    })
+    return row
+
+
+def score_chunk(predictor, records, start_index, id_field):
+    """Parçayı doğrula, tek toplu çağrıyla tahmin et ve çıktı satırlarını döndür."""
+    rows = [None] * len(records)
+    valid_positions = []
+    valid_requests = []
+    for i, record in enumerate(records):
+        if isinstance(record, Exception):
+            rows[i] = to_output_row(start_index + i, None, error=str(record))
+            continue
+        if not isinstance(record, dict):
+            rows[i] = to_output_row(
+                start_index + i, None, error=f"Expected a JSON object, got {type(record).__name__}"
+            )
+            continue
+        record_id = record.get(id_field) if id_field else None
+        try:
+            valid_requests.append(PredictRequest.model_validate(record))
+            valid_positions.append(i)
+        except ValidationError as e:
+            rows[i] = to_output_row(start_index + i, record_id, error=str(e))
+
+    predictions = predictor.predict_batch(valid_requests)
+    for i, prediction in zip(valid_positions, predictions):
+        record_id = records[i].get(id_field) if id_field else None
+        if isinstance(prediction, Exception):
+            rows[i] = to_output_row(start_index + i, record_id, error=str(prediction))
+        else:
+            rows[i] = to_output_row(start_index + i, record_id, result=prediction)
+    return rows
+
+
+class NDJSONWriter:
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row, ensure_ascii=False, default=str))
+            self.f.write('\n')
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Error: Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            (column, pa.type_for_alias(PARQUET_TYPES.get(column, 'float64'))) for column in OUTPUT_COLUMNS
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        for row in rows:
+            if row['id'] is not None:
+                row['id'] = str(row['id'])
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk valuation of an NDJSON/CSV listing feed.')
+    parser.add_argument('--input', type=str, required=True, help='Path to the NDJSON (.jsonl/.ndjson) or CSV input')
+    parser.add_argument('--output', type=str, required=True, help='Path to the output (.jsonl/.ndjson or .parquet)')
+    parser.add_argument('--models_dir', type=str, default=None, help='Path to the models directory')
+    parser.add_argument('--chunk_size', type=int, default=5000, help='Rows scored per batch')
+    parser.add_argument('--id_field', type=str, default=None, help='Input field copied to the output as id')
+    parser.add_argument('--sep', type=str, default=',', help='CSV separator')
+    args = parser.parse_args()
+
+    input_is_csv = args.input.lower().endswith('.csv')
+    output_is_parquet = args.output.lower().endswith('.parquet')
+
+    print("Loading model...")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        predictor = HousePricePredictor()
+        predictor.load(args.models_dir, background=False)
+
+    if input_is_csv:
+        chunks = iter_csv_chunks(args.input, args.chunk_size, args.sep)
+    else:
+        chunks = iter_ndjson_chunks(args.input, args.chunk_size)
+
+    writer = ParquetWriter(args.output) if output_is_parquet else NDJSONWriter(args.output)
+
+    print(f"Scoring {args.input} -> {args.output} (chunk size {args.chunk_size})...")
+    total = 0
+    failed = 0
+    started = time.perf_counter()
+    try:
+        for records in chunks:
+            rows = score_chunk(predictor, records, total, args.id_field)
+            writer.write(rows)
+            total += len(rows)
+            failed += sum(1 for row in rows if row['error'] is not None)
+            elapsed = time.perf_counter() - started
+            print(f"  {total:,} rows | {failed:,} errors | {total / max(elapsed, 1e-9):,.0f} rows/sec")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print("=" * 30)
+    print(f"Rows:     {total:,}")
+    print(f"Errors:   {failed:,}")
+    print(f"Elapsed:  {elapsed:.1f} s")
+    print(f"Rate:     {total / max(elapsed, 1e-9):,.0f} rows/sec")
+    print("=" * 30)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,61 +4,182 @@ import joblib
 import argparse
 import sys
 import os
-from sklearn.metrics import r2_score, mean_squared_error
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-# Add parent directory to path to import encoder
+# Add parent directory to path to import encoder, api directory for the shared feature pipeline
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from encoder import Optimization
-
-def clean_price(price_str):
-    """Clean price string to integer."""
-    if pd.isna(price_str):
-        return np.nan
-    clean_str = str(price_str).replace(' TL', '').replace('.', '').strip()
-    try:
-        return int(clean_str)
-    except ValueError:
-        return np.nan
-
-def clean_rooms(room_str):
-    """Convert '3+1' format to total rooms."""
-    if pd.isna(room_str):
-        return np.nan
-    try:
-        parts = str(room_str).split('+')
-        return sum(int(p) for p in parts)
-    except:
-        if "Stüdyo" in str(room_str):
-            return 1
-        return np.nan
-
-def clean_age(age_str):
-    """Convert age string to numeric."""
-    if pd.isna(age_str):
-        return np.nan
-    s = str(age_str)
-    if "0" == s: return 0
-    if "1-5" in s: return 3
-    if "5-10" in s: return 7.5
-    if "11-15" in s: return 13
-    if "16-20" in s: return 18
-    if "21-25" in s: return 23
-    if "26-30" in s: return 28
-    if "31 ve üzeri" in s: return 35
-    try:
-        return int(s)
-    except:
-        return np.nan
-
-def clean_balcony(val):
-    if pd.isna(val): return 0
-    if 'Available' in str(val) or 'Yes' in str(val): return 1
-    return 0
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api')))
+from encoder import Optimization  # noqa: F401 - needed for pickle
+import features
+
+
+class Metrics:
+    """Streaming regression metrics; partial results from chunks/processes can be merged."""
+
+    __slots__ = ('n', 'mean', 'm2', 'sse', 'sae', 'sape', 'ape_n')
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, sse=0.0, sae=0.0, sape=0.0, ape_n=0):
+        self.n = n
+        self.mean = mean  # mean of y_true
+        self.m2 = m2      # sum of squared deviations of y_true (R² denominator)
+        self.sse = sse
+        self.sae = sae
+        self.sape = sape  # sum of absolute percentage errors (y_true != 0)
+        self.ape_n = ape_n
+
+    def merge(self, other):
+        """Combine with another partial result (Chan et al. parallel variance)."""
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.sse += other.sse
+        self.sae += other.sae
+        self.sape += other.sape
+        self.ape_n += other.ape_n
+        return self
+
+    @classmethod
+    def by_group(cls, codes, n_groups, y_true, y_pred):
+        """One Metrics per group code (vectorized with bincount)."""
+        error = y_true - y_pred
+        nonzero = y_true != 0
+        ape = np.zeros_like(y_true)
+        ape[nonzero] = np.abs(error[nonzero] / y_true[nonzero])
+
+        def total(weights=None):
+            return np.bincount(codes, weights=weights, minlength=n_groups)
+
+        counts = total()
+        means = total(y_true) / np.maximum(counts, 1)
+        m2 = total((y_true - means[codes]) ** 2)
+        sse, sae = total(error ** 2), total(np.abs(error))
+        sape, ape_n = total(ape), total(nonzero.astype(np.float64))
+        return [
+            cls(int(counts[g]), means[g], m2[g], sse[g], sae[g], sape[g], int(ape_n[g]))
+            for g in range(n_groups)
+        ]
+
+    def result(self) -> dict:
+        return {
+            'count': self.n,
+            'r2': 1 - self.sse / self.m2 if self.m2 > 0 else np.nan,
+            'rmse': np.sqrt(self.sse / self.n) if self.n else np.nan,
+            'mae': self.sae / self.n if self.n else np.nan,
+            'mape': self.sape / self.ape_n * 100 if self.ape_n else np.nan,
+        }
+
+
+# Per-process evaluation context (set once per worker by init_context)
+_context = {}
+
+def init_context(model_path, encoder_path, medians, bounds, single_thread=False):
+    model = joblib.load(model_path)
+    if single_thread:
+        # Processes already use every core; avoid oversubscribing LightGBM threads
+        try:
+            model.set_params(regressor__n_jobs=1)
+        except ValueError:
+            pass
+    _context.update(model=model, encoder=joblib.load(encoder_path), medians=medians, bounds=bounds)
+
+def evaluate_chunk(chunk):
+    """Clean, fill, filter and predict one raw chunk -> (overall, {district: Metrics}, dropped)."""
+    df_model = features.fill_missing(features.clean_listings(chunk), _context['medians'])
+    lower_bound, upper_bound = _context['bounds']
+    in_range = (df_model['Price'] >= lower_bound) & (df_model['Price'] <= upper_bound)
+    dropped = int((~in_range).sum())
+    df_model = df_model[in_range]
+    if df_model.empty:
+        return Metrics(), {}, dropped
+
+    X, y = features.split_target(df_model)
+    y_true = y.to_numpy(dtype=np.float64)
+    y_pred = np.asarray(_context['model'].predict(_context['encoder'].transform(X)), dtype=np.float64)
+
+    codes, districts = pd.factorize(df_model['District'])
+    per_district = Metrics.by_group(codes, len(districts), y_true, y_pred)
+    overall = Metrics.by_group(np.zeros(len(y_true), dtype=np.intp), 1, y_true, y_pred)[0]
+    return overall, dict(zip(districts, per_district)), dropped
+
+def read_chunks(path, sep, chunk_size, columns=features.RAW_COLUMNS):
+    return pd.read_csv(
+        path, sep=sep, usecols=lambda c: c in columns, dtype=features.RAW_TEXT_DTYPES, chunksize=chunk_size
+    )
+
+def detect_separator(path):
+    with open(path, encoding='utf-8', errors='replace') as f:
+        header = f.readline()
+    return ';' if ';' in header else ','
+
+def scan_statistics(path, sep, chunk_size):
+    """Pass 1: dataset-wide medians (NaN fills) and price quantiles (outlier filter).
+
+    Only the cleaned numeric columns are kept, not the raw text.
+    """
+    columns = ['Price', 'm² (Net)', 'Number of rooms', 'Building Age', 'Number of bathrooms', 'Number of floors']
+    values = {col: [] for col in ['Price'] + features.NUMERIC_COLUMNS}
+    rows = 0
+    for chunk in read_chunks(path, sep, chunk_size, columns):
+        rows += len(chunk)
+        df_model = features.clean_listings(chunk)
+        for col in values:
+            values[col].append(df_model[col].to_numpy(dtype=np.float64))
+
+    values = {col: np.concatenate(parts) if parts else np.empty(0) for col, parts in values.items()}
+    medians = {}
+    for col in features.NUMERIC_COLUMNS:
+        present = values[col][~np.isnan(values[col])]
+        medians[col] = float(np.median(present)) if len(present) else np.nan
+    prices = values['Price']
+    return rows, len(prices), medians, features.price_bounds(prices)
+
+def evaluate(path, sep, chunk_size, workers, context_args):
+    """Pass 2: stream chunks through the model, merging partial metrics."""
+    overall = Metrics()
+    districts = {}
+    dropped = 0
+
+    def merge(result):
+        nonlocal dropped
+        chunk_overall, chunk_districts, chunk_dropped = result
+        overall.merge(chunk_overall)
+        for district, metrics in chunk_districts.items():
+            districts.setdefault(district, Metrics()).merge(metrics)
+        dropped += chunk_dropped
+
+    chunks = read_chunks(path, sep, chunk_size)
+    if workers <= 1:
+        init_context(*context_args)
+        for chunk in chunks:
+            merge(evaluate_chunk(chunk))
+        return overall, districts, dropped
+
+    # At most 2 chunks per worker in flight: memory stays bounded
+    with ProcessPoolExecutor(workers, initializer=init_context, initargs=(*context_args, True)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(evaluate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                merge(pending.popleft().result())
+        while pending:
+            merge(pending.popleft().result())
+    return overall, districts, dropped
 
 def main():
-    parser = argparse.ArgumentParser(description='Calculate R2 and RMSE for a dataset.')
+    parser = argparse.ArgumentParser(description='Calculate R2, RMSE, MAE and MAPE (overall and per district) for a dataset.')
     parser.add_argument('--data_path', type=str, required=True, help='Path to the CSV dataset')
     parser.add_argument('--models_dir', type=str, default='models', help='Path to the models directory')
+    parser.add_argument('--chunk_size', type=int, default=200000, help='Rows read per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used for prediction (0 = all cores)')
+    parser.add_argument('--sep', type=str, default=None, help='CSV separator (default: detect ; or ,)')
+    parser.add_argument('--top_districts', type=int, default=20, help='Districts shown in the breakdown (0 = all)')
+    parser.add_argument('--district_csv', type=str, default=None, help='Write per-district metrics to this CSV')
     args = parser.parse_args()
 
     # Paths
@@ -66,110 +187,69 @@ def main():
     models_dir = os.path.join(base_dir, args.models_dir)
     model_path = os.path.join(models_dir, 'model.pkl')
     encoder_path = os.path.join(models_dir, 'encoder.pkl')
+    for path in (model_path, encoder_path, args.data_path):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found")
+            return
+
+    sep = args.sep or detect_separator(args.data_path)
+    workers = args.workers or os.cpu_count()
+    started = time.perf_counter()
 
-    print(f"Loading model from {model_path}...")
     try:
-        model = joblib.load(model_path)
-        encoder = joblib.load(encoder_path)
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
+        header = pd.read_csv(args.data_path, sep=sep, nrows=0).columns
+    except Exception as e:
+        print(f"Error reading CSV: {e}")
         return
+    if 'Price' not in header:
+        print(f"Error: 'Price' column not found (separator {sep!r})")
+        return
+    missing_cols = [c for c in features.RAW_COLUMNS if c not in header]
+    if missing_cols:
+        print(f"Warning: Missing columns in dataset: {missing_cols}")
 
-    print(f"Loading data from {args.data_path}...")
+    # Preprocessing (Identical to notebook), in two streaming passes
+    print(f"Scanning {args.data_path} (pass 1: medians and price quantiles)...")
     try:
-        df = pd.read_csv(args.data_path, sep=';')
+        rows, priced_rows, medians, bounds = scan_statistics(args.data_path, sep, args.chunk_size)
     except Exception as e:
         print(f"Error reading CSV: {e}")
-        # Try comma separator
-        try:
-            df = pd.read_csv(args.data_path, sep=',')
-        except:
-            return
+        return
+    print(f"Rows: {rows}, with a valid price: {priced_rows}")
+    print(f"Applying outlier filter (1%-99%): {bounds[0]:,.0f} TL - {bounds[1]:,.0f} TL")
 
-    # Preprocessing (Identical to notebook)
-    print("Preprocessing data...")
-    
-    # Clean Price
-    df['Price'] = df['Price'].apply(clean_price)
-    df = df.dropna(subset=['Price'])
-    
-    # Feature Engineering
-    for col in ['m² (Gross)', 'm² (Net)']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    df['Rooms_Num'] = df['Number of rooms'].apply(clean_rooms)
-    df['Age_Num'] = df['Building Age'].apply(clean_age)
-    df['Room_Size_Ratio'] = df['m² (Net)'] / df['Rooms_Num'].replace(0, 1)
-    df['Balcony_Bool'] = df['Balcony'].apply(clean_balcony)
-
-    for col in ['Number of bathrooms', 'Number of floors']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Select columns
-    keep_cols = [
-        'Price', 'District', 'Neighborhood', 
-        'm² (Net)', 'Rooms_Num', 'Age_Num', 'Room_Size_Ratio',
-        'Floor location', 'Heating', 'Number of bathrooms', 'Number of floors',
-        'Balcony_Bool', 'Elevator', 'Parking Lot', 'Security'
-    ]
-    
-    # Ensure all columns exist
-    missing_cols = [c for c in keep_cols if c not in df.columns]
-    if missing_cols:
-        print(f"Warning: Missing columns in dataset: {missing_cols}")
-        for c in missing_cols:
-            df[c] = 0 # Dummy fill
-            
-    df_model = df[keep_cols].copy()
-
-    # Fill NaNs
-    binary_cols = ['Balcony_Bool', 'Elevator', 'Parking Lot', 'Security']
-    for col in binary_cols:
-        if col in df_model.columns:
-            df_model[col] = pd.to_numeric(df_model[col], errors='coerce').fillna(0)
-
-    num_cols = ['m² (Net)', 'Rooms_Num', 'Age_Num', 'Room_Size_Ratio', 'Number of bathrooms', 'Number of floors']
-    for col in num_cols:
-        if col in df_model.columns:
-            df_model[col] = df_model[col].fillna(df_model[col].median())
-
-    cat_cols = ['District', 'Neighborhood', 'Floor location', 'Heating']
-    for col in cat_cols:
-        if col in df_model.columns:
-            df_model[col] = df_model[col].fillna("Unknown")
-
-    # Outlier Removal (Match Notebook)
-    lower_bound = df_model['Price'].quantile(0.01)
-    upper_bound = df_model['Price'].quantile(0.99)
-    print(f"Applying outlier filter (1%-99%): {lower_bound:,.0f} TL - {upper_bound:,.0f} TL")
-    
-    initial_len = len(df_model)
-    df_model = df_model[(df_model['Price'] >= lower_bound) & (df_model['Price'] <= upper_bound)]
-    print(f"Dropped {initial_len - len(df_model)} outliers. Remaining: {len(df_model)}")
-
-    # X, y split
-    y_true = df_model['Price']
-    X = df_model.drop(columns=['Price'])
-
-    # Transform
-    print("Predicting...")
+    print(f"Predicting (pass 2, {workers} worker{'s' if workers > 1 else ''})...")
     try:
-        X_enc = encoder.transform(X)
-        y_pred = model.predict(X_enc)
+        overall, districts, dropped = evaluate(
+            args.data_path, sep, args.chunk_size, workers, (model_path, encoder_path, medians, bounds)
+        )
     except Exception as e:
         print(f"Prediction error: {e}")
         return
+    print(f"Dropped {dropped} outliers. Remaining: {overall.n}")
 
     # Metrics
-    r2 = r2_score(y_true, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-
+    result = overall.result()
     print("="*30)
-    print(f"R² Score: {r2:.4f}")
-    print(f"RMSE:     {rmse:,.0f}")
+    print(f"R² Score: {result['r2']:.4f}")
+    print(f"RMSE:     {result['rmse']:,.0f}")
+    print(f"MAE:      {result['mae']:,.0f}")
+    print(f"MAPE:     {result['mape']:.2f}%")
     print("="*30)
 
+    breakdown = pd.DataFrame(
+        [{'district': district, **metrics.result()} for district, metrics in districts.items()]
+    ).sort_values('count', ascending=False)
+    shown = breakdown if args.top_districts == 0 else breakdown.head(args.top_districts)
+    print(f"\nPer-district metrics ({len(shown)} of {len(breakdown)} districts, by row count):")
+    print(shown.to_string(
+        index=False,
+        formatters={'r2': '{:.4f}'.format, 'rmse': '{:,.0f}'.format, 'mae': '{:,.0f}'.format, 'mape': '{:.2f}%'.format}
+    ))
+    if args.district_csv:
+        breakdown.to_csv(args.district_csv, index=False)
+        print(f"\nPer-district metrics written to {args.district_csv}")
+    print(f"\nDone in {time.perf_counter() - started:.1f} s")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,255 @@
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Add api directory to path to import predictor and request models
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api')))
+import features
+from models import PredictRequest
+from predictor import HousePricePredictor
+
+# Ham CSV'de görülen değer biçimleri (vektörel temizleme, tekil clean_* fonksiyonlarıyla aynı mı)
+RAW_SAMPLES = {
+    'Price': ['2.500.000 TL', '950.000 TL', ' 1.200.000 TL ', '12', 'Fiyat Sorunuz', '1,5', '', None,
+              '+2.500.000 TL', '-950.000', '1_000_000 TL', '١٢٣', '1e6', 'inf', 'nan', '1.5e3',
+              '12 000 TL', '99.999.999.999.999.999.999 TL', '\u00a0750.000 TL\u00a0', '+', '-0'],
+    'Number of rooms': ['3+1', '1+0', '2 + 1', 'Stüdyo (1+0)', '8+ üzeri', 'abc', None],
+    'Building Age': ['0', '1-5 arası', '5-10 arası', '31 ve üzeri', '12', 'abc', None],
+    'Balcony': ['Available', 'Not Available', 'Yes', 'No', None],
+}
+SCALAR_CLEANERS = {
+    'Price': features.clean_price,
+    'Number of rooms': features.clean_rooms,
+    'Building Age': features.clean_age,
+    'Balcony': features.clean_balcony,
+}
+
+
+# --- Bağımsız referans ---
+# Özellik hattı ve encoder'dan önceki (orijinal) sunum kodunun birebir kopyası. Derlenmiş yol
+# features.request_features / listing_features ve encoder.transform'u kullandığından bunlarla
+# karşılaştırmak ortak bir hatayı yakalamaz; referans bu modüllerden hiçbirini çağırmaz.
+
+def reference_floor_location(floor, total_floors):
+    if floor <= 0:
+        return "Zemin Kat"
+    elif floor == 1:
+        return "1. Kat"
+    elif floor == 2:
+        return "2. Kat"
+    elif floor == 3:
+        return "3. Kat"
+    elif floor >= total_floors:
+        return "En Üst Kat"
+    else:
+        return "Orta Kat"
+
+
+def reference_input(request) -> pd.DataFrame:
+    """Orijinal HousePricePredictor.prepare_input"""
+    return pd.DataFrame({
+        'District': [request.district],
+        'Neighborhood': [request.location],
+        'm² (Net)': [request.m2],
+        'Rooms_Num': [request.rooms],
+        'Age_Num': [request.building_age],
+        'Floor location': [reference_floor_location(request.floor, request.total_floors)],
+        'Heating': [request.heating or "Kombi"],
+        'Number of bathrooms': [request.bathrooms or 1],
+        'Number of floors': [request.total_floors],
+        'Balcony_Bool': [1 if request.balcony else 0],
+        'Elevator': [1 if request.elevator else 0],
+        'Parking Lot': [1 if request.parking else 0],
+        'Security': [1 if request.security else 0],
+        'Room_Size_Ratio': [request.m2 / max(request.rooms, 1)]
+    })
+
+
+def reference_listing_input(df: pd.DataFrame) -> pd.DataFrame:
+    """Orijinal fırsat taramasındaki satır başına girdi, tüm satırlar için (eksik kolonlar aynı varsayılanlarla)"""
+    def column(name, default):
+        return df[name].astype(object) if name in df.columns else pd.Series(default, index=df.index)
+
+    floors = column('Floor', 3)
+    total_floors = column('Number of floors', 10)
+    return pd.DataFrame({
+        'District': column('District', None),
+        'Neighborhood': column('Neighborhood', None),
+        'm² (Net)': df['m² (Net)'],
+        'Rooms_Num': df['Rooms_Num'],
+        'Age_Num': column('Age_Num', 5).astype(np.float64),
+        'Floor location': [
+            reference_floor_location(int(floor), int(total))
+            for floor, total in zip(floors.tolist(), total_floors.tolist())
+        ],
+        'Heating': column('Heating', 'Kombi'),
+        'Number of bathrooms': column('Number of bathrooms', 1).astype(np.float64),
+        'Number of floors': total_floors.astype(np.float64),
+        'Balcony_Bool': column('Balcony_Bool', 1).astype(np.float64),
+        'Elevator': column('Elevator', 1).astype(np.float64),
+        'Parking Lot': column('Parking Lot', 0).astype(np.float64),
+        'Security': column('Security', 0).astype(np.float64),
+        'Room_Size_Ratio': df['m² (Net)'] / np.maximum(df['Rooms_Num'], 1)
+    }, index=df.index)
+
+
+def reference_transform(encoder, X: pd.DataFrame) -> pd.DataFrame:
+    """Orijinal Optimization.transform: kategori ortalaması, görülmemişse global ortalama"""
+    X_out = X.copy()
+    for col in encoder.cols:
+        if col in X_out.columns:
+            if col in encoder.mappings:
+                X_out[col] = X_out[col].map(encoder.mappings[col]).fillna(encoder.global_mean)
+            else:
+                X_out[col] = encoder.global_mean
+    return X_out
+
+
+def requests_from_training_data(df, seed):
+    """Eğitim satırlarından PredictRequest üret (kat bilgisi veride olmadığı için rastgele)."""
+    rng = np.random.default_rng(seed)
+    floors = rng.integers(-1, 15, size=len(df))
+    heating = rng.choice(np.array([None, 'Kombi', 'Natural Gas (Combi)'], dtype=object), size=len(df))
+    rows = df.to_dict('records')
+    requests = []
+    for i, row in enumerate(rows):
+        requests.append(PredictRequest(
+            location=row['Neighborhood'],
+            district=row['District'],
+            m2=row['m² (Net)'],
+            rooms=int(row['Rooms_Num']),
+            building_age=int(row['Age_Num']),
+            floor=int(floors[i]),
+            total_floors=max(int(row['Number of floors']), 1),
+            price=float(row['Price']),
+            heating=heating[i],
+            bathrooms=int(row['Number of bathrooms']),
+            balcony=bool(row['Balcony_Bool']),
+            elevator=bool(row['Elevator']),
+            parking=bool(row['Parking Lot']),
+            security=bool(row['Security']),
+        ))
+    return requests
+
+
+def check_features(requests) -> int:
+    """Vektörel özellik yollarını tekil referanslarla karşılaştır, uyuşmazlık sayısını döndür"""
+    mismatches = 0
+    for raw_col, values in RAW_SAMPLES.items():
+        series = pd.Series(values * 3, dtype=object)
+        vectorized = features.by_unique(series, features.COLUMN_CLEANERS[raw_col][1]).to_numpy()
+        reference = series.map(SCALAR_CLEANERS[raw_col]).to_numpy(dtype=np.float64)
+        mismatches += int((~((vectorized == reference) | (np.isnan(vectorized) & np.isnan(reference)))).sum())
+
+    # Kompakt veride m² float32 olabilir (tam sayı olmayan ama float32'de tam değerler); oran yine float64
+    listings = pd.DataFrame({'m² (Net)': [100.25, 72.5, 133.75, 55.5], 'Rooms_Num': [3, 7, 6, 1]})
+    ratio = features.listing_features(features.compact_listings(listings))['Room_Size_Ratio']
+    mismatches += int((ratio != listings['m² (Net)'] / listings['Rooms_Num']).sum())
+
+    batch = features.request_batch_features(requests)
+    for i, request in enumerate(requests):
+        for col, value in features.request_features(request).items():
+            if batch[col][i] != value:
+                mismatches += 1
+    return mismatches
+
+
+def check_pages(predictor, page_size: int) -> int:
+    """Cursor sayfalarının art arda eklenmesi NDJSON akışıyla aynı mı; uyuşmayan (ilçe, sıralama) sayısı"""
+    mismatches = 0
+    for district in sorted(predictor.opportunity_index.by_district):
+        for rank in ("discount", "similarity"):
+            total, _, items = predictor.stream_opportunities(district, None, 100, 3, rank, 0)
+            streamed = list(items)
+            paged, offset = [], 0
+            while offset < total:
+                page = predictor.get_opportunities(district, None, 100, 3, page_size, rank, offset)["opportunities"]
+                if not page:
+                    break
+                paged += page
+                offset += len(page)
+            if paged != streamed:
+                mismatches += 1
+                print(f"  {district}/{rank}: {len(paged)} paged vs {len(streamed)} streamed")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check compiled inference against an independent reference implementation.')
+    parser.add_argument('--models_dir', type=str, default=None, help='Path to the models directory')
+    parser.add_argument('--rows', type=int, default=2000, help='Training rows checked on the request path (0 = all)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for floors/heating')
+    parser.add_argument('--page_size', type=int, default=7, help='Opportunity page size for the paging check')
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        predictor = HousePricePredictor()
+        predictor.load(args.models_dir, background=False, prefer_bundle=False)
+
+    if predictor.compiled is None:
+        print("Error: compiled inference is not available for this model")
+        sys.exit(1)
+    if predictor.training_data is None:
+        print("Error: training data not found")
+        sys.exit(1)
+
+    df = predictor.training_data
+    # Referans, sunumun kompakt kopyası yerine pickle'dan okunan ham veriyle beslenir
+    raw = pd.read_pickle(predictor._sources["processed_data.pkl"]).loc[df.index]
+    encoder, model = predictor.encoder, predictor.model
+    failed = False
+
+    # 1. Toplu yol: tüm eğitim verisi, derlenmiş matris vs orijinal girdi + encoder + Pipeline.predict
+    print(f"Batch path: {len(df):,} training rows...")
+    compiled = predictor.compiled.predict_columns(features.listing_features(df), len(df))
+    reference = np.asarray(model.predict(reference_transform(encoder, reference_listing_input(raw))))
+    mismatches = int((compiled != reference).sum())
+    print(f"  mismatches: {mismatches} | max abs diff: {np.abs(compiled - reference).max():.6g}")
+    failed |= mismatches > 0
+
+    # 2. Tek istek yolu: prepare_features + booster (ve predict) vs orijinal prepare_input + Pipeline.predict
+    sample = df if args.rows == 0 else df.sample(min(args.rows, len(df)), random_state=args.seed)
+    requests = requests_from_training_data(sample, args.seed)
+    print(f"Request path: {len(requests):,} requests...")
+    mismatches = 0
+    for request in requests:
+        expected = float(model.predict(reference_transform(encoder, reference_input(request)))[0])
+        value = predictor.compiled.predict_record(predictor.prepare_features(request))
+        if value != expected or predictor.predict(request)["fair_value"] != round(expected / 1000) * 1000:
+            mismatches += 1
+
+    # Süre ölçümü ayrı turda: DataFrame yolunun çok thread'li tahmini ölçümü bozmasın
+    compiled_times = []
+    for request in requests:
+        started = time.perf_counter()
+        predictor.compiled.predict_record(predictor.prepare_features(request))
+        compiled_times.append(time.perf_counter() - started)
+    print(f"  mismatches: {mismatches} | median compiled time: {np.median(compiled_times) * 1e6:.1f} us")
+    failed |= mismatches > 0
+
+    # 3. Özellik hattı: ham veri temizleme ve toplu istek özellikleri
+    print("Feature pipeline: raw cleaning + batch request features...")
+    mismatches = check_features(requests)
+    print(f"  mismatches: {mismatches}")
+    failed |= mismatches > 0
+
+    # 4. Fırsat sayfalama: cursor sayfaları vs tek seferde akış (her iki sıralama)
+    print(f"Opportunity paging: pages of {args.page_size} vs stream...")
+    mismatches = check_pages(predictor, args.page_size)
+    print(f"  mismatches: {mismatches}")
+    failed |= mismatches > 0
+
+    print("=" * 30)
+    print("PARITY FAILED" if failed else "PARITY OK")
+    print("=" * 30)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import warnings
+from urllib.parse import urlparse
+
+import numpy as np
+
+# Add api directory to path to run the app in-process
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api')))
+
+SAMPLE_REQUEST = {
+    "location": "Caferağa Mah.", "district": "Kadıköy", "m2": 110, "rooms": 4,
+    "building_age": 10, "floor": 3, "total_floors": 6, "price": 2500000
+}
+
+
+def start_server(port):
+    """Uygulamayı aynı süreçte, ayrı bir thread'de uvicorn ile başlat."""
+    import uvicorn
+    from main import app
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("Error: server failed to start")
+        time.sleep(0.1)
+    # Eğitim verisi arka planda hazırlanıyor; fırsat istekleri 503 almasın.
+    # Bulk worker süreçleri de yüklensin: açılış yükü ölçüme karışmasın
+    from executor import bulk_pool
+    from predictor import predictor
+    predictor.data_ready.wait()
+    bulk_pool.wait_ready()
+    return server
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Client:
+    """Keep-alive bağlantılı basit HTTP istemcisi (thread başına bir tane)."""
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        # Büyük gövdeler önceden kodlanabilir (bytes): istemcinin JSON üretimi ölçümü bozmasın
+        data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode('utf-8')
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            status = 0
+        return status, time.perf_counter() - started
+
+
+def probe(url, method, path, body, stop, results):
+    """stop set edilene kadar aynı isteği tekrarla, gecikme ve durum kodlarını topla."""
+    client = Client(url)
+    while not stop.is_set():
+        status, elapsed = client.request(method, path, body)
+        results.append((status, elapsed))
+        time.sleep(0.005)
+
+
+def slow_load(url, batch_size, stop, results):
+    """Ağır işler: büyük toplu tahmin + fırsat taraması."""
+    client = Client(url)
+    batch = json.dumps(
+        [dict(SAMPLE_REQUEST, m2=50 + i % 150, building_age=i % 30) for i in range(batch_size)]
+    ).encode('utf-8')
+    opportunities = {"district": "Bilinmeyen", "limit": 50}
+    while not stop.is_set():
+        results.append(client.request('POST', '/api/predict/batch', batch))
+        results.append(client.request('POST', '/api/opportunities', opportunities))
+
+
+def summarize(name, results):
+    """Gecikme özetini yazdır; p99'u (ms) döndür (başarılı istek yoksa None)."""
+    latencies = np.array([elapsed for status, elapsed in results if status == 200]) * 1000
+    rejected = sum(1 for status, _ in results if status == 503)
+    errors = sum(1 for status, _ in results if status not in (200, 503))
+    if len(latencies) == 0:
+        print(f"  {name:<22} no successful requests ({rejected} rejected, {errors} errors)")
+        return None
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"  {name:<22} n={len(latencies):<6} p50={p50:7.1f} ms  p95={p95:7.1f} ms  "
+          f"p99={p99:7.1f} ms  max={latencies.max():7.1f} ms  503={rejected} err={errors}")
+    return p99
+
+
+def run_phase(url, duration, slow_clients, batch_size):
+    stop = threading.Event()
+    health, predict, slow = [], [], []
+    threads = [
+        threading.Thread(target=probe, args=(url, 'GET', '/health', None, stop, health)),
+        threading.Thread(target=probe, args=(url, 'POST', '/api/predict', SAMPLE_REQUEST, stop, predict)),
+    ]
+    threads += [threading.Thread(target=slow_load, args=(url, batch_size, stop, slow)) for _ in range(slow_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    p99 = {'/health': summarize('/health', health), '/api/predict': summarize('/api/predict', predict)}
+    if slow_clients:
+        summarize('slow (batch + opps)', slow)
+    return p99
+
+
+def check_budget(idle, loaded, max_ratio, min_budget_ms):
+    """Yük altındaki p99, boştaki p99'un max_ratio katını (en az min_budget_ms) aşmamalı."""
+    ok = True
+    for name, idle_p99 in idle.items():
+        loaded_p99 = loaded[name]
+        if idle_p99 is None or loaded_p99 is None:
+            print(f"  {name:<22} FAIL: no successful requests")
+            ok = False
+            continue
+        budget = max(idle_p99 * max_ratio, min_budget_ms)
+        passed = loaded_p99 <= budget
+        ok &= passed
+        print(f"  {name:<22} p99 {idle_p99:.1f} -> {loaded_p99:.1f} ms (budget {budget:.1f} ms) "
+              f"{'OK' if passed else 'FAIL'}")
+    return ok
+
+
+def main():
+    warnings.simplefilter('ignore')
+    parser = argparse.ArgumentParser(description='Probe /health and /api/predict latency with and without slow requests.')
+    parser.add_argument('--url', type=str, default=None, help='Target server (default: start the app in-process)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per phase')
+    parser.add_argument('--slow_clients', type=int, default=2, help='Concurrent clients sending slow requests')
+    parser.add_argument('--batch_size', type=int, default=5000, help='Items per /api/predict/batch request')
+    parser.add_argument('--max_p99_ratio', type=float, default=2.0,
+                        help='Allowed loaded/idle p99 ratio for /health and /api/predict')
+    parser.add_argument('--min_budget_ms', type=float, default=10.0,
+                        help='Lower bound of the p99 budget (idle p99 of a few ms is mostly timer noise)')
+    args = parser.parse_args()
+
+    url = args.url
+    server = None
+    if url is None:
+        port = free_port()
+        print("Starting in-process server...")
+        server = start_server(port)
+        url = f"http://127.0.0.1:{port}"
+
+    print(f"Phase 1: idle ({args.duration:.0f} s)")
+    idle = run_phase(url, args.duration, 0, args.batch_size)
+    print(f"Phase 2: {args.slow_clients} slow clients, batch size {args.batch_size} ({args.duration:.0f} s)")
+    loaded = run_phase(url, args.duration, args.slow_clients, args.batch_size)
+
+    if server is not None:
+        server.should_exit = True
+
+    print(f"Latency budget: loaded p99 <= {args.max_p99_ratio:g} x idle p99 (at least {args.min_budget_ms:g} ms)")
+    ok = check_budget(idle, loaded, args.max_p99_ratio, args.min_budget_ms)
+    print("=" * 30)
+    print("LATENCY OK" if ok else "LATENCY BUDGET EXCEEDED")
+    print("=" * 30)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()